@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import tornado.web
+import tornado.ioloop
+
+# Ajouter le chemin src
+current_dir = Path(__file__).parent
+src_path = current_dir.parent
+sys.path.append(str(src_path))
+
+from core.database_manager import DatabaseManager
+from core.llm_client import create_llm_client, load_environment
+from core.insightbot_ai import InsightBotAI
+from core.insightbot_gpt import InsightBotGPT
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+def data_payload(data):
+    """Résultat (DataFrame, Series, scalaire) converti en structure JSON"""
+    if data is None:
+        return None
+    import pandas as pd
+    
+    if isinstance(data, pd.DataFrame):
+        return json.loads(data.to_json(orient='records', date_format='iso'))
+    if isinstance(data, pd.Series):
+        return json.loads(data.to_json(date_format='iso'))
+    # Scalaire NumPy -> type Python
+    return data.item() if hasattr(data, 'item') else data
+
+def arrow_payload(data, metadata):
+    """Flux Arrow IPC des données, avec insight et SQL dans les métadonnées du schéma"""
+    import pandas as pd
+    import pyarrow as pa
+    
+    if isinstance(data, pd.Series):
+        data = data.to_frame().T
+    elif not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame({'value': [] if data is None else [data]})
+    
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        **{key: str(value) for key, value in metadata.items() if value is not None}
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+class InsightBotService:
+    """Ressources partagées par toutes les requêtes: base, client LLM, bots et pool de workers"""
+    
+    def __init__(self, workers=4, timeout=60.0):
+        # Connexion DuckDB et session HTTP du LLM ouvertes à la première requête: le serveur écoute aussitôt
+        self.db = DatabaseManager()
+        self.llm = create_llm_client()
+        
+        # Les deux bots partagent la connexion (un curseur par thread) et le client LLM
+        self.bots = {
+            'ai': InsightBotAI(db=self.db),
+            'gpt': InsightBotGPT(db=self.db, llm=self.llm)
+        }
+        
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='insightbot-api')
+        # Délai maximum d'une requête (s), modifiable par requête avec ?timeout=
+        self.timeout = timeout
+    
+    def bot(self, engine):
+        if engine not in self.bots:
+            raise tornado.web.HTTPError(400, reason=f"Moteur inconnu: {engine} (ai ou gpt)")
+        return self.bots[engine]
+    
+    async def run(self, timeout, fn, *args):
+        """Exécute fn dans le pool; 504 si le délai est dépassé (le worker termine en arrière-plan)"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self.executor, fn, *args), timeout)
+        except asyncio.TimeoutError:
+            raise tornado.web.HTTPError(504, reason=f"Délai dépassé ({timeout:g}s)")
+    
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.llm.close()
+        self.db.close()
+
+class BaseHandler(tornado.web.RequestHandler):
+    """Réponses et erreurs en JSON"""
+    
+    def initialize(self, service):
+        self.service = service
+    
+    def request_timeout(self):
+        try:
+            return float(self.get_argument('timeout', self.service.timeout))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="timeout doit être un nombre de secondes")
+    
+    def write_json(self, payload):
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+        self.finish(json.dumps(payload, ensure_ascii=False, default=str))
+    
+    def write_error(self, status_code, **kwargs):
+        self.write_json({'error': self._reason, 'status': status_code})
+
+class QuestionHandler(BaseHandler):
+    """POST /api/questions {"question": ..., "engine": "gpt"|"ai"} -> réponse complète (JSON ou Arrow)"""
+    
+    async def post(self):
+        try:
+            body = json.loads(self.request.body or b'{}')
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="Corps JSON invalide")
+        
+        question = (body.get('question') or "").strip()
+        if not question:
+            raise tornado.web.HTTPError(400, reason="Champ 'question' manquant")
+        bot = self.service.bot(body.get('engine', 'gpt'))
+        
+        start = time.perf_counter()
+        result = await self.service.run(self.request_timeout(), bot.process_question, question)
+        elapsed = time.perf_counter() - start
+        
+        metadata = {
+            'question': question,
+            'insight': result.get('insight'),
+            'sql_query': result.get('sql_query'),
+            'chart_type': result.get('chart_type'),
+            'cached_from': result.get('cached_from'),
+            'derived_from': result.get('derived_from'),
+            'seconds': round(elapsed, 3)
+        }
+        
+        # Arrow: données en flux IPC, le reste dans les métadonnées du schéma
+        if self.get_argument('format', body.get('format', 'json')) == 'arrow':
+            self.set_header('Content-Type', ARROW_MIME)
+            self.finish(arrow_payload(result.get('data'), metadata))
+            return
+        
+        include_chart = body.get('include_chart', True)
+        chart = result.get('chart')
+        self.write_json({
+            **metadata,
+            'data': data_payload(result.get('data')),
+            'chart_spec': chart.to_dict() if chart is not None else None,
+            'chart': json.loads(chart.to_json()) if include_chart and chart is not None else None
+        })
+
+class KPIHandler(BaseHandler):
+    """GET /api/kpis?metrics=total_sales,total_profit -> indicateurs (scan unique mis en cache)"""
+    
+    async def get(self):
+        metrics = self.get_argument('metrics', None)
+        metrics = [m.strip() for m in metrics.split(',') if m.strip()] if metrics else None
+        try:
+            kpis = await self.service.run(self.request_timeout(), self.service.db.get_kpis, metrics)
+        except KeyError as e:
+            raise tornado.web.HTTPError(400, reason=str(e.args[0]))
+        self.write_json({
+            'data_version': self.service.db.get_data_version(),
+            'kpis': data_payload(kpis)
+        })
+
+class SuggestedQuestionsHandler(BaseHandler):
+    """GET /api/suggested-questions?engine=gpt"""
+    
+    def get(self):
+        bot = self.service.bot(self.get_argument('engine', 'gpt'))
+        self.write_json({'questions': bot.get_suggested_questions()})
+
+class HealthHandler(BaseHandler):
+    """GET /api/health -> état de la base et du client LLM"""
+    
+    def get(self):
+        self.write_json({
+            'status': 'ok',
+            'data_version': self.service.db.get_data_version(),
+            'llm_enabled': self.service.bots['gpt'].gpt_enabled,
+            'llm': self.service.llm.status()
+        })
+
+def make_app(service):
+    """Application Tornado (routes /api/...)"""
+    return tornado.web.Application([
+        (r"/api/questions", QuestionHandler, {'service': service}),
+        (r"/api/kpis", KPIHandler, {'service': service}),
+        (r"/api/suggested-questions", SuggestedQuestionsHandler, {'service': service}),
+        (r"/api/health", HealthHandler, {'service': service})
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP InsightBot (sans Streamlit)")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--workers', type=int, help="Taille du pool (défaut: INSIGHTBOT_API_WORKERS ou 4)")
+    parser.add_argument('--timeout', type=float, help="Délai par requête en s (défaut: INSIGHTBOT_API_TIMEOUT ou 60)")
+    parser.add_argument('--stub-llm', action='store_true', help="Démarre le serveur LLM factice (aucun service externe)")
+    args = parser.parse_args()
+    load_environment()
+    
+    if args.stub_llm:
+        from core.llm_stub_server import start_stub_server
+        stub = start_stub_server()
+        os.environ['OPENAI_BASE_URL'] = stub.base_url
+        os.environ['OPENAI_API_KEY'] = "stub"
+        print(f"🧪 LLM factice: {stub.base_url}")
+    
+    service = InsightBotService(
+        workers=args.workers or int(os.getenv('INSIGHTBOT_API_WORKERS', '4')),
+        timeout=args.timeout or float(os.getenv('INSIGHTBOT_API_TIMEOUT', '60'))
+    )
+    
+    app = make_app(service)
+    app.listen(args.port, args.host)
+    print(f"🚀 API InsightBot: http://{args.host}:{args.port}/api/health")
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    except KeyboardInterrupt:
+        service.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 import sys
 
@@ -8,11 +7,12 @@ current_dir = Path(__file__).parent
 src_path = current_dir.parent
 sys.path.append(str(src_path))
 
-from core.insightbot_ai import InsightBotAI
+from app.resources import get_insightbot_ai
+from app.chat_history import history_entry, history_page, show_details, load_payload, display_chart, clear_history
 
 class InsightBotChat:
     def __init__(self):
-        self.bot = InsightBotAI()
+        self.bot = get_insightbot_ai()
         
     def initialize_session_state(self):
         """Initialise l'état de la session"""
@@ -48,48 +48,44 @@ class InsightBotChat:
             result = self.bot.process_question(question)
             
             # Ajouter à l'historique
-            st.session_state.chat_history.append({
-                'question': question,
-                'result': result
-            })
+            st.session_state.chat_history.append(history_entry(question, result))
     
     def display_chat_history(self):
-        """Affiche l'historique des conversations"""
-        if st.session_state.chat_history:
+        """Affiche l'historique des conversations (paginé, détails rendus à la demande)"""
+        history = st.session_state.chat_history
+        if history:
             st.subheader("📜 Historique des Analyses")
             
-            for i, chat in enumerate(reversed(st.session_state.chat_history)):
-                with st.expander(f"Q: {chat['question']}", expanded=i==0):
+            for i, chat in history_page(history):
+                with st.expander(f"Q: {chat['question']}", expanded=i == len(history) - 1):
                     result = chat['result']
                     
                     # Afficher l'insight
                     st.success(f"💡 {result['insight']}")
                     
+                    # Graphique et données uniquement pour les entrées ouvertes
+                    if not show_details(i, history):
+                        continue
+                    
+                    payload = load_payload(result)
+                    data = payload['data']
+                    
                     # Afficher le graphique
-                    if result['chart'] is not None:
-                        st.plotly_chart(result['chart'], use_container_width=True)
+                    display_chart(payload)
                     
                     # Afficher les données
                     with st.expander("📊 Voir les données détaillées"):
-                        if hasattr(result['data'], 'head'):
-                            st.dataframe(result['data'], use_container_width=True)
+                        if hasattr(data, 'head'):
+                            st.dataframe(data, use_container_width=True)
                         else:
-                            st.json(result['data'])
+                            st.json(data)
     
     def display_kpi_overview(self):
         """Affiche un aperçu des KPIs"""
         st.sidebar.subheader("📊 Aperçu Global")
         
-        # KPIs rapides
-        kpi_query = """
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(Sales) as total_sales,
-                SUM(Profit) as total_profit,
-                AVG(Profit_Margin_Percent) as avg_margin
-            FROM merged
-        """
-        kpis = self.bot.db.execute_query(kpi_query).iloc[0]
+        # KPIs rapides (scan unique partagé)
+        kpis = self.bot.db.get_kpis(['total_orders', 'total_sales', 'total_profit', 'avg_margin'])
         
         st.sidebar.metric("Commandes", f"{kpis['total_orders']:,}")
         st.sidebar.metric("Chiffre d'Affaires", f"${kpis['total_sales']:,.0f}")
@@ -124,7 +120,7 @@ class InsightBotChat:
             # Options
             st.sidebar.subheader("⚙️ Options")
             if st.sidebar.button("🗑️ Effacer l'historique"):
-                st.session_state.chat_history = []
+                clear_history()
                 st.rerun()
             
             if st.sidebar.button("🔄 Actualiser les données"):
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 import sys
 
@@ -8,11 +7,12 @@ current_dir = Path(__file__).parent
 src_path = current_dir.parent
 sys.path.append(str(src_path))
 
-from core.insightbot_gpt import InsightBotGPT
+from app.resources import get_insightbot_gpt
+from app.chat_history import history_entry, history_page, show_details, load_payload, display_chart, clear_history
 
 class InsightBotGPTChat:
     def __init__(self):
-        self.bot = InsightBotGPT()
+        self.bot = get_insightbot_gpt()
         
     def initialize_session_state(self):
         """Initialise l'état de la session"""
@@ -53,24 +53,38 @@ class InsightBotGPTChat:
     def process_question(self, question):
         """Traite une question avec l'IA avancée"""
         with st.spinner("🤖 InsightBot IA analyse avec GPT..."):
-            result = self.bot.process_question(question)
-            
-            # Ajouter à l'historique
-            st.session_state.chat_history.append({
-                'question': question,
-                'result': result
-            })
+            result = self.bot.prepare_answer(question)
+        
+        # Données et graphique affichés dès l'exécution SQL, puis insight en streaming
+        if result['insight'] is None:
+            self.stream_insight(result)
+        
+        # Ajouter à l'historique
+        st.session_state.chat_history.append(history_entry(question, result))
+        
+        # Forcer le rerender
+        st.rerun()
+    
+    def stream_insight(self, result):
+        """Affiche le graphique et les données, puis l'insight au fil de sa génération"""
+        with st.container(border=True):
+            st.markdown(f"**🤖 {result['question']}**")
+            if result['chart'] is not None:
+                st.plotly_chart(result['chart'].to_figure(), use_container_width=True)
+            st.dataframe(result['data'], use_container_width=True)
             
-            # Forcer le rerender
-            st.rerun()
+            result['insight'] = st.write_stream(
+                self.bot.generate_insight_stream(result['question'], result['data'], result['sql_query'], result=result)
+            ).strip()
     
     def display_chat_history(self):
-        """Affiche l'historique des conversations avec détails IA"""
-        if st.session_state.chat_history:
+        """Affiche l'historique des conversations avec détails IA (paginé, détails rendus à la demande)"""
+        history = st.session_state.chat_history
+        if history:
             st.subheader("📜 Historique des Analyses IA")
             
-            for i, chat in enumerate(reversed(st.session_state.chat_history)):
-                with st.expander(f"🤖 {chat['question']}", expanded=i==0):
+            for i, chat in history_page(history):
+                with st.expander(f"🤖 {chat['question']}", expanded=i == len(history) - 1):
                     result = chat['result']
                     
                     # Afficher l'insight IA
@@ -80,28 +94,34 @@ class InsightBotGPTChat:
                     with st.expander("🔍 Voir la requête SQL générée"):
                         st.code(result['sql_query'], language='sql')
                     
+                    # Graphique et données uniquement pour les entrées ouvertes
+                    if not show_details(i, history):
+                        continue
+                    
+                    payload = load_payload(result)
+                    data = payload['data']
+                    
                     # Afficher le graphique IA
-                    if result['chart'] is not None:
-                        st.plotly_chart(result['chart'], use_container_width=True)
+                    if display_chart(payload):
                         st.caption(f"📊 Type de visualisation: {result['chart_type']}")
                     
                     # Afficher les données
                     with st.expander("📋 Données détaillées"):
-                        if hasattr(result['data'], 'head'):
-                            st.dataframe(result['data'], use_container_width=True)
+                        if hasattr(data, 'head'):
+                            st.dataframe(data, use_container_width=True)
                             
                             # Statistiques rapides
-                            if len(result['data']) > 1:
+                            if len(data) > 1:
                                 st.write("**📈 Statistiques:**")
-                                numeric_cols = result['data'].select_dtypes(include=['number']).columns
+                                numeric_cols = data.select_dtypes(include=['number']).columns
                                 for col in numeric_cols[:3]:  # Premieres 3 colonnes numériques
-                                    if col in result['data'].columns:
+                                    if col in data.columns:
                                         st.metric(
                                             f"Total {col}",
-                                            f"{result['data'][col].sum():,.0f}" if 'total' in col else f"{result['data'][col].mean():.1f}"
+                                            f"{data[col].sum():,.0f}" if 'total' in col else f"{data[col].mean():.1f}"
                                         )
                         else:
-                            st.json(result['data'])
+                            st.json(data)
     
     def display_ai_features(self):
         """Affiche les fonctionnalités IA"""
@@ -110,6 +130,13 @@ class InsightBotGPTChat:
         if self.bot.gpt_enabled:
             st.sidebar.success("✅ GPT-3.5 Turbo")
             st.sidebar.info("• Génération SQL intelligente\n• Insights business\n• Visualisations adaptatives")
+            
+            # Signaler les réponses dégradées (API saturée ou indisponible)
+            llm_status = self.bot.llm.status()
+            if llm_status['circuit'] != 'closed':
+                st.sidebar.error("⛔ API LLM indisponible - réponses en mode basique")
+            elif llm_status['failures'] or llm_status['rate_limited']:
+                st.sidebar.warning(f"⚠️ API LLM: {llm_status['rate_limited']} limitations, {llm_status['failures']} échecs")
         else:
             st.sidebar.warning("🔧 Mode Basique")
             st.sidebar.info("• SQL par motifs\n• Insights simples\n• Graphiques standards")
@@ -117,19 +144,14 @@ class InsightBotGPTChat:
         # KPIs avancés
         st.sidebar.subheader("📊 Métriques Avancées")
         
-        advanced_kpis = self.bot.db.execute_query("""
-            SELECT 
-                COUNT(DISTINCT "Customer ID") as unique_customers,
-                AVG(Processing_Days) as avg_processing_days,
-                SUM(CASE WHEN Profit > 0 THEN 1 ELSE 0 END) as profitable_orders,
-                (SUM(CASE WHEN Is_Returned THEN 1 ELSE 0 END) * 100.0 / COUNT(*)) as overall_return_rate
-            FROM merged
-        """).iloc[0]
+        advanced_kpis = self.bot.db.get_kpis(
+            ['unique_customers', 'avg_processing_days', 'profitable_rate', 'return_rate']
+        )
         
         st.sidebar.metric("Clients Uniques", f"{advanced_kpis['unique_customers']:,}")
         st.sidebar.metric("Délai Moyen", f"{advanced_kpis['avg_processing_days']:.1f}j")
-        st.sidebar.metric("Commandes Rentables", f"{(advanced_kpis['profitable_orders']/51290*100):.1f}%")
-        st.sidebar.metric("Taux Retour Global", f"{advanced_kpis['overall_return_rate']:.1f}%")
+        st.sidebar.metric("Commandes Rentables", f"{advanced_kpis['profitable_rate']:.1f}%")
+        st.sidebar.metric("Taux Retour Global", f"{advanced_kpis['return_rate']:.1f}%")
     
     def run(self):
         """Lance l'application de chat IA"""
@@ -160,17 +182,17 @@ class InsightBotGPTChat:
             st.sidebar.subheader("⚙️ Contrôles IA")
             
             if st.sidebar.button("🗑️ Effacer l'historique"):
-                st.session_state.chat_history = []
+                clear_history()
                 st.rerun()
             
             if st.sidebar.button("🔄 Recharger les données"):
                 st.rerun()
             
             if st.sidebar.button("🎯 Mode Découverte"):
-                st.session_state.chat_history.append({
-                    'question': "Découverte automatique",
-                    'result': self.bot.process_question("Quels sont les insights les plus importants dans mes données?")
-                })
+                st.session_state.chat_history.append(history_entry(
+                    "Découverte automatique",
+                    self.bot.process_question("Quels sont les insights les plus importants dans mes données?")
+                ))
                 st.rerun()
 
 def main():
@@ -0,0 +1,78 @@
+import streamlit as st
+import os
+import uuid
+from app.resources import get_result_store
+
+# Nombre d'analyses affichées par page d'historique
+HISTORY_PAGE_SIZE = int(os.getenv('INSIGHTBOT_HISTORY_PAGE_SIZE', '5'))
+
+def session_id():
+    """Identifiant de la session Streamlit courante (clé du budget mémoire)"""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def history_entry(question, result, **extra):
+    """Entrée d'historique légère: données et graphique (sérialisé une seule fois en JSON) confiés au ResultStore"""
+    stored = dict(result)
+    chart = stored.pop('chart', None)
+    data = stored.pop('data', None)
+    chart_json = chart.to_json() if chart is not None else None
+    stored['result_id'] = get_result_store().put(session_id(), data, chart_json, stored.get('sql_query'))
+    
+    entry = {'question': question, 'result': stored}
+    entry.update(extra)
+    return entry
+
+def load_payload(result):
+    """Données et JSON du graphique d'une entrée (relus sur disque ou régénérés si nécessaire)"""
+    return get_result_store().get(result['result_id'])
+
+def clear_history():
+    """Vide l'historique de la session et libère ses résultats"""
+    get_result_store().release(session_id())
+    st.session_state.chat_history = []
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def load_figure(chart_json):
+    """Reconstruit une Figure depuis son JSON (mise en cache pour les reruns suivants)"""
+    import plotly.io as pio
+    return pio.from_json(chart_json, skip_invalid=True)
+
+def display_chart(payload):
+    """Affiche le graphique d'une entrée d'historique, s'il existe"""
+    if payload.get('chart_json'):
+        st.plotly_chart(load_figure(payload['chart_json']), use_container_width=True)
+        return True
+    if payload.get('state') == 'dropped':
+        st.caption("♻️ Données régénérées depuis la requête SQL (graphique non conservé)")
+    return False
+
+def memory_status():
+    """Occupation mémoire des résultats (session courante et processus)"""
+    return get_result_store().usage(session_id())
+
+def history_page(history, key='history_page'):
+    """Entrées de la page courante, de la plus récente à la plus ancienne: liste de (index, entrée)"""
+    pages = max(1, -(-len(history) // HISTORY_PAGE_SIZE))
+    
+    # L'historique a pu être vidé depuis le dernier affichage
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+    
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (sur {pages})", min_value=1, max_value=pages, step=1, key=key)
+    
+    newest = len(history) - 1 - (page - 1) * HISTORY_PAGE_SIZE
+    oldest = max(-1, newest - HISTORY_PAGE_SIZE)
+    return [(index, history[index]) for index in range(newest, oldest, -1)]
+
+def show_details(index, history, label="📈 Graphique et données"):
+    """Interrupteur d'affichage du détail d'une entrée (ouvert par défaut pour la plus récente).
+    
+    Le graphique et le tableau ne sont rendus que lorsqu'il est activé. La clé dépend
+    de la taille de l'historique: chaque nouvelle analyse referme les précédentes.
+    """
+    latest = index == len(history) - 1
+    return st.toggle(label, value=latest, key=f"history_open_{index}_{len(history)}")
@@ -1,19 +1,21 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 import sys
 import time
+from concurrent.futures import as_completed
 
 # Ajouter le chemin src
 current_dir = Path(__file__).parent
 src_path = current_dir.parent
 sys.path.append(str(src_path))
 
-from core.insightbot_gpt import InsightBotGPT
+from app.resources import get_insightbot_gpt, get_discovery_executor
+from app.exports import export_controls
+from app.chat_history import history_entry, history_page, show_details, load_payload, display_chart, clear_history, memory_status
 
 class InsightBotUltimateChat:
     def __init__(self):
-        self.bot = InsightBotGPT()
+        self.bot = get_insightbot_gpt()
         
     def initialize_session_state(self):
         """Initialise l'état de la session avancée"""
@@ -30,14 +32,7 @@ class InsightBotUltimateChat:
         st.markdown("**Analysez vos données e-commerce en langage naturel avec l'IA**")
         
         # Métriques hero en temps réel
-        hero_kpis = self.bot.db.execute_query("""
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(Sales) as total_sales,
-                SUM(Profit) as total_profit,
-                (SUM(Profit) / SUM(Sales) * 100) as overall_margin
-            FROM merged
-        """).iloc[0]
+        hero_kpis = self.bot.db.get_kpis(['total_orders', 'total_sales', 'total_profit', 'overall_margin'])
         
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -114,32 +109,61 @@ class InsightBotUltimateChat:
         if discover_btn:
             self.trigger_discovery_mode()
     
+    def describe_stage(self, event):
+        """Position de la barre de progression et libellé pour une étape du pipeline"""
+        stage = event['stage']
+        if stage == 'sql_generated':
+            return 35, f"🧠 SQL généré ({event['seconds']:.1f}s)"
+        if stage == 'query_executed' and event.get('derived_from'):
+            return 60, f"♻️ Réponse calculée en mémoire depuis un résultat récent: {event['rows']:,} lignes"
+        if stage == 'query_executed':
+            return 60, f"📊 Requête exécutée: {event['rows']:,} lignes en {event['seconds'] * 1000:.0f} ms"
+        if stage == 'chart_built':
+            return 80, f"📈 Graphique prêt ({event['chart_type']})"
+        if stage == 'insight_ready':
+            return 100, "💡 Insight prêt"
+        if stage == 'cache_hit':
+            return 100, f"⚡ Réponse réutilisée ({event['similarity']:.0%} de similarité)"
+        if stage == 'sql_rejected':
+            return 100, "🛡️ Requête refusée par le garde-fou SQL"
+        return None
+    
     def process_question_with_animation(self, question):
-        """Traite une question avec des animations"""
-        # Animation de chargement
-        with st.spinner("🤖 InsightBot IA analyse en profondeur..."):
-            progress_bar = st.progress(0)
-            
-            for i in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(i + 1)
-            
-            result = self.bot.process_question(question)
-            
-            # Ajouter à l'historique
-            st.session_state.chat_history.append({
-                'question': question,
-                'result': result,
-                'timestamp': time.time()
-            })
+        """Traite une question en suivant la progression réelle du pipeline"""
+        progress_bar = st.progress(0, text="🤖 InsightBot IA analyse en profondeur...")
+        
+        def on_event(event):
+            progress = self.describe_stage(event)
+            if progress is not None:
+                progress_bar.progress(*progress)
+        
+        result = self.bot.prepare_answer(question, on_event=on_event)
+        
+        # Données et graphique affichés dès l'exécution SQL, puis insight en streaming
+        if result['insight'] is None:
+            self.stream_insight(result)
+        progress_bar.progress(100, text="✅ Analyse terminée!")
+        
+        # Ajouter à l'historique
+        st.session_state.chat_history.append(history_entry(question, result, timestamp=time.time()))
+        
+        st.rerun()
+    
+    def stream_insight(self, result):
+        """Affiche le graphique et les données, puis l'insight au fil de sa génération"""
+        with st.container(border=True):
+            st.markdown(f"**🤖 {result['question']}**")
+            if result['chart'] is not None:
+                st.plotly_chart(result['chart'].to_figure(), use_container_width=True)
+            st.dataframe(result['data'], use_container_width=True)
             
-            # Success animation
-            st.success("✅ Analyse terminée!")
-            time.sleep(0.5)
-            st.rerun()
+            st.markdown("💡 **Insight IA:**")
+            result['insight'] = st.write_stream(
+                self.bot.generate_insight_stream(result['question'], result['data'], result['sql_query'], result=result)
+            ).strip()
     
     def trigger_discovery_mode(self):
-        """Lance le mode découverte automatique"""
+        """Lance le mode découverte automatique (questions traitées en parallèle)"""
         st.session_state.discovery_mode = True
         
         discovery_questions = [
@@ -149,26 +173,40 @@ class InsightBotUltimateChat:
             "Quelles recommandations stratégiques proposes-tu?"
         ]
         
-        for question in discovery_questions:
-            result = self.bot.process_question(question)
-            st.session_state.chat_history.append({
-                'question': question,
-                'result': result,
-                'timestamp': time.time(),
-                'discovery': True
-            })
+        # Schéma et indicateurs globaux lus une seule fois pour toutes les questions
+        context = self.bot.discovery_context()
+        
+        progress_bar = st.progress(0, text=f"🎯 Découverte: 0/{len(discovery_questions)} analyses")
+        executor = get_discovery_executor()
+        futures = {
+            executor.submit(self.bot.process_question, question, None, context): question
+            for question in discovery_questions
+        }
+        
+        # Chaque analyse rejoint l'historique dès qu'elle est terminée
+        for done, future in enumerate(as_completed(futures), 1):
+            question = futures[future]
+            result = future.result()
+            st.session_state.chat_history.append(
+                history_entry(question, result, timestamp=time.time(), discovery=True)
+            )
+            
+            progress_bar.progress(
+                done / len(discovery_questions),
+                text=f"🎯 Découverte: {done}/{len(discovery_questions)} analyses"
+            )
+            st.success(f"🔍 **{question}** — {result['insight']}")
         
         st.rerun()
     
     def display_smart_chat_history(self):
-        """Affiche l'historique avec intelligence"""
-        if st.session_state.chat_history:
+        """Affiche l'historique avec intelligence (paginé, détails rendus à la demande)"""
+        history = st.session_state.chat_history
+        if history:
             st.subheader("📜 Historique Intelligent")
             
-            # Trier par timestamp
-            sorted_history = sorted(st.session_state.chat_history, key=lambda x: x['timestamp'], reverse=True)
-            
-            for i, chat in enumerate(sorted_history):
+            # L'historique est déjà chronologique: la page courante est lue à rebours
+            for i, chat in history_page(history):
                 # Style différent pour le mode découverte
                 if chat.get('discovery'):
                     emoji = "🔍"
@@ -177,7 +215,7 @@ class InsightBotUltimateChat:
                     emoji = "🤖" 
                     color = "secondary"
                 
-                with st.expander(f"{emoji} {chat['question']}", expanded=i==0):
+                with st.expander(f"{emoji} {chat['question']}", expanded=i == len(history) - 1):
                     result = chat['result']
                     
                     # Insight principal
@@ -192,28 +230,35 @@ class InsightBotUltimateChat:
                         st.code(f"SQL: {result['sql_query']}", language='sql')
                         st.text(f"Type de visualisation: {result['chart_type']}")
                     
+                    # Graphique, données et actions uniquement pour les entrées ouvertes
+                    if not show_details(i, history):
+                        continue
+                    
+                    payload = load_payload(result)
+                    data = payload['data']
+                    
                     # Visualisation
-                    if result['chart'] is not None:
-                        st.plotly_chart(result['chart'], use_container_width=True)
+                    display_chart(payload)
                     
                     # Données et actions
                     col1, col2 = st.columns([2, 1])
                     
                     with col1:
                         with st.expander("📋 Données détaillées"):
-                            if hasattr(result['data'], 'head'):
-                                st.dataframe(result['data'], use_container_width=True)
+                            if hasattr(data, 'head'):
+                                st.dataframe(data, use_container_width=True)
                                 
                                 # Statistiques automatiques
-                                if len(result['data']) > 1:
-                                    self.display_auto_insights(result['data'])
+                                if len(data) > 1:
+                                    self.display_auto_insights(data)
                             else:
-                                st.json(result['data'])
+                                st.json(data)
                     
                     with col2:
                         st.write("**📤 Actions**")
-                        if st.button("📊 Exporter CSV", key=f"export_{i}"):
-                            self.export_to_csv(result['data'], chat['question'])
+                        if data is not None:
+                            # Résultat complet: la requête affichée porte le LIMIT ajouté par le garde-fou
+                            export_controls(result.get('export_sql') or result['sql_query'], chat['question'], result['result_id'])
                         
                         if st.button("📈 Copier SQL", key=f"sql_{i}"):
                             st.code(result['sql_query'], language='sql')
@@ -243,13 +288,6 @@ class InsightBotUltimateChat:
                         f"{data.iloc[min_idx][main_col]:,.0f}"
                     )
     
-    def export_to_csv(self, data, question):
-        """Exporte les données en CSV"""
-        if hasattr(data, 'to_csv'):
-            filename = f"insightbot_{question[:20]}.csv".replace(' ', '_')
-            data.to_csv(filename, index=False)
-            st.success(f"✅ Exporté: {filename}")
-    
     def display_advanced_sidebar(self):
         """Sidebar avancé avec analytics"""
         st.sidebar.title("🧠 Tableau de Bord IA")
@@ -258,18 +296,34 @@ class InsightBotUltimateChat:
         st.sidebar.subheader("📊 Status Système")
         st.sidebar.metric("Analyses Effectuées", len(st.session_state.chat_history))
         st.sidebar.metric("Mode IA", "✅ Activé" if self.bot.gpt_enabled else "🔧 Basique")
+        if self.bot.gpt_enabled and self.bot.llm.status()['circuit'] != 'closed':
+            st.sidebar.error("⛔ API LLM indisponible - réponses en mode basique")
+        
+        # Mémoire des résultats (budgets par session et global, déversement sur disque)
+        memory = memory_status()
+        st.sidebar.metric(
+            "Mémoire Session",
+            f"{memory['session_bytes'] / 2 ** 20:.1f} Mo",
+            f"{memory['session_bytes'] / memory['session_budget']:.0%} du budget",
+            delta_color="off"
+        )
+        st.sidebar.metric(
+            "Mémoire Globale",
+            f"{memory['global_bytes'] / 2 ** 20:.1f} Mo",
+            f"{memory['global_bytes'] / memory['global_budget']:.0%} du budget",
+            delta_color="off"
+        )
+        st.sidebar.caption(
+            f"💾 {memory['on_disk']} résultat(s) sur disque ({memory['disk_bytes'] / 2 ** 20:.1f} Mo) · "
+            f"{memory['dropped']} régénéré(s) depuis SQL si rouverts"
+        )
         
         # Analytics avancés
         st.sidebar.subheader("📈 Analytics Avancés")
         
-        advanced_metrics = self.bot.db.execute_query("""
-            SELECT 
-                COUNT(DISTINCT "Product ID") as unique_products,
-                COUNT(DISTINCT Region) as unique_regions,
-                AVG(Profit_Margin_Percent) as avg_margin,
-                (SUM(CASE WHEN Profit > 100 THEN 1 ELSE 0 END) * 100.0 / COUNT(*)) as high_profit_rate
-            FROM merged
-        """).iloc[0]
+        advanced_metrics = self.bot.db.get_kpis(
+            ['unique_products', 'unique_regions', 'avg_margin', 'high_profit_rate']
+        )
         
         st.sidebar.metric("🛍️ Produits Uniques", f"{advanced_metrics['unique_products']:,}")
         st.sidebar.metric("🌍 Régions Couvertes", advanced_metrics['unique_regions'])
@@ -289,7 +343,7 @@ class InsightBotUltimateChat:
             st.rerun()
         
         if st.sidebar.button("🗑️ Reset Complet", use_container_width=True):
-            st.session_state.chat_history = []
+            clear_history()
             st.session_state.discovery_mode = False
             st.rerun()
     
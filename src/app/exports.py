@@ -0,0 +1,57 @@
+import streamlit as st
+from app.resources import get_export_service, get_export_executor
+from core.export_service import EXPORT_FORMATS
+
+FORMAT_LABELS = {
+    'csv': "CSV",
+    'csv.gz': "CSV compressé (gzip)",
+    'parquet': "Parquet"
+}
+
+@st.fragment(run_every=1)
+def wait_for_export(job):
+    """Attend la fin d'un export sans bloquer la session (seul ce fragment est relancé)"""
+    if job.done():
+        st.rerun()
+    st.caption("⏳ Export en cours...")
+
+def export_controls(sql, name, key):
+    """Choix du format, export complet en arrière-plan (COPY DuckDB) puis bouton de téléchargement"""
+    if 'exports' not in st.session_state:
+        st.session_state.exports = {}
+    exports = st.session_state.exports
+    
+    fmt = st.selectbox("Format", list(EXPORT_FORMATS), format_func=FORMAT_LABELS.get, key=f"export_format_{key}")
+    job_key = f"{key}:{fmt}"
+    
+    job = exports.get(job_key)
+    if job is None:
+        if not st.button("📤 Exporter", key=f"export_{key}"):
+            return
+        job = exports[job_key] = get_export_executor().submit(get_export_service().export, sql, fmt, name)
+    
+    if not job.done():
+        wait_for_export(job)
+        return
+    
+    try:
+        path, mime = job.result()
+    except Exception as e:
+        del exports[job_key]
+        st.error(f"❌ Export impossible: {e}")
+        return
+    
+    # Fichier supprimé par le nettoyage des exports expirés
+    if not path.exists():
+        del exports[job_key]
+        st.caption("⌛ Export expiré, relancez-le")
+        return
+    
+    # Fichier lu seulement au clic (callable): les reruns de la session ne le chargent pas en mémoire
+    st.download_button(
+        label=f"📥 Télécharger ({path.stat().st_size / 2 ** 20:.1f} Mo)",
+        data=path.read_bytes,
+        file_name=path.name,
+        mime=mime,
+        key=f"download_{job_key}"
+    )
@@ -0,0 +1,76 @@
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os
+import sys
+
+# Ajouter le chemin src
+current_dir = Path(__file__).parent
+src_path = current_dir.parent
+sys.path.append(str(src_path))
+
+from core.database_manager import DatabaseManager
+from core.llm_client import create_llm_client, load_environment
+
+# Ressources créées une seule fois par processus et partagées entre sessions et reruns.
+# La connexion DuckDB est partagée: chaque thread de session obtient son propre curseur.
+# Rien n'est ouvert ni importé d'avance: connexion, bots et modules lourds arrivent au premier usage.
+load_environment()
+
+@st.cache_resource(show_spinner=False)
+def get_database():
+    """Connexion DuckDB du processus (ouverte à la première requête)"""
+    return DatabaseManager()
+
+@st.cache_resource(show_spinner=False)
+def get_query_executor():
+    """Pool de threads borné pour les requêtes concurrentes (un curseur DuckDB par worker)"""
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv('INSIGHTBOT_QUERY_WORKERS', '4')),
+        thread_name_prefix='insightbot-query'
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_discovery_executor():
+    """Pool borné pour les questions du mode découverte (appels LLM + requête par question)"""
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv('INSIGHTBOT_DISCOVERY_WORKERS', '4')),
+        thread_name_prefix='insightbot-discovery'
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_export_executor():
+    """Pool borné pour les exports (COPY DuckDB), hors du thread de la session"""
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv('INSIGHTBOT_EXPORT_WORKERS', '2')),
+        thread_name_prefix='insightbot-export'
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_export_service():
+    """Service d'export vers la zone temporaire"""
+    from core.export_service import ExportService
+    return ExportService.from_env(get_database())
+
+@st.cache_resource(show_spinner=False)
+def get_result_store():
+    """Résultats d'historique de toutes les sessions, sous budget mémoire (déversement sur disque)"""
+    from core.result_store import ResultStore
+    return ResultStore.from_env(db=get_database())
+
+@st.cache_resource(show_spinner=False)
+def get_llm_client():
+    """Client LLM du processus (pool de connexions et limiteur de débit communs)"""
+    return create_llm_client()
+
+@st.cache_resource(show_spinner=False)
+def get_insightbot_ai():
+    """InsightBot à motifs, partagé"""
+    from core.insightbot_ai import InsightBotAI
+    return InsightBotAI(db=get_database())
+
+@st.cache_resource(show_spinner=False)
+def get_insightbot_gpt():
+    """InsightBot GPT, partagé (cache sémantique commun à toutes les sessions)"""
+    from core.insightbot_gpt import InsightBotGPT
+    return InsightBotGPT(db=get_database(), llm=get_llm_client())
@@ -1,7 +1,5 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from concurrent.futures import as_completed
 from pathlib import Path
 import sys
 import os
@@ -11,31 +9,86 @@ current_dir = Path(__file__).parent
 src_path = current_dir.parent
 sys.path.append(str(src_path))
 
-from core.database_manager import DatabaseManager
+from app.resources import get_database, get_query_executor
+from app.exports import export_controls
+from core.chart_reducer import ChartReducer
+
+# Indicateurs des cartes KPI (un seul scan partagé, voir DatabaseManager.get_kpis)
+DASHBOARD_KPIS = [
+    'total_orders', 'unique_customers', 'total_sales', 'avg_margin',
+    'total_profit', 'return_rate', 'profitable_rate', 'total_returns'
+]
+
+# Requêtes du tableau de bord (exécutées en parallèle à chaque affichage)
+DASHBOARD_QUERIES = {
+    'sales_by_region': """
+        SELECT Region, SUM(Sales) as total_sales
+        FROM merged
+        GROUP BY Region
+        ORDER BY total_sales DESC
+        LIMIT 10
+    """,
+    'sales_by_category': """
+        SELECT Category, SUM(Sales) as total_sales
+        FROM merged
+        GROUP BY Category
+        ORDER BY total_sales DESC
+    """,
+    'profit_by_category': """
+        SELECT Category, SUM(Profit) as total_profit
+        FROM merged
+        GROUP BY Category
+        ORDER BY total_profit DESC
+    """,
+    'profitability': """
+        SELECT
+            CASE
+                WHEN Profit > 0 THEN 'Profitable'
+                ELSE 'Non-Profitable'
+            END as profitability,
+            COUNT(*) as count
+        FROM merged
+        GROUP BY profitability
+    """,
+    'monthly': """
+        SELECT
+            Order_YearMonth,
+            SUM(Sales) as monthly_sales,
+            SUM(Profit) as monthly_profit
+        FROM merged
+        GROUP BY Order_YearMonth
+        ORDER BY Order_YearMonth
+    """,
+    'returns_by_market': """
+        SELECT
+            Market,
+            COUNT(*) as total_orders,
+            SUM(Is_Returned) as returned_orders,
+            (SUM(Is_Returned) * 100.0 / COUNT(*)) as return_rate
+        FROM merged
+        GROUP BY Market
+        ORDER BY return_rate DESC
+    """
+}
 
 class InsightBotApp:
     def __init__(self):
-        self.db = DatabaseManager()
-        self.db.connect()
+        self.db = get_database()
+        self.chart_reducer = ChartReducer.from_env(self.db)
+        
+        # Sections du tableau de bord, dans l'ordre d'affichage, avec les requêtes dont elles dépendent
+        self.sections = [
+            (self.display_kpi_cards, ['kpis']),
+            (self.display_sales_analysis, ['sales_by_region', 'sales_by_category']),
+            (self.display_profit_analysis, ['profit_by_category', 'profitability']),
+            (self.display_temporal_analysis, ['monthly']),
+            (self.display_returns_analysis, ['returns_by_market'])
+        ]
     
-    def display_kpi_cards(self):
+    def display_kpi_cards(self, kpis):
         """Affiche les cartes KPI"""
         st.subheader("📊 Tableau de Bord Global")
         
-        # KPIs depuis la base
-        kpi_query = """
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(Sales) as total_sales,
-                SUM(Profit) as total_profit,
-                AVG(Profit_Margin_Percent) as avg_margin,
-                SUM(Is_Returned) as total_returns,
-                COUNT(DISTINCT "Customer ID") as unique_customers
-            FROM merged
-        """
-        
-        kpis = self.db.execute_query(kpi_query).iloc[0]
-        
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
@@ -48,41 +101,24 @@ class InsightBotApp:
         
         with col3:
             st.metric("Profit Total", f"${kpis['total_profit']:,.0f}")
-            return_rate = (kpis['total_returns'] / kpis['total_orders']) * 100
-            st.metric("Taux Retour", f"{return_rate:.1f}%")
+            st.metric("Taux Retour", f"{kpis['return_rate']:.1f}%")
         
         with col4:
-            # Commandes profitables
-            profit_query = """
-                SELECT 
-                    SUM(CASE WHEN Profit > 0 THEN 1 ELSE 0 END) as profitable_orders,
-                    COUNT(*) as total_orders
-                FROM merged
-            """
-            profit_data = self.db.execute_query(profit_query).iloc[0]
-            profitable_rate = (profit_data['profitable_orders'] / profit_data['total_orders']) * 100
-            st.metric("Commandes Rentables", f"{profitable_rate:.1f}%")
+            st.metric("Commandes Rentables", f"{kpis['profitable_rate']:.1f}%")
             st.metric("Commandes Retournées", f"{kpis['total_returns']:,}")
     
-    def display_sales_analysis(self):
+    def display_sales_analysis(self, region_data, category_data):
         """Analyse des ventes"""
+        import plotly.express as px
+        
         st.subheader("📈 Analyse des Ventes")
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Ventes par région
-            query = """
-                SELECT Region, SUM(Sales) as total_sales
-                FROM merged 
-                GROUP BY Region 
-                ORDER BY total_sales DESC
-                LIMIT 10
-            """
-            data = self.db.execute_query(query)
-            
             fig = px.bar(
-                data,
+                region_data,
                 x='total_sales',
                 y='Region',
                 orientation='h',
@@ -93,40 +129,26 @@ class InsightBotApp:
         
         with col2:
             # Ventes par catégorie
-            query = """
-                SELECT Category, SUM(Sales) as total_sales
-                FROM merged 
-                GROUP BY Category 
-                ORDER BY total_sales DESC
-            """
-            data = self.db.execute_query(query)
-            
             fig = px.pie(
-                data,
+                category_data,
                 values='total_sales',
                 names='Category',
                 title="Répartition des Ventes par Catégorie"
             )
             st.plotly_chart(fig, use_container_width=True)
     
-    def display_profit_analysis(self):
+    def display_profit_analysis(self, category_data, profitability_data):
         """Analyse de profitabilité"""
+        import plotly.express as px
+        
         st.subheader("💰 Analyse de Profitabilité")
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Profit par catégorie
-            query = """
-                SELECT Category, SUM(Profit) as total_profit
-                FROM merged 
-                GROUP BY Category 
-                ORDER BY total_profit DESC
-            """
-            data = self.db.execute_query(query)
-            
             fig = px.bar(
-                data,
+                category_data,
                 x='Category',
                 y='total_profit',
                 title="Profit par Catégorie",
@@ -136,52 +158,34 @@ class InsightBotApp:
         
         with col2:
             # Commandes profitables vs non profitables
-            query = """
-                SELECT 
-                    CASE 
-                        WHEN Profit > 0 THEN 'Profitable' 
-                        ELSE 'Non-Profitable' 
-                    END as profitability,
-                    COUNT(*) as count
-                FROM merged 
-                GROUP BY profitability
-            """
-            data = self.db.execute_query(query)
-            
             fig = px.pie(
-                data,
+                profitability_data,
                 values='count',
                 names='profitability',
                 title="Répartition Profitabilité des Commandes"
             )
             st.plotly_chart(fig, use_container_width=True)
     
-    def display_temporal_analysis(self):
+    def display_temporal_analysis(self, data):
         """Analyse temporelle"""
+        import plotly.graph_objects as go
+        
         st.subheader("📅 Analyse Temporelle")
         
-        # Évolution mensuelle
-        query = """
-            SELECT 
-                Order_YearMonth,
-                SUM(Sales) as monthly_sales,
-                SUM(Profit) as monthly_profit
-            FROM merged 
-            GROUP BY Order_YearMonth
-            ORDER BY Order_YearMonth
-        """
-        data = self.db.execute_query(query)
+        # Évolution mensuelle (série réduite si elle dépasse le seuil de points)
+        data = self.chart_reducer.reduce(data, 'Order_YearMonth', ['monthly_sales', 'monthly_profit'])
+        trace = self.chart_reducer.trace_class(len(data))
         
         fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=data['Order_YearMonth'].astype(str), 
+        fig.add_trace(trace(
+            x=data['Order_YearMonth'].astype(str),
             y=data['monthly_sales'],
             mode='lines+markers',
             name='Ventes Mensuelles',
             line=dict(color='blue')
         ))
-        fig.add_trace(go.Scatter(
-            x=data['Order_YearMonth'].astype(str), 
+        fig.add_trace(trace(
+            x=data['Order_YearMonth'].astype(str),
             y=data['monthly_profit'],
             mode='lines+markers',
             name='Profit Mensuel',
@@ -194,21 +198,11 @@ class InsightBotApp:
         )
         st.plotly_chart(fig, use_container_width=True)
     
-    def display_returns_analysis(self):
+    def display_returns_analysis(self, data):
         """Analyse des retours"""
-        st.subheader("🔙 Analyse des Retours")
+        import plotly.express as px
         
-        query = """
-            SELECT 
-                Market,
-                COUNT(*) as total_orders,
-                SUM(Is_Returned) as returned_orders,
-                (SUM(Is_Returned) * 100.0 / COUNT(*)) as return_rate
-            FROM merged
-            GROUP BY Market
-            ORDER BY return_rate DESC
-        """
-        data = self.db.execute_query(query)
+        st.subheader("🔙 Analyse des Retours")
         
         col1, col2 = st.columns(2)
         
@@ -231,6 +225,43 @@ class InsightBotApp:
             )
             st.plotly_chart(fig, use_container_width=True)
     
+    def display_data_explorer(self, placeholder, data, table):
+        """Affiche l'extrait de table demandé dans l'explorateur"""
+        with placeholder.container():
+            st.dataframe(data, use_container_width=True)
+            
+            # Téléchargement de la table complète (et pas seulement de l'aperçu)
+            export_controls(f"SELECT * FROM {table}", f"{table}_data", f"explorer_{table}")
+    
+    def run_dashboard(self, explorer_query=None):
+        """Lance toutes les requêtes en parallèle et affiche chaque section dès que ses données sont prêtes.
+        
+        Retourne le résultat de explorer_query (exécutée dans le même lot).
+        """
+        # Un emplacement par section, pour conserver l'ordre d'affichage
+        placeholders = [st.empty() for _ in self.sections]
+        rendered = [False] * len(self.sections)
+        
+        queries = dict(DASHBOARD_QUERIES)
+        if explorer_query is not None:
+            queries['explorer'] = explorer_query
+        
+        executor = get_query_executor()
+        futures = {executor.submit(self.db.execute_query, sql): name for name, sql in queries.items()}
+        futures[executor.submit(self.db.get_kpis, DASHBOARD_KPIS)] = 'kpis'
+        
+        results = {}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            
+            for i, (display, names) in enumerate(self.sections):
+                if not rendered[i] and all(name in results for name in names):
+                    with placeholders[i].container():
+                        display(*[results[name] for name in names])
+                    rendered[i] = True
+        
+        return results.get('explorer')
+    
     def run(self):
         """Lance l'application Streamlit"""
         st.set_page_config(
@@ -243,14 +274,8 @@ class InsightBotApp:
         st.markdown("**Global Superstore 2016 - Données Nettoyées et Optimisées**")
         st.markdown("---")
         
-        # Tableau de bord
-        self.display_kpi_cards()
-        
-        # Analyses
-        self.display_sales_analysis()
-        self.display_profit_analysis()
-        self.display_temporal_analysis()
-        self.display_returns_analysis()
+        # Tableau de bord et analyses (emplacements réservés en haut de page)
+        dashboard = st.container()
         
         # Données brutes
         with st.expander("📋 Explorer les Données Brutes"):
@@ -259,22 +284,16 @@ class InsightBotApp:
                 limit = st.slider("Nombre de lignes", 10, 1000, 100)
             with col2:
                 table = st.selectbox("Table", ["merged", "orders", "returns", "peoples"])
-            
-            data = self.db.execute_query(f"SELECT * FROM {table} LIMIT {limit}")
-            st.dataframe(data, use_container_width=True)
-            
-            # Téléchargement
-            csv = data.to_csv(index=False)
-            st.download_button(
-                label="📥 Télécharger les données (CSV)",
-                data=csv,
-                file_name=f"{table}_data.csv",
-                mime="text/csv"
-            )
+            explorer = st.empty()
+        
+        with dashboard:
+            data = self.run_dashboard(f"SELECT * FROM {table} LIMIT {limit}")
+        
+        self.display_data_explorer(explorer, data, table)
 
 def main():
     app = InsightBotApp()
     app.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le chemin src
+current_dir = Path(__file__).parent
+src_path = current_dir.parent
+sys.path.append(str(src_path))
+
+def read_questions(path):
+    """Questions d'un fichier JSONL: {"question": ..., ...} ou une chaîne JSON par ligne"""
+    items = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {'question': item}
+            if not (item.get('question') or "").strip():
+                raise ValueError(f"{path}:{line_number}: champ 'question' manquant")
+            items.append(item)
+    return items
+
+def write_results(items, results, output_dir):
+    """Écrit results.jsonl, les données en Parquet et les graphiques en JSON.
+    
+    Les questions qui partagent un résultat (doublons) pointent vers les mêmes fichiers.
+    """
+    import pandas as pd
+    
+    output_dir = Path(output_dir)
+    (output_dir / "data").mkdir(parents=True, exist_ok=True)
+    (output_dir / "charts").mkdir(parents=True, exist_ok=True)
+    
+    written = {}
+    with open(output_dir / "results.jsonl", 'w', encoding='utf-8') as f:
+        for item, result in zip(items, results):
+            data = result.get('data')
+            rows = 0 if data is None else (len(data) if hasattr(data, '__len__') else 1)
+            files = {'data_file': None, 'chart_file': None}
+            if data is not None:
+                if id(data) not in written:
+                    key = result.get('sql_query') or result['question']
+                    name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+                    frame = data
+                    if isinstance(data, pd.Series):
+                        frame = data.to_frame().T
+                    elif not isinstance(data, pd.DataFrame):
+                        frame = pd.DataFrame({'value': [data]})
+                    frame.to_parquet(output_dir / "data" / f"{name}.parquet", compression='zstd', index=False)
+                    files['data_file'] = f"data/{name}.parquet"
+                    
+                    chart = result.get('chart')
+                    if chart is not None:
+                        (output_dir / "charts" / f"{name}.json").write_text(chart.to_json(), encoding='utf-8')
+                        files['chart_file'] = f"charts/{name}.json"
+                    written[id(data)] = files
+                files = written[id(data)]
+            
+            record = {
+                **item,
+                'insight': result.get('insight'),
+                'sql_query': result.get('sql_query'),
+                'chart_type': result.get('chart_type'),
+                'rows': rows,
+                'duplicate_of': result.get('duplicate_of'),
+                'cached_from': result.get('cached_from'),
+                'derived_from': result.get('derived_from'),
+                **files
+            }
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    
+    return output_dir / "results.jsonl"
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapport planifié: répond à un lot de questions lues dans un fichier JSONL")
+    parser.add_argument('--input', required=True, help="Fichier JSONL de questions")
+    parser.add_argument('--output', required=True, help="Répertoire de sortie (results.jsonl, data/, charts/)")
+    parser.add_argument('--engine', choices=['gpt', 'ai'], default='gpt')
+    parser.add_argument('--workers', type=int, help="Requêtes DuckDB en parallèle (défaut: INSIGHTBOT_BATCH_WORKERS ou 4)")
+    parser.add_argument('--stub-llm', action='store_true', help="Démarre le serveur LLM factice (aucun service externe)")
+    args = parser.parse_args()
+    
+    from core.llm_client import load_environment
+    load_environment()
+    
+    if args.stub_llm:
+        from core.llm_stub_server import start_stub_server
+        stub = start_stub_server()
+        os.environ['OPENAI_BASE_URL'] = stub.base_url
+        os.environ['OPENAI_API_KEY'] = "stub"
+    
+    items = read_questions(args.input)
+    questions = [item['question'] for item in items]
+    print(f"📥 {len(questions)} questions lues dans {args.input}")
+    
+    start = time.perf_counter()
+    if args.engine == 'ai':
+        from core.insightbot_ai import InsightBotAI
+        results = InsightBotAI().process_questions(questions, args.workers or int(os.getenv('INSIGHTBOT_BATCH_WORKERS', '4')))
+    else:
+        from core.insightbot_gpt import InsightBotGPT
+        results = InsightBotGPT().process_questions(questions, args.workers)
+    
+    path = write_results(items, results, args.output)
+    print(f"💾 {len(results)} résultats écrits dans {path} ({time.perf_counter() - start:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import psutil
+
+# Ajouter le chemin src
+current_dir = Path(__file__).parent
+src_path = current_dir.parent
+sys.path.append(str(src_path))
+
+# Mélange de questions (type, question, poids)
+QUESTION_MIX = [
+    ('ventes_region', "Quelles sont les ventes par région?", 3),
+    ('profit_categorie', "Quel est le profit par catégorie?", 3),
+    ('evolution_ventes', "Comment évoluent les ventes dans le temps?", 2),
+    ('clients_fideles', "Quels sont les clients les plus fidèles?", 1),
+    ('segments', "Quels segments clients sont les plus rentables?", 1),
+    ('chiffre_affaires', "Quel est le chiffre d'affaires total?", 1)
+]
+
+class ResourceMonitor(threading.Thread):
+    """Échantillonne CPU et mémoire du processus pendant un palier"""
+    
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process()
+        self.cpu = []
+        self.rss = []
+        self._stopped = threading.Event()
+    
+    def run(self):
+        self.process.cpu_percent(None)
+        while not self._stopped.wait(self.interval):
+            self.cpu.append(self.process.cpu_percent(None))
+            self.rss.append(self.process.memory_info().rss)
+    
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return {
+            'cpu_percent_avg': float(np.mean(self.cpu)) if self.cpu else 0.0,
+            'cpu_percent_max': float(np.max(self.cpu)) if self.cpu else 0.0,
+            'rss_mb_peak': max(self.rss, default=self.process.memory_info().rss) / 2 ** 20
+        }
+
+def build_tasks(bot, dashboard_queries, dashboard_kpis, n_requests, dashboard_ratio, seed=0, kpi_cache=False):
+    """Liste tirée au sort de (type, fonction) respectant le mélange demandé.
+    
+    Sans kpi_cache, chaque carte KPI relance le scan: après le premier appel,
+    get_kpis ne mesurerait sinon que la lecture de son cache en mémoire.
+    """
+    rng = random.Random(seed)
+    questions = [(f"question:{kind}", question) for kind, question, _ in QUESTION_MIX]
+    weights = [weight for _, _, weight in QUESTION_MIX]
+    dashboard = [(f"dashboard:{name}", sql) for name, sql in dashboard_queries.items()]
+    
+    def kpis():
+        if not kpi_cache:
+            bot.db.clear_kpi_cache()
+        return bot.db.get_kpis(dashboard_kpis)
+    
+    tasks = []
+    for _ in range(n_requests):
+        if dashboard and rng.random() < dashboard_ratio:
+            # Les cartes KPI sont une section du tableau de bord comme les autres
+            if rng.random() < 1 / (len(dashboard) + 1):
+                tasks.append(("dashboard:kpis", kpis))
+            else:
+                kind, sql = rng.choice(dashboard)
+                tasks.append((kind, lambda sql=sql: bot.db.execute_query(sql)))
+        else:
+            kind, question = rng.choices(questions, weights)[0]
+            tasks.append((kind, lambda question=question: bot.process_question(question)))
+    return tasks
+
+def run_level(tasks, concurrency):
+    """Exécute les tâches avec `concurrency` workers; retourne mesures par type et par worker"""
+    queue = list(reversed(tasks))
+    lock = threading.Lock()
+    samples = []
+    workers = {}
+    
+    def worker():
+        name = threading.current_thread().name
+        cpu_start = time.thread_time()
+        count = 0
+        while True:
+            with lock:
+                if not queue:
+                    break
+                kind, task = queue.pop()
+            
+            start = time.perf_counter()
+            error = None
+            try:
+                result = task()
+                # Réponse vide (aucune donnée ou requête refusée) comptée à part
+                if result is None or (isinstance(result, dict) and result.get('data') is None):
+                    error = 'empty'
+            except Exception as e:
+                error = type(e).__name__
+            samples.append((kind, time.perf_counter() - start, error))
+            count += 1
+        
+        workers[name] = {'requests': count, 'cpu_seconds': time.thread_time() - cpu_start}
+    
+    monitor = ResourceMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load') as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - start
+    resources = monitor.stop()
+    
+    return samples, workers, elapsed, resources
+
+def summarize(samples, elapsed):
+    """Débit, percentiles de latence et taux d'erreur par type de requête"""
+    report = {}
+    kinds = sorted({kind for kind, _, _ in samples})
+    for kind in kinds + ['TOTAL']:
+        selected = [s for s in samples if kind == 'TOTAL' or s[0] == kind]
+        latencies = np.array([latency for _, latency, _ in selected]) * 1000
+        errors = sum(1 for *_, error in selected if error not in (None, 'empty'))
+        empty = sum(1 for *_, error in selected if error == 'empty')
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        report[kind] = {
+            'requests': len(selected),
+            'throughput': len(selected) / elapsed,
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'error_rate': errors / len(selected),
+            'empty_rate': empty / len(selected)
+        }
+    return report
+
+def print_report(concurrency, report, workers, elapsed, resources, llm_status):
+    print(f"\n👥 CONCURRENCE {concurrency}  ({elapsed:.1f}s)")
+    print(f"   {'type':<30} {'n':>5} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6} {'vide%':>6}")
+    for kind, stats in report.items():
+        print(
+            f"   {kind:<30} {stats['requests']:>5} {stats['throughput']:>7.1f} "
+            f"{stats['p50_ms']:>7.0f}ms {stats['p95_ms']:>6.0f}ms {stats['p99_ms']:>6.0f}ms "
+            f"{stats['error_rate'] * 100:>5.1f}% {stats['empty_rate'] * 100:>5.1f}%"
+        )
+    print(
+        f"   Processus: CPU moyen {resources['cpu_percent_avg']:.0f}% (max {resources['cpu_percent_max']:.0f}%), "
+        f"RSS max {resources['rss_mb_peak']:.0f} Mo | LLM: {llm_status}"
+    )
+    for name, stats in sorted(workers.items()):
+        print(f"   {name}: {stats['requests']} requêtes, CPU {stats['cpu_seconds']:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de InsightBotGPT et des requêtes du tableau de bord")
+    parser.add_argument('--concurrency', default="1,4,8,16", help="Paliers de concurrence, ex: 1,4,16")
+    parser.add_argument('--requests', type=int, default=200, help="Requêtes par palier")
+    parser.add_argument('--dashboard-ratio', type=float, default=0.3, help="Part des requêtes du tableau de bord")
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="Latence du LLM factice (s)")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help="Proportion de 429 du LLM factice")
+    parser.add_argument('--semantic-cache', action='store_true', help="Garder le cache sémantique (désactivé par défaut)")
+    parser.add_argument('--kpi-cache', action='store_true', help="Garder le cache des KPI (chaque carte relance le scan par défaut)")
+    parser.add_argument('--json', help="Écrit le rapport complet dans ce fichier")
+    args = parser.parse_args()
+    
+    # LLM factice local: aucun appel externe, latence et erreurs contrôlées
+    from core.llm_stub_server import start_stub_server
+    stub = start_stub_server(latency=args.llm_latency, error_rate=args.llm_error_rate)
+    os.environ['OPENAI_BASE_URL'] = stub.base_url
+    os.environ['OPENAI_API_KEY'] = "stub"
+    os.environ.pop('INSIGHTBOT_LLM_CASSETTE', None)
+    
+    from core.insightbot_gpt import InsightBotGPT
+    from app.streamlit_app import DASHBOARD_QUERIES, DASHBOARD_KPIS
+    
+    bot = InsightBotGPT()
+    bot.semantic_cache.enabled = args.semantic_cache
+    full_report = {}
+    for concurrency in [int(level) for level in args.concurrency.split(',')]:
+        # Chaque palier repart de caches vides
+        bot.semantic_cache.clear()
+        bot.db.clear_kpi_cache()
+        
+        tasks = build_tasks(bot, DASHBOARD_QUERIES, DASHBOARD_KPIS, args.requests, args.dashboard_ratio,
+                            kpi_cache=args.kpi_cache)
+        samples, workers, elapsed, resources = run_level(tasks, concurrency)
+        report = summarize(samples, elapsed)
+        print_report(concurrency, report, workers, elapsed, resources, bot.llm.status())
+        full_report[concurrency] = {'types': report, 'workers': workers, 'resources': resources, 'seconds': elapsed}
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(full_report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Rapport: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le chemin src
+current_dir = Path(__file__).parent
+src_path = current_dir.parent
+sys.path.append(str(src_path))
+
+DEFAULT_QUESTIONS = [
+    "Quelles sont les ventes par région?",
+    "Quel est le profit par catégorie?",
+    "Comment évoluent les ventes dans le temps?",
+    "Quels sont les clients les plus fidèles?"
+]
+
+def run_benchmark(bot, questions, repeat=3):
+    """Chronomètre process_question pour chaque question (cache sémantique vidé à chaque passe)"""
+    timings = {question: [] for question in questions}
+    
+    for _ in range(repeat):
+        bot.semantic_cache.clear()
+        for question in questions:
+            start = time.perf_counter()
+            bot.process_question(question)
+            timings[question].append(time.perf_counter() - start)
+    
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de bout en bout de InsightBotGPT.process_question")
+    parser.add_argument('--cassette', help="Cassette LLM à enregistrer ou rejouer")
+    parser.add_argument('--mode', choices=['record', 'replay'], default='replay')
+    parser.add_argument('--latency', default='0', help="Latence simulée en replay (s) ou 'recorded'")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    if args.cassette:
+        os.environ['INSIGHTBOT_LLM_CASSETTE'] = args.cassette
+        os.environ['INSIGHTBOT_LLM_MODE'] = args.mode
+        os.environ['INSIGHTBOT_LLM_REPLAY_LATENCY'] = args.latency
+    
+    from core.insightbot_gpt import InsightBotGPT
+    
+    bot = InsightBotGPT()
+    # Une seule passe suffit pour enregistrer la cassette
+    repeat = 1 if args.mode == 'record' else args.repeat
+    timings = run_benchmark(bot, DEFAULT_QUESTIONS, repeat)
+    
+    print(f"\n⏱️  BENCHMARK PIPELINE ({repeat} passe(s))")
+    for question, values in timings.items():
+        print(f"   {statistics.median(values) * 1000:8.1f} ms  (min {min(values) * 1000:.1f})  {question}")
+    print(f"   LLM: {bot.llm.status()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter le chemin src
+current_dir = Path(__file__).parent
+src_path = current_dir.parent
+sys.path.append(str(src_path))
+
+# Démarrages mesurés, chacun dans un interpréteur neuf: du lancement de Python au service prêt (aucune question posée)
+SCENARIOS = {
+    'core': "import core.insightbot_gpt, core.insightbot_ai",
+    'cli': "import batch.batch_report; from core.insightbot_gpt import InsightBotGPT; InsightBotGPT()",
+    'api': "import api.server as server; server.make_app(server.InsightBotService())"
+}
+
+# Budget de démarrage à froid (ms, médiane); le benchmark échoue au-delà
+DEFAULT_BUDGETS = {'core': 150, 'cli': 250, 'api': 400}
+
+# Dépendances lourdes qui ne doivent être importées qu'au premier usage
+HEAVY_MODULES = ['pandas', 'numpy', 'sqlglot', 'duckdb', 'plotly', 'requests', 'pyarrow']
+
+def parse_importtime(stderr):
+    """Lignes de « python -X importtime »: [(module, self µs, cumulé µs, profondeur)]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+def run_scenario(code, cwd):
+    """(durée totale en s, entrées importtime) d'un démarrage à froid"""
+    # La vérification des modules lourds s'exécute après le démarrage mesuré
+    probe = f"{code}\nimport sys\nprint('heavy:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = {**os.environ, 'PYTHONPATH': str(src_path), 'PYTHONDONTWRITEBYTECODE': '1'}
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    marker = [line for line in completed.stdout.splitlines() if line.startswith('heavy:')][-1]
+    heavy = [m for m in marker[len('heavy:'):].split(',') if m]
+    return elapsed, parse_importtime(completed.stderr), heavy
+
+def summarize(name, code, runs, budget, top=8):
+    """Médiane des démarrages, modules de premier niveau les plus coûteux et verdict du budget"""
+    timings = [elapsed for elapsed, _, _ in runs]
+    _, entries, heavy = runs[-1]
+    top_level = sorted((e for e in entries if e[3] == 0), key=lambda e: e[2], reverse=True)
+    median_ms = statistics.median(timings) * 1000
+    return {
+        'scenario': name,
+        'code': code,
+        'median_ms': round(median_ms, 1),
+        'min_ms': round(min(timings) * 1000, 1),
+        'import_ms': round(sum(e[2] for e in entries if e[3] == 0) / 1000, 1),
+        'budget_ms': budget,
+        'within_budget': budget is None or median_ms <= budget,
+        'heavy_modules': heavy,
+        'top_imports': [{'module': e[0], 'cumulative_ms': round(e[2] / 1000, 1)} for e in top_level[:top]]
+    }
+
+def print_report(report):
+    status = "✅" if report['within_budget'] else "❌"
+    budget = f"budget {report['budget_ms']} ms" if report['budget_ms'] is not None else "sans budget"
+    print(f"\n{status} {report['scenario'].upper()}: {report['median_ms']:.0f} ms (min {report['min_ms']:.0f}, {budget})")
+    print(f"   Imports: {report['import_ms']:.0f} ms | modules lourds chargés: {', '.join(report['heavy_modules']) or 'aucun'}")
+    for entry in report['top_imports']:
+        print(f"   {entry['cumulative_ms']:8.1f} ms  {entry['module']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage à froid (python -X importtime) des chemins CLI et API")
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS), help="Scénarios mesurés, ex: cli,api")
+    parser.add_argument('--repeat', type=int, default=5, help="Démarrages par scénario (médiane)")
+    parser.add_argument('--budget', default="", help="Budgets en ms remplaçant les défauts, ex: cli=300,api=500")
+    parser.add_argument('--json', help="Écrit le rapport complet dans ce fichier")
+    args = parser.parse_args()
+    
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in filter(None, args.budget.split(',')):
+        name, value = item.split('=')
+        budgets[name.strip()] = float(value)
+    
+    reports = []
+    # Répertoire de travail vide: DatabaseManager y crée son arborescence, aucune base n'est ouverte
+    with tempfile.TemporaryDirectory(prefix="insightbot-startup-") as cwd:
+        for name in args.scenarios.split(','):
+            code = SCENARIOS[name]
+            # Un premier lancement remplit le cache disque de l'OS, il n'est pas compté
+            run_scenario(code, cwd)
+            runs = [run_scenario(code, cwd) for _ in range(args.repeat)]
+            reports.append(summarize(name, code, runs, budgets.get(name)))
+            print_report(reports[-1])
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'reports': reports}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Rapport: {args.json}")
+    
+    over_budget = [report['scenario'] for report in reports if not report['within_budget']]
+    if over_budget:
+        print(f"\n❌ Budget de démarrage dépassé: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import gzip
+import pickle
+import threading
+import time
+from pathlib import Path
+from core.chart_spec import ChartSpec
+
+SNAPSHOT_FILE = "answer_snapshot.pkl.gz"
+
+def freeze_result(result):
+    """Résultat sérialisable: le graphique est remplacé par le JSON de sa figure"""
+    frozen = dict(result)
+    chart = frozen.pop('chart', None)
+    frozen['chart_json'] = chart.to_json() if chart is not None else None
+    return frozen
+
+class AnswerSnapshot:
+    """Réponses précalculées (intentions intégrées, questions suggérées) liées à une version des données.
+    
+    Écrit après create_tables par build_snapshot; un nouveau processus le relit
+    au démarrage et répond à ces questions sans requête ni construction de
+    graphique. Les figures sont reconstruites depuis leur JSON à la première
+    demande seulement.
+    """
+    
+    def __init__(self, version, answers=None, created=None):
+        self.version = version
+        # moteur ('ai', 'gpt') -> clé -> résultat figé
+        self.answers = answers or {}
+        self.created = created or time.time()
+        self._figures = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def default_path(db):
+        return Path(os.getenv('INSIGHTBOT_SNAPSHOT_PATH') or Path(db.db_path).parent / SNAPSHOT_FILE)
+    
+    @staticmethod
+    def question_key(question):
+        """Clé d'une question: texte normalisé (casse, accents, mots outils, synonymes)"""
+        from core.semantic_cache import normalize_question
+        return normalize_question(question)
+    
+    @classmethod
+    def load(cls, db, path=None):
+        """Snapshot de la version courante des données, ou None (absent, obsolète, désactivé)"""
+        if os.getenv('INSIGHTBOT_SNAPSHOT', '1') == '0':
+            return None
+        path = Path(path or cls.default_path(db))
+        if not path.exists():
+            return None
+        
+        start = time.perf_counter()
+        try:
+            with gzip.open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️  Snapshot illisible ({path.name}): {e}")
+            return None
+        
+        if payload.get('version') != db.get_data_version():
+            print(f"⚠️  Snapshot obsolète ({path.name}): données modifiées depuis sa création")
+            return None
+        
+        snapshot = cls(payload['version'], payload['answers'], payload.get('created'))
+        count = sum(len(answers) for answers in snapshot.answers.values())
+        print(f"⚡ Snapshot chargé: {count} réponses précalculées ({time.perf_counter() - start:.2f}s)")
+        return snapshot
+    
+    def save(self, path):
+        """Écrit le snapshot (fichier temporaire puis renommage: les lecteurs ne voient jamais un fichier partiel)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp_path, 'wb') as f:
+            pickle.dump({'version': self.version, 'created': self.created, 'answers': self.answers}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path
+    
+    def add(self, engine, key, result):
+        self.answers.setdefault(engine, {})[key] = freeze_result(result)
+    
+    def get(self, engine, key, question=None):
+        """Réponse précalculée (graphique partagé, figure relue depuis le JSON au premier rendu), ou None"""
+        frozen = self.answers.get(engine, {}).get(key)
+        if frozen is None:
+            return None
+        
+        result = dict(frozen)
+        chart_json = result.pop('chart_json')
+        if chart_json:
+            with self._lock:
+                if (engine, key) not in self._figures:
+                    self._figures[(engine, key)] = ChartSpec.from_json(chart_json)
+            result['chart'] = self._figures[(engine, key)]
+        else:
+            result['chart'] = None
+        if question is not None:
+            result['question'] = question
+        result['from_snapshot'] = True
+        return result
+
+def build_snapshot(db, path=None, engines=('ai',)):
+    """Précalcule les réponses des intentions intégrées et des questions suggérées puis écrit le snapshot.
+    
+    Le moteur 'gpt' est facultatif: il appelle le LLM (SQL puis insight) pour
+    chaque question suggérée, avec le coût et la latence correspondants.
+    """
+    from core.insightbot_ai import InsightBotAI
+    from core.insightbot_gpt import InsightBotGPT
+    
+    start = time.perf_counter()
+    snapshot = AnswerSnapshot(db.get_data_version())
+    
+    if 'ai' in engines:
+        bot = InsightBotAI(db=db, snapshot=False)
+        # Une réponse par intention (sans filtre), retrouvée quelle que soit la formulation
+        for name, handler in list(bot.intent_router.intents.items()) + [('general', bot._general_analysis)]:
+            probe = name.replace('_', ' ')
+            if not bot.slot_extractor.extract(probe):
+                snapshot.add('ai', bot.snapshot_key(handler), handler(probe))
+        for question in bot.get_suggested_questions():
+            result = bot.process_question(question)
+            snapshot.add('ai', AnswerSnapshot.question_key(question), result)
+    
+    if 'gpt' in engines:
+        bot = InsightBotGPT(db=db, snapshot=False)
+        for question in bot.get_suggested_questions():
+            result = bot.process_question(question)
+            if result.get('data') is not None:
+                snapshot.add('gpt', AnswerSnapshot.question_key(question), result)
+    
+    path = snapshot.save(path or AnswerSnapshot.default_path(db))
+    count = sum(len(answers) for answers in snapshot.answers.values())
+    print(f"💾 Snapshot: {count} réponses précalculées dans {path} ({time.perf_counter() - start:.1f}s)")
+    return path
@@ -0,0 +1,190 @@
+import os
+import numpy as np
+import pandas as pd
+from sqlglot import exp
+from core.sql_guard import SQLGuard, SQLGuardError
+
+# Périodes d'agrégation proposées à DuckDB, de la plus fine à la plus large (durée en jours)
+TIME_BUCKETS = [('week', 7), ('month', 30.44), ('quarter', 91.31), ('year', 365.25)]
+
+BUCKET_LABELS = {'week': "semaine", 'month': "mois", 'quarter': "trimestre", 'year': "année"}
+
+def _numeric_axis(values):
+    """Axe x numérique pour le calcul des aires (dates en nanosecondes, positions sinon)"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=float)
+    return np.arange(len(values), dtype=float)
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices des n_out points qui préservent la forme de la série"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    y = np.nan_to_num(y)
+    # n_out - 2 seaux entre le premier et le dernier point (conservés)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        # Aire du triangle (point retenu précédent, candidat, moyenne du seau suivant)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    
+    return indices
+
+def minmax_indices(y, n_out):
+    """Min et max de chaque seau: conserve les pics (n_out / 2 seaux)"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    
+    y = np.where(np.isnan(y), np.nanmean(y), y)
+    edges = np.linspace(0, n, max(1, n_out // 2) + 1).astype(int)
+    indices = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            indices.append(start + int(np.argmin(y[start:end])))
+            indices.append(start + int(np.argmax(y[start:end])))
+    return np.unique(indices)
+
+class ChartReducer:
+    """Réduit les séries trop longues avant Plotly: agrégation SQL plus grossière, LTTB/min-max, WebGL"""
+    
+    def __init__(self, db=None, max_points=2000, max_scatter_points=20000, webgl_threshold=1000, method='lttb'):
+        if method not in ('lttb', 'minmax'):
+            raise ValueError(f"Méthode de réduction inconnue: {method}")
+        self.db = db
+        self.guard = SQLGuard(db) if db is not None else None
+        # Points par série au-delà desquels une courbe est réduite
+        self.max_points = max_points
+        # Les nuages de points restent lisibles plus longtemps (rendus en WebGL)
+        self.max_scatter_points = max_scatter_points
+        self.webgl_threshold = webgl_threshold
+        self.method = method
+    
+    @classmethod
+    def from_env(cls, db=None):
+        return cls(
+            db=db,
+            max_points=int(os.getenv('INSIGHTBOT_CHART_MAX_POINTS', '2000')),
+            max_scatter_points=int(os.getenv('INSIGHTBOT_CHART_MAX_SCATTER_POINTS', '20000')),
+            webgl_threshold=int(os.getenv('INSIGHTBOT_CHART_WEBGL_THRESHOLD', '1000')),
+            method=os.getenv('INSIGHTBOT_CHART_DOWNSAMPLING', 'lttb')
+        )
+    
+    def reduce(self, data, x, y_columns, max_points=None):
+        """Lignes conservées pour tracer y_columns en fonction de x (union des points retenus par série)"""
+        max_points = max_points or self.max_points
+        if len(data) <= max_points:
+            return data
+        
+        # Les seaux supposent un axe x ordonné
+        if pd.api.types.is_datetime64_any_dtype(data[x]) or pd.api.types.is_numeric_dtype(data[x]):
+            data = data.sort_values(x, kind='stable')
+        x_values = _numeric_axis(data[x])
+        
+        keep = set()
+        for column in y_columns:
+            y_values = data[column].to_numpy(dtype=float)
+            if self.method == 'minmax':
+                keep.update(minmax_indices(y_values, max_points).tolist())
+            else:
+                keep.update(lttb_indices(x_values, y_values, max_points).tolist())
+        
+        print(f"📉 Série réduite: {len(data):,} → {len(keep):,} points ({self.method})")
+        return data.iloc[sorted(keep)]
+    
+    def bucket_query(self, sql_query, data, x, y_columns):
+        """Requête ré-agrégée par période plus large, si les mesures sont additives (sinon None).
+        
+        sql_query est la requête avant le LIMIT du garde-fou (voir SQLGuard.bound):
+        un LIMIT qu'elle contient a été demandé et borne aussi la série agrégée.
+        """
+        if self.guard is None or not sql_query or not pd.api.types.is_datetime64_any_dtype(data[x]):
+            return None
+        
+        try:
+            statement = self.guard.parse(sql_query)
+        except SQLGuardError:
+            return None
+        if not isinstance(statement, exp.Select):
+            return None
+        
+        # Seules les sommes et comptages peuvent être ré-additionnés par période
+        projections = {p.alias_or_name: p.unalias() for p in statement.selects}
+        if not all(isinstance(projections.get(c), (exp.Sum, exp.Count)) for c in y_columns):
+            return None
+        
+        # Étendue lue sur le résultat complet (data peut n'en être que le début)
+        source = statement.sql(dialect='duckdb')
+        bounds = self.db.execute_query(f'SELECT MIN("{x}") AS low, MAX("{x}") AS high FROM ({source})')
+        if bounds is None or bounds['low'].isna().any():
+            return None
+        span_days = (bounds['high'].iloc[0] - bounds['low'].iloc[0]).days
+        for bucket, days in TIME_BUCKETS:
+            if span_days / days <= self.max_points:
+                break
+        
+        measures = ", ".join(f'SUM("{c}") AS "{c}"' for c in y_columns)
+        query = f"""
+            SELECT date_trunc('{bucket}', "{x}") AS "{x}", {measures}
+            FROM ({source})
+            GROUP BY 1
+            ORDER BY 1
+        """
+        return query, bucket
+    
+    def line_data(self, data, x, y_columns, sql_query=None, truncated=False):
+        """Données d'une courbe: agrégées par DuckDB quand c'est possible, sinon réduites (LTTB/min-max).
+        
+        truncated: data n'est que le début du résultat (LIMIT du garde-fou). Le
+        résultat complet est alors relu (au plus max_points + 1 lignes) puis, s'il
+        dépasse max_points, agrégé par DuckDB sur la requête complète.
+        Retourne (données, libellé de la période d'agrégation ou None).
+        """
+        if truncated and self.guard is not None and sql_query:
+            # Le résultat complet tient peut-être sous max_points: relu sans le LIMIT du garde-fou
+            try:
+                source = self.guard.parse(sql_query).sql(dialect='duckdb')
+            except SQLGuardError:
+                source = None
+            full = self.db.execute_query(f"SELECT * FROM ({source}) LIMIT {self.max_points + 1}") if source else None
+            if full is not None and len(full) > len(data):
+                data = full
+        
+        if len(data) <= self.max_points:
+            return data, None
+        
+        bucketed = self.bucket_query(sql_query, data, x, y_columns)
+        if bucketed is not None:
+            query, bucket = bucketed
+            reduced = self.db.execute_query(query)
+            if reduced is not None and not reduced.empty:
+                print(f"📉 Série agrégée par {BUCKET_LABELS[bucket]} dans DuckDB: {len(data):,} → {len(reduced):,} points")
+                return reduced, BUCKET_LABELS[bucket]
+        
+        return self.reduce(data, x, y_columns), None
+    
+    def scatter_data(self, data, x, y):
+        """Données d'un nuage de points (réduit seulement au-delà de max_scatter_points)"""
+        return self.reduce(data, x, [y], self.max_scatter_points)
+    
+    def render_mode(self, n_points):
+        """Mode de rendu Plotly Express: WebGL pour les grandes séries"""
+        return 'webgl' if n_points > self.webgl_threshold else 'svg'
+    
+    def trace_class(self, n_points):
+        """go.Scattergl au-delà du seuil WebGL, go.Scatter sinon"""
+        import plotly.graph_objects as go
+        return go.Scattergl if n_points > self.webgl_threshold else go.Scatter
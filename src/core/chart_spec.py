@@ -0,0 +1,93 @@
+import threading
+
+class ChartSpec:
+    """Description légère d'un graphique: type, colonnes et titre.
+    
+    La figure Plotly n'est construite qu'à l'affichage (to_figure) et son JSON
+    n'est sérialisé qu'une fois par résultat (to_json): les appelants sans
+    interface (API, lots) n'importent jamais Plotly s'ils n'en ont pas besoin.
+    """
+    
+    def __init__(self, kind, data=None, x=None, y=None, title="", orientation=None, labels=None,
+                 markers=False, sql_query=None, reducer=None, chart_json=None, truncated=False):
+        self.kind = kind
+        self.data = data
+        self.x = x
+        self.y = y
+        self.title = title
+        self.orientation = orientation
+        self.labels = labels or {}
+        self.markers = markers
+        # Réduction des longues séries au moment du rendu (voir ChartReducer): sql_query est la
+        # requête complète, truncated indique que data a été coupé par le LIMIT du garde-fou
+        self.sql_query = sql_query
+        self.reducer = reducer
+        self.truncated = truncated
+        self._figure = None
+        self._json = chart_json
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_json(cls, chart_json):
+        """Graphique déjà sérialisé (snapshot, historique): la figure est relue depuis le JSON à la demande"""
+        return cls('json', chart_json=chart_json)
+    
+    def to_dict(self):
+        """Spécification sans les données (API, journaux)"""
+        return {
+            'type': self.kind,
+            'x': self.x,
+            'y': self.y,
+            'title': self.title,
+            'orientation': self.orientation,
+            'labels': self.labels
+        }
+    
+    def _build(self):
+        # Plotly n'est importé qu'ici: premier rendu seulement
+        if self.kind == 'json':
+            import plotly.io as pio
+            return pio.from_json(self._json, skip_invalid=True)
+        import plotly.express as px
+        
+        data, title = self.data, self.title
+        if self.kind == 'bar':
+            return px.bar(data, x=self.x, y=self.y, orientation=self.orientation, title=title, labels=self.labels)
+        
+        if self.kind == 'pie':
+            return px.pie(data, names=self.x, values=self.y, title=title, labels=self.labels)
+        
+        render_mode = 'auto'
+        if self.kind == 'line':
+            if self.reducer is not None:
+                data, bucket = self.reducer.line_data(data, self.x, [self.y], self.sql_query, self.truncated)
+                if bucket:
+                    title = f"{title} (agrégé par {bucket})"
+                render_mode = self.reducer.render_mode(len(data))
+            return px.line(data, x=self.x, y=self.y, title=title, labels=self.labels,
+                           markers=self.markers, render_mode=render_mode)
+        
+        if self.kind == 'scatter':
+            if self.reducer is not None:
+                data = self.reducer.scatter_data(data, self.x, self.y)
+                render_mode = self.reducer.render_mode(len(data))
+            return px.scatter(data, x=self.x, y=self.y, title=title, labels=self.labels, render_mode=render_mode)
+        
+        raise ValueError(f"Type de graphique inconnu: {self.kind}")
+    
+    def to_figure(self):
+        """Figure Plotly, construite au premier appel puis réutilisée"""
+        with self._lock:
+            if self._figure is None:
+                self._figure = self._build()
+            return self._figure
+    
+    def to_json(self):
+        """JSON Plotly de la figure, sérialisé une seule fois"""
+        with self._lock:
+            cached = self._json
+        if cached is None:
+            cached = self.to_figure().to_json()
+            with self._lock:
+                self._json = cached
+        return cached
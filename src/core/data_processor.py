@@ -1,13 +1,9 @@
 import pandas as pd
-import numpy as np
 from pathlib import Path
 import logging
 from datetime import datetime
 import warnings
-warnings.filterwarnings('ignore')
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class DataCleaner:
@@ -382,6 +378,10 @@ class DataCleaner:
 
 def main():
     """Fonction principale pour tester le nettoyage"""
+    # Configuration du logging et des avertissements: au lancement du script, pas à l'import du module
+    warnings.filterwarnings('ignore')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
     cleaner = DataCleaner()
     success = cleaner.run_complete_cleaning()
     
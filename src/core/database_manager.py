@@ -1,7 +1,30 @@
-import duckdb
-import pandas as pd
 from pathlib import Path
-import logging
+import argparse
+import hashlib
+import threading
+import sys
+
+# Catalogue des indicateurs: nom -> expression d'agrégat SQL sur la table merged.
+# Tous les indicateurs d'une même table/filtre sont calculés en un seul scan (voir get_kpis).
+KPI_METRICS = {
+    'total_orders': "COUNT(*)",
+    'total_sales': "SUM(Sales)",
+    'total_profit': "SUM(Profit)",
+    'avg_margin': "AVG(Profit_Margin_Percent)",
+    'overall_margin': "SUM(Profit) * 100.0 / SUM(Sales)",
+    'total_returns': "CAST(SUM(Is_Returned) AS BIGINT)",
+    'return_rate': "SUM(Is_Returned) * 100.0 / COUNT(*)",
+    'profitable_orders': "COUNT(*) FILTER (WHERE Profit > 0)",
+    'profitable_rate': "SUM(CASE WHEN Profit > 0 THEN 1 ELSE 0 END) * 100.0 / COUNT(*)",
+    'high_profit_rate': "SUM(CASE WHEN Profit > 100 THEN 1 ELSE 0 END) * 100.0 / COUNT(*)",
+    'avg_processing_days': "AVG(Processing_Days)",
+    'unique_customers': 'COUNT(DISTINCT "Customer ID")',
+    'unique_products': 'COUNT(DISTINCT "Product ID")',
+    'unique_regions': "COUNT(DISTINCT Region)"
+}
+
+# Table de la base contenant l'empreinte des données chargées (voir create_tables)
+VERSION_TABLE = "insightbot_version"
 
 class DatabaseManager:
     def __init__(self):
@@ -9,13 +32,39 @@ class DatabaseManager:
         self.db_path = self.base_path / "data" / "database" / "insightbot.db"
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.conn = None
+        self._data_version = None
+        self._local = threading.local()
+        self._kpi_cache = {}
+        self._kpi_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
         
     def connect(self):
         """Établit la connexion DuckDB"""
+        import duckdb
+        
         self.conn = duckdb.connect(str(self.db_path))
+        self._local = threading.local()
         print(f"✅ Connecté à DuckDB: {self.db_path}")
         return self.conn
     
+    def cursor(self):
+        """Curseur propre au thread courant.
+        
+        Une connexion DuckDB ne doit pas être utilisée par plusieurs threads à la
+        fois: chaque thread (session Streamlit, worker) reçoit son propre curseur
+        sur la même base, libéré à la fin du thread. La connexion est ouverte à
+        la première requête: créer un DatabaseManager ne coûte rien au démarrage.
+        """
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            if self.conn is None:
+                with self._connect_lock:
+                    if self.conn is None:
+                        self.connect()
+            cursor = self.conn.cursor()
+            self._local.cursor = cursor
+        return cursor
+    
     def create_tables(self):
         """Crée les tables à partir des CSV nettoyés"""
         processed_path = self.base_path / "data" / "processed"
@@ -27,9 +76,14 @@ class DatabaseManager:
             'merged': 'cleaned_merged.csv'
         }
         
+        fingerprint = hashlib.sha1()
         for table_name, filename in tables.items():
             file_path = processed_path / filename
             if file_path.exists():
+                fingerprint.update(table_name.encode())
+                with open(file_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        fingerprint.update(chunk)
                 # Crée la table à partir du CSV
                 self.conn.execute(f"""
                     CREATE OR REPLACE TABLE {table_name} AS 
@@ -37,19 +91,87 @@ class DatabaseManager:
                 """)
                 row_count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
                 print(f"✅ Table {table_name} créée: {row_count} lignes")
+        
+        # Empreinte du contenu des CSV chargés, enregistrée dans la base: relue par tous les processus,
+        # elle change dès qu'une valeur est corrigée (même nombre de lignes et de colonnes)
+        self.conn.execute(f"CREATE OR REPLACE TABLE {VERSION_TABLE} AS SELECT $version AS version, now() AS loaded_at",
+                          {'version': fingerprint.hexdigest()[:12]})
+        self._data_version = None
+    
+    def get_data_version(self):
+        """Retourne l'empreinte des données chargées par create_tables (caches, snapshot, index)"""
+        if self._data_version is None:
+            cursor = self.cursor()
+            if cursor.execute("SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = $name", {'name': VERSION_TABLE}).fetchone()[0]:
+                self._data_version = cursor.execute(f"SELECT version FROM {VERSION_TABLE}").fetchone()[0]
+            else:
+                # Base créée avant l'empreinte: forme des tables seulement (relancer create_tables)
+                rows = cursor.execute("""
+                    SELECT table_name, estimated_size, column_count
+                    FROM duckdb_tables()
+                    ORDER BY table_name
+                """).fetchall()
+                self._data_version = hashlib.sha1(repr(rows).encode()).hexdigest()[:12]
+        return self._data_version
     
-    def execute_query(self, query):
-        """Exécute une requête SQL"""
+    def execute_query(self, query, params=None):
+        """Exécute une requête SQL (params: valeurs des paramètres $nom, liées par DuckDB)"""
         try:
-            result = self.conn.execute(query).fetchdf()
+            result = self.cursor().execute(query, params).fetchdf()
             return result
         except Exception as e:
             print(f"❌ Erreur requête: {e}")
             return None
     
+    def get_kpis(self, metrics=None, table='merged', where=None, params=None):
+        """Retourne les indicateurs demandés (pd.Series) depuis un scan unique mis en cache.
+        
+        Tout le catalogue KPI_METRICS est calculé en une seule requête par
+        table/filtre puis conservé pour la version courante des données: les
+        panneaux suivants ne relancent aucun scan. where peut référencer des
+        paramètres $nom dont les valeurs sont passées dans params.
+        """
+        metrics = list(KPI_METRICS) if metrics is None else list(metrics)
+        unknown = [name for name in metrics if name not in KPI_METRICS]
+        if unknown:
+            raise KeyError(f"Indicateurs inconnus: {unknown}")
+        
+        key = (table, where, self.get_data_version(), tuple(sorted((params or {}).items())))
+        with self._kpi_lock:
+            kpis = self._kpi_cache.get(key)
+            if kpis is None:
+                select = ", ".join(f"{expr} as {name}" for name, expr in KPI_METRICS.items())
+                query = f"""
+                    SELECT
+                        {select}
+                    FROM {table}
+                    {f'WHERE {where}' if where else ''}
+                """
+                kpis = self.cursor().execute(query, params).fetchdf().astype(object).iloc[0]
+                
+                # Les résultats d'une ancienne version des données sont obsolètes
+                self._kpi_cache = {k: v for k, v in self._kpi_cache.items() if k[2] == key[2]}
+                self._kpi_cache[key] = kpis
+        
+        return kpis[metrics]
+    
+    def clear_kpi_cache(self):
+        """Oublie les indicateurs calculés (le prochain get_kpis relance le scan)"""
+        with self._kpi_lock:
+            self._kpi_cache = {}
+    
+    def explain(self, query):
+        """Retourne le plan d'exécution estimé d'une requête (texte)"""
+        try:
+            rows = self.cursor().execute(f"EXPLAIN {query}").fetchall()
+            return "\n".join(str(row[-1]) for row in rows)
+        except Exception as e:
+            print(f"❌ Erreur EXPLAIN: {e}")
+            return None
+    
     def get_table_info(self, table_name):
         """Récupère les infos d'une table"""
-        info = self.conn.execute(f"""
+        info = self.cursor().execute(f"""
             SELECT column_name, data_type 
             FROM information_schema.columns 
             WHERE table_name = '{table_name}'
@@ -120,11 +242,22 @@ class DatabaseManager:
             print("✅ Connexion DuckDB fermée")
 
 def main():
+    parser = argparse.ArgumentParser(description="Crée la base DuckDB depuis les CSV nettoyés et précalcule le snapshot des réponses")
+    parser.add_argument('--snapshot-gpt', action='store_true',
+                        help="Précalcule aussi les questions suggérées GPT (appels LLM payants, clé requise)")
+    args = parser.parse_args()
+    
     db = DatabaseManager()
     db.connect()
     db.create_tables()
     db.test_insightbot_queries()
     
+    # Réponses précalculées relues au démarrage des applications (voir core/answer_snapshot.py);
+    # les réponses GPT coûtent un appel LLM par question suggérée: seulement sur demande
+    sys.path.append(str(Path(__file__).parent.parent))
+    from core.answer_snapshot import build_snapshot
+    build_snapshot(db, engines=('ai', 'gpt') if args.snapshot_gpt else ('ai',))
+    
     # Info sur les tables
     print(f"\n📋 STRUCTURE DE LA BASE:")
     tables = ['orders', 'returns', 'peoples', 'merged']
@@ -0,0 +1,191 @@
+import math
+import os
+import re
+import threading
+import time
+from core.intent_router import fold, normalize, STOPWORDS
+
+# Colonnes de merged dont les valeurs sont reconnues dans les questions
+ENTITY_COLUMNS = ['Product Name', 'Customer Name', 'Country', 'State', 'City', 'Category', 'Sub-Category']
+
+# Mot qui annonce une colonne dans une question (départage une valeur présente dans plusieurs colonnes)
+COLUMN_HINTS = {'Product Name': 'produit', 'Customer Name': 'client', 'Country': 'pay', 'State': 'etat', 'City': 'ville'}
+
+# Mots des questions qui ne désignent jamais une valeur (évite « ventes » ~ « Ventura »)
+QUESTION_TERMS = {
+    'vente', 'profit', 'region', 'categorie', 'produit', 'client', 'marge', 'taux', 'retour', 'total',
+    'chiffre', 'affaire', 'moyenne', 'top', 'evolution', 'quantite', 'marche', 'segment', 'pay', 'ville',
+    'etat', 'commande', 'annee', 'moi', 'meilleur', 'plu', 'entre', 'depui', 'combien', 'temp'
+}
+
+# Noms français de valeurs stockées en anglais (ajoutés seulement si la valeur existe)
+VALUE_ALIASES = {
+    'Country': {
+        'allemagne': 'Germany', 'angleterre': 'United Kingdom', 'royaume uni': 'United Kingdom', 'espagne': 'Spain',
+        'italie': 'Italy', 'etats unis': 'United States', 'mexique': 'Mexico', 'bresil': 'Brazil', 'chine': 'China',
+        'inde': 'India', 'japon': 'Japan', 'australie': 'Australia', 'turquie': 'Turkey', 'pays bas': 'Netherlands',
+        'belgique': 'Belgium', 'suisse': 'Switzerland', 'autriche': 'Austria', 'maroc': 'Morocco', 'algerie': 'Algeria'
+    },
+    'State': {'californie': 'California', 'floride': 'Florida', 'baviere': 'Bavaria', 'angleterre': 'England'}
+}
+
+def trigrams(text):
+    """Trigrammes d'un texte replié, bornés par des espaces"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class EntityIndex:
+    """Index des valeurs de la base (produits, clients, lieux, catégories) pour les retrouver dans une question.
+    
+    Un trie de mots donne les correspondances exactes (plus longue valeur
+    d'abord), un index inversé de trigrammes les correspondances
+    approchées (fautes de frappe, accents, pluriels). L'index est
+    reconstruit quand la version des données change.
+    """
+    
+    def __init__(self, db, columns=None, min_similarity=0.75, max_tokens=6):
+        self.db = db
+        self.columns = columns or ENTITY_COLUMNS
+        # Similarité de Dice minimale entre trigrammes pour une correspondance approchée
+        self.min_similarity = min_similarity
+        self.max_tokens = max_tokens
+        self.version = None
+        self._entries = []
+        self._trie = {}
+        self._postings = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls, db):
+        return cls(db, min_similarity=float(os.getenv('INSIGHTBOT_ENTITY_MIN_SIMILARITY', '0.75')))
+    
+    def refresh(self):
+        """(Re)construit l'index si les données ont changé"""
+        version = self.db.get_data_version()
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            start = time.perf_counter()
+            entries, trie, postings = [], {}, {}
+            for column in self.columns:
+                values = self.db.execute_query(f'SELECT DISTINCT "{column}" AS value FROM merged WHERE "{column}" IS NOT NULL')
+                values = [] if values is None else list(values['value'].astype(str))
+                aliases = [(alias, value) for alias, value in VALUE_ALIASES.get(column, {}).items() if value in values]
+                for name, value in [(value, value) for value in values] + aliases:
+                    tokens = re.findall(r"[a-z0-9]+", fold(name))
+                    if not tokens:
+                        continue
+                    entry_id = len(entries)
+                    text = " ".join(tokens)
+                    grams = trigrams(text)
+                    entries.append((column, value, text, grams))
+                    
+                    node = trie
+                    for token in tokens:
+                        node = node.setdefault(token, {})
+                    node.setdefault(None, []).append(entry_id)
+                    
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(entry_id)
+            
+            self._entries, self._trie, self._postings = entries, trie, postings
+            self.version = version
+            print(f"🗂️ Index des valeurs: {len(entries):,} valeurs, {len(postings):,} trigrammes ({time.perf_counter() - start:.2f}s)")
+    
+    def lookup(self, text, limit=5):
+        """Valeurs proches de text: [(colonne, valeur, score)] par score décroissant"""
+        self.refresh()
+        grams = trigrams(" ".join(re.findall(r"[a-z0-9]+", fold(text))))
+        if not grams:
+            return []
+        
+        # Filtrage par préfixe: une valeur assez proche partage forcément un des trigrammes les plus rares
+        t = self.min_similarity
+        min_overlap = math.ceil(t * len(grams) / (2 - t))
+        ranked = sorted(grams, key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = set()
+        for gram in ranked[:len(grams) - min_overlap + 1]:
+            candidates.update(self._postings.get(gram, ()))
+        
+        matches = []
+        for entry_id in candidates:
+            column, value, _, entry_grams = self._entries[entry_id]
+            score = 2 * len(grams & entry_grams) / (len(grams) + len(entry_grams))
+            if score >= t:
+                matches.append((column, value, score))
+        matches.sort(key=lambda match: match[2], reverse=True)
+        return matches[:limit]
+    
+    def resolve(self, question, reserved=()):
+        """Valeurs citées dans la question: [{'column', 'value', 'text', 'score'}], sans chevauchement.
+        
+        reserved: passages déjà reconnus ailleurs (alias de région, marché... de
+        SlotExtractor), ignorés ici. score vaut 1.0 pour une correspondance exacte.
+        """
+        self.refresh()
+        tokens = re.findall(r"[a-z0-9]+", fold(question))
+        covered = [False] * len(tokens)
+        found = []
+        
+        # 0. Passages réservés: « au nord » désigne la région North, pas l'état Nord
+        for phrase in reserved:
+            words = re.findall(r"[a-z0-9]+", fold(phrase))
+            for start in range(len(tokens) - len(words) + 1):
+                if words and tokens[start:start + len(words)] == words:
+                    covered[start:start + len(words)] = [True] * len(words)
+        
+        # 1. Correspondances exactes, la plus longue à chaque position
+        for start in range(len(tokens)):
+            node, end, ids = self._trie, None, None
+            for i in range(start, len(tokens)):
+                node = node.get(tokens[i])
+                if node is None:
+                    break
+                if None in node:
+                    end, ids = i + 1, node[None]
+            if end is not None and not any(covered[start:end]):
+                covered[start:end] = [True] * (end - start)
+                column, value = self._choose(ids, tokens[:start])
+                found.append({'column': column, 'value': value, 'text': " ".join(tokens[start:end]), 'score': 1.0})
+        
+        # 2. Correspondances approchées sur les passages restants (plus longs d'abord)
+        for length in range(min(self.max_tokens, len(tokens)), 0, -1):
+            for start in range(len(tokens) - length + 1):
+                span = tokens[start:start + length]
+                if any(covered[start:start + length]) or span[0] in STOPWORDS or span[-1] in STOPWORDS:
+                    continue
+                terms = set(normalize(" ".join(span)))
+                if not terms or terms <= QUESTION_TERMS or (length == 1 and len(span[0]) < 4):
+                    continue
+                matches = self.lookup(" ".join(span), limit=1)
+                if matches:
+                    column, value, score = matches[0]
+                    covered[start:start + length] = [True] * length
+                    found.append({'column': column, 'value': value, 'text': " ".join(span), 'score': score})
+        
+        return found
+    
+    def _choose(self, ids, before):
+        """Colonne d'une valeur ambiguë (Washington: ville ou état): indice des mots précédents, sinon ordre des colonnes"""
+        candidates = [self._entries[entry_id][:2] for entry_id in ids]
+        if len(candidates) > 1:
+            hints = set(normalize(" ".join(before[-3:])))
+            for column, value in candidates:
+                if COLUMN_HINTS.get(column) in hints:
+                    return column, value
+            candidates.sort(key=lambda candidate: self.columns.index(candidate[0]))
+        return candidates[0]
+    
+    @staticmethod
+    def filters(matches, exact=None):
+        """{colonne: [valeurs]} des entités résolues (exact: seulement les correspondances exactes, ou approchées)"""
+        columns = {}
+        for match in matches:
+            if exact is not None and (match['score'] >= 1.0) != exact:
+                continue
+            values = columns.setdefault(match['column'], [])
+            if match['value'] not in values:
+                values.append(match['value'])
+        return columns
@@ -0,0 +1,59 @@
+import os
+import re
+import time
+import uuid
+import tempfile
+from pathlib import Path
+from core.sql_guard import SQLGuard
+
+# Formats d'export: options COPY DuckDB, extension, type MIME
+EXPORT_FORMATS = {
+    'csv': ("(FORMAT CSV, HEADER)", ".csv", "text/csv"),
+    'csv.gz': ("(FORMAT CSV, HEADER, COMPRESSION GZIP)", ".csv.gz", "application/gzip"),
+    'parquet': ("(FORMAT PARQUET, COMPRESSION ZSTD)", ".parquet", "application/vnd.apache.parquet")
+}
+
+class ExportService:
+    """Exporte le résultat complet d'une requête avec COPY ... TO (DuckDB écrit le fichier, sans passer par pandas)"""
+    
+    def __init__(self, db, export_dir=None, max_age=3600):
+        self.db = db
+        self.guard = SQLGuard(db)
+        self.export_dir = Path(export_dir or Path(tempfile.gettempdir()) / "insightbot_exports")
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        # Durée de conservation des fichiers exportés (s)
+        self.max_age = max_age
+    
+    @classmethod
+    def from_env(cls, db):
+        return cls(
+            db,
+            export_dir=os.getenv('INSIGHTBOT_EXPORT_DIR') or None,
+            max_age=float(os.getenv('INSIGHTBOT_EXPORT_MAX_AGE', '3600'))
+        )
+    
+    def cleanup(self):
+        """Supprime les exports expirés"""
+        limit = time.time() - self.max_age
+        for path in self.export_dir.iterdir():
+            if path.is_file() and path.stat().st_mtime < limit:
+                path.unlink(missing_ok=True)
+    
+    def export(self, sql, fmt='csv', name="export"):
+        """Écrit le résultat de sql dans la zone d'export et retourne (chemin, type MIME)"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Format d'export inconnu: {fmt}")
+        options, extension, mime = EXPORT_FORMATS[fmt]
+        
+        # Lecture seule uniquement: la requête est réécrite depuis son arbre syntaxique
+        query = self.guard.parse(sql).sql(dialect='duckdb')
+        
+        self.cleanup()
+        slug = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_')[:40] or "export"
+        path = self.export_dir / f"{slug}_{uuid.uuid4().hex[:8]}{extension}"
+        target = str(path).replace("'", "''")
+        
+        start = time.perf_counter()
+        self.db.cursor().execute(f"COPY ({query}) TO '{target}' {options}")
+        print(f"📤 Export {fmt}: {path.name} ({path.stat().st_size / 2 ** 20:.1f} Mo, {time.perf_counter() - start:.1f}s)")
+        return path, mime
@@ -1,62 +1,146 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
 from core.database_manager import DatabaseManager
-import re
+from core.chart_spec import ChartSpec
+from core.intent_router import IntentRouter
+from core.question_slots import SlotExtractor
+from core.entity_index import EntityIndex
+from core.answer_snapshot import AnswerSnapshot
+
+def _is_null(value):
+    """Valeur SQL NULL dans un résultat (None, NaN, NA); pandas est déjà chargé par la requête"""
+    import pandas as pd
+    return pd.isna(value)
 
 class InsightBotAI:
-    def __init__(self):
-        self.db = DatabaseManager()
-        self.db.connect()
-        
-        # Mapping des questions types vers les requêtes SQL
-        self.question_patterns = {
-            r'vente.*région': self._sales_by_region,
-            r'profit.*catégorie': self._profit_by_category,
-            r'évolution.*vente': self._sales_trend,
-            r'taux.*retour': self._return_rates,
-            r'top.*produit': self._top_products,
-            r'chiffre.*affaire': self._total_sales,
-            r'profit.*total': self._total_profit,
-            r'marge.*moyenne': self._average_margin,
-            r'quantité.*vendu': self._total_quantity
-        }
+    def __init__(self, db=None, snapshot=True):
+        # La base peut être partagée entre instances (voir app/resources.py); connexion ouverte à la première requête
+        self.db = db if db is not None else DatabaseManager()
+        
+        # Intentions: questions types -> handlers (termes normalisés, sans ordre ni accents)
+        self.intent_router = IntentRouter()
+        self.intent_router.add('ventes_region', self._sales_by_region, "vente région")
+        self.intent_router.add('profit_categorie', self._profit_by_category, "profit catégorie")
+        self.intent_router.add('evolution_ventes', self._sales_trend, "évolution vente")
+        self.intent_router.add('taux_retour', self._return_rates, "taux retour")
+        self.intent_router.add('top_produits', self._top_products, "top produit", "meilleur produit")
+        self.intent_router.add('chiffre_affaires', self._total_sales, "chiffre affaire")
+        self.intent_router.add('profit_total', self._total_profit, "profit total")
+        self.intent_router.add('marge_moyenne', self._average_margin, "marge moyenne")
+        self.intent_router.add('quantite_vendue', self._total_quantity, "quantité vendue")
+        
+        # Filtres de la question (année, mois, marché, région, catégorie, segment, top N) passés en paramètres SQL
+        # et valeurs citées (produit, client, pays, ville...) ajoutées comme filtres exacts
+        self.entity_index = EntityIndex.from_env(self.db)
+        self.slot_extractor = SlotExtractor(self.db, self.entity_index)
+        
+        # Réponses précalculées après create_tables (voir core/answer_snapshot.py), relues à la première question
+        self.use_snapshot = snapshot
+    
+    # Composants construits au premier usage: créer le bot ne charge ni pandas, ni numpy, ni sqlglot
+    @cached_property
+    def snapshot(self):
+        return AnswerSnapshot.load(self.db) if self.use_snapshot else None
+    
+    @cached_property
+    def chart_reducer(self):
+        """Réduction des longues séries avant Plotly (LTTB, WebGL)"""
+        from core.chart_reducer import ChartReducer
+        return ChartReducer.from_env(self.db)
+    
+    @cached_property
+    def lineage_cache(self):
+        """Résultats récents avec leur lignée: un total ou un filtre sur une clé déjà regroupée est calculé en mémoire"""
+        from core.result_lineage import LineageCache
+        return LineageCache.from_env(self.db)
+    
+    def snapshot_key(self, handler):
+        """Clé de snapshot d'une intention posée sans filtre"""
+        return f"intent:{handler.__name__}"
+    
+    def _match_handler(self, question):
+        """Handler correspondant à la question (analyse générale par défaut)"""
+        return self.intent_router.match(question) or self._general_analysis
     
     def process_question(self, question):
         """Traite une question en langage naturel"""
-        question_lower = question.lower()
+        handler = self._match_handler(question)
         
-        # Chercher le pattern correspondant
-        for pattern, handler in self.question_patterns.items():
-            if re.search(pattern, question_lower):
-                return handler(question)
+        if self.snapshot is not None and self.snapshot.version == self.db.get_data_version():
+            # Question suggérée telle quelle, sinon intention posée sans filtre
+            cached = self.snapshot.get('ai', AnswerSnapshot.question_key(question), question)
+            if cached is None and not self.slot_extractor.extract(question):
+                cached = self.snapshot.get('ai', self.snapshot_key(handler), question)
+            if cached is not None:
+                return cached
         
-        # Si aucun pattern ne correspond, retourner une analyse générale
-        return self._general_analysis(question)
+        return handler(question)
+    
+    def process_questions(self, questions, max_workers=4):
+        """Traite un lot de questions: chaque analyse distincte n'est calculée qu'une fois, en parallèle"""
+        # Même analyse et mêmes filtres -> même résultat
+        groups = {}
+        for i, question in enumerate(questions):
+            key = (self._match_handler(question), self.slot_extractor.key(self.slot_extractor.extract(question)))
+            groups.setdefault(key, []).append(i)
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='insightbot-batch') as executor:
+            answers = dict(zip(groups, executor.map(lambda key: self.process_question(questions[groups[key][0]]), groups)))
+        
+        results = [None] * len(questions)
+        for key, indices in groups.items():
+            for i in indices:
+                results[i] = {**answers[key], 'question': questions[i]}
+                if i != indices[0]:
+                    results[i]['duplicate_of'] = questions[indices[0]]
+        return results
+    
+    def _filters(self, question):
+        """Slots de la question, clause WHERE à paramètres liés et libellé des filtres"""
+        slots = self.slot_extractor.extract(question)
+        where, params = self.slot_extractor.where(slots)
+        scope = self.slot_extractor.describe(slots)
+        return slots, where, params, f" ({scope})" if scope else ""
+    
+    def _no_data(self, question, scope):
+        """Résultat vide (aucune ligne pour les filtres demandés)"""
+        return {
+            'question': question,
+            'data': None,
+            'insight': f"❌ Aucune donnée trouvée{scope}.",
+            'chart': None,
+            'chart_type': 'none'
+        }
     
     def _sales_by_region(self, question):
         """Ventes par région"""
-        query = """
+        slots, where, params, scope = self._filters(question)
+        params['top'] = slots.get('top', 10)
+        query = f"""
             SELECT Region, SUM(Sales) as total_sales
             FROM merged 
+            {where}
             GROUP BY Region 
             ORDER BY total_sales DESC
-            LIMIT 10
+            LIMIT $top
         """
-        data = self.db.execute_query(query)
+        data = self.lineage_cache.execute(query, params)
+        if data is None or data.empty:
+            return self._no_data(question, scope)
         
         # Générer un insight
         top_region = data.iloc[0]['Region']
         top_sales = data.iloc[0]['total_sales']
-        insight = f"La région {top_region} a les ventes les plus élevées avec ${top_sales:,.2f}"
+        insight = f"La région {top_region} a les ventes les plus élevées avec ${top_sales:,.2f}{scope}"
         
-        # Générer un graphique
-        fig = px.bar(
+        # Graphique décrit seulement: la figure est construite à l'affichage
+        fig = ChartSpec(
+            'bar',
             data,
             x='total_sales',
             y='Region',
             orientation='h',
-            title="Top 10 Régions par Ventes",
+            title=f"Top {params['top']} Régions par Ventes{scope}",
             labels={'total_sales': 'Ventes ($)', 'Region': 'Région'}
         )
         
@@ -70,21 +154,26 @@ class InsightBotAI:
     
     def _profit_by_category(self, question):
         """Profit par catégorie"""
-        query = """
+        slots, where, params, scope = self._filters(question)
+        query = f"""
             SELECT Category, SUM(Profit) as total_profit
             FROM merged 
+            {where}
             GROUP BY Category 
             ORDER BY total_profit DESC
         """
-        data = self.db.execute_query(query)
+        data = self.lineage_cache.execute(query, params)
+        if data is None or data.empty:
+            return self._no_data(question, scope)
         
-        insight = f"La catégorie {data.iloc[0]['Category']} génère le plus de profit: ${data.iloc[0]['total_profit']:,.2f}"
+        insight = f"La catégorie {data.iloc[0]['Category']} génère le plus de profit: ${data.iloc[0]['total_profit']:,.2f}{scope}"
         
-        fig = px.pie(
+        fig = ChartSpec(
+            'pie',
             data,
-            values='total_profit',
-            names='Category',
-            title="Distribution du Profit par Catégorie"
+            x='Category',
+            y='total_profit',
+            title=f"Distribution du Profit par Catégorie{scope}"
         )
         
         return {
@@ -97,35 +186,38 @@ class InsightBotAI:
     
     def _sales_trend(self, question):
         """Évolution des ventes dans le temps"""
-        query = """
+        slots, where, params, scope = self._filters(question)
+        query = f"""
             SELECT 
                 Order_YearMonth,
                 SUM(Sales) as monthly_sales,
                 SUM(Profit) as monthly_profit
             FROM merged 
+            {where}
             GROUP BY Order_YearMonth
             ORDER BY Order_YearMonth
         """
-        data = self.db.execute_query(query)
+        data = self.lineage_cache.execute(query, params)
+        if data is None or data.empty:
+            return self._no_data(question, scope)
         
         # Calculer la croissance
         first_sales = data.iloc[0]['monthly_sales']
         last_sales = data.iloc[-1]['monthly_sales']
         growth = ((last_sales - first_sales) / first_sales) * 100
         
-        insight = f"Les ventes ont {'augmenté' if growth > 0 else 'diminué'} de {abs(growth):.1f}% sur la période"
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=data['Order_YearMonth'].astype(str),
-            y=data['monthly_sales'],
-            mode='lines+markers',
-            name='Ventes Mensuelles'
-        ))
-        fig.update_layout(
-            title="Évolution des Ventes Mensuelles",
-            xaxis_title="Mois",
-            yaxis_title="Ventes ($)"
+        insight = f"Les ventes ont {'augmenté' if growth > 0 else 'diminué'} de {abs(growth):.1f}% sur la période{scope}"
+        
+        # Les données complètes restent dans le résultat, seule la courbe est réduite (au rendu)
+        fig = ChartSpec(
+            'line',
+            data,
+            x='Order_YearMonth',
+            y='monthly_sales',
+            title=f"Évolution des Ventes Mensuelles{scope}",
+            labels={'Order_YearMonth': 'Mois', 'monthly_sales': 'Ventes ($)'},
+            markers=True,
+            reducer=self.chart_reducer
         )
         
         return {
@@ -138,28 +230,33 @@ class InsightBotAI:
     
     def _return_rates(self, question):
         """Taux de retour par marché"""
-        query = """
+        slots, where, params, scope = self._filters(question)
+        query = f"""
             SELECT 
                 Market,
                 COUNT(*) as total_orders,
                 SUM(Is_Returned) as returned_orders,
                 (SUM(Is_Returned) * 100.0 / COUNT(*)) as return_rate
             FROM merged
+            {where}
             GROUP BY Market
             ORDER BY return_rate DESC
         """
-        data = self.db.execute_query(query)
+        data = self.lineage_cache.execute(query, params)
+        if data is None or data.empty:
+            return self._no_data(question, scope)
         
         highest_return = data.iloc[0]
         lowest_return = data.iloc[-1]
         
-        insight = f"Le marché {highest_return['Market']} a le plus haut taux de retour ({highest_return['return_rate']:.1f}%)"
+        insight = f"Le marché {highest_return['Market']} a le plus haut taux de retour ({highest_return['return_rate']:.1f}%){scope}"
         
-        fig = px.bar(
+        fig = ChartSpec(
+            'bar',
             data,
             x='Market',
             y='return_rate',
-            title="Taux de Retour par Marché",
+            title=f"Taux de Retour par Marché{scope}",
             labels={'return_rate': 'Taux de Retour (%)', 'Market': 'Marché'}
         )
         
@@ -173,29 +270,35 @@ class InsightBotAI:
     
     def _top_products(self, question):
         """Top produits par profit"""
-        query = """
+        slots, where, params, scope = self._filters(question)
+        params['top'] = slots.get('top', 5)
+        query = f"""
             SELECT 
                 "Product Name" as product_name,
                 SUM(Sales) as total_sales,
                 SUM(Profit) as total_profit,
                 AVG(Profit_Margin_Percent) as avg_margin
             FROM merged 
+            {where}
             GROUP BY "Product Name"
             HAVING total_profit > 0
             ORDER BY total_profit DESC
-            LIMIT 5
+            LIMIT $top
         """
-        data = self.db.execute_query(query)
+        data = self.lineage_cache.execute(query, params)
+        if data is None or data.empty:
+            return self._no_data(question, scope)
         
         top_product = data.iloc[0]
-        insight = f"Le produit le plus rentable est '{top_product['product_name']}' avec ${top_product['total_profit']:,.2f} de profit"
+        insight = f"Le produit le plus rentable est '{top_product['product_name']}' avec ${top_product['total_profit']:,.2f} de profit{scope}"
         
-        fig = px.bar(
+        fig = ChartSpec(
+            'bar',
             data,
             x='total_profit',
             y='product_name',
             orientation='h',
-            title="Top 5 Produits les Plus Rentables",
+            title=f"Top {params['top']} Produits les Plus Rentables{scope}",
             labels={'total_profit': 'Profit Total ($)', 'product_name': 'Produit'}
         )
         
@@ -209,10 +312,13 @@ class InsightBotAI:
     
     def _total_sales(self, question):
         """Chiffre d'affaires total"""
-        query = "SELECT SUM(Sales) as total_sales FROM merged"
-        data = self.db.execute_query(query).iloc[0]
+        slots, where, params, scope = self._filters(question)
+        query = f"SELECT SUM(Sales) as total_sales FROM merged {where}"
+        data = self.lineage_cache.execute(query, params).iloc[0]
+        if _is_null(data['total_sales']):
+            return self._no_data(question, scope)
         
-        insight = f"Le chiffre d'affaires total est de ${data['total_sales']:,.2f}"
+        insight = f"Le chiffre d'affaires total est de ${data['total_sales']:,.2f}{scope}"
         
         return {
             'question': question,
@@ -224,10 +330,13 @@ class InsightBotAI:
     
     def _total_profit(self, question):
         """Profit total"""
-        query = "SELECT SUM(Profit) as total_profit FROM merged"
-        data = self.db.execute_query(query).iloc[0]
+        slots, where, params, scope = self._filters(question)
+        query = f"SELECT SUM(Profit) as total_profit FROM merged {where}"
+        data = self.lineage_cache.execute(query, params).iloc[0]
+        if _is_null(data['total_profit']):
+            return self._no_data(question, scope)
         
-        insight = f"Le profit total est de ${data['total_profit']:,.2f}"
+        insight = f"Le profit total est de ${data['total_profit']:,.2f}{scope}"
         
         return {
             'question': question,
@@ -239,10 +348,14 @@ class InsightBotAI:
     
     def _average_margin(self, question):
         """Marge moyenne"""
-        query = "SELECT AVG(Profit_Margin_Percent) as avg_margin FROM merged WHERE Profit_Margin_Percent IS NOT NULL"
-        data = self.db.execute_query(query).iloc[0]
+        slots, where, params, scope = self._filters(question)
+        where = f"{where} AND Profit_Margin_Percent IS NOT NULL" if where else "WHERE Profit_Margin_Percent IS NOT NULL"
+        query = f"SELECT AVG(Profit_Margin_Percent) as avg_margin FROM merged {where}"
+        data = self.lineage_cache.execute(query, params).iloc[0]
+        if _is_null(data['avg_margin']):
+            return self._no_data(question, scope)
         
-        insight = f"La marge moyenne est de {data['avg_margin']:.2f}%"
+        insight = f"La marge moyenne est de {data['avg_margin']:.2f}%{scope}"
         
         return {
             'question': question,
@@ -254,10 +367,13 @@ class InsightBotAI:
     
     def _total_quantity(self, question):
         """Quantité totale vendue"""
-        query = "SELECT SUM(Quantity) as total_quantity FROM merged"
-        data = self.db.execute_query(query).iloc[0]
+        slots, where, params, scope = self._filters(question)
+        query = f"SELECT SUM(Quantity) as total_quantity FROM merged {where}"
+        data = self.lineage_cache.execute(query, params).iloc[0]
+        if _is_null(data['total_quantity']):
+            return self._no_data(question, scope)
         
-        insight = f"La quantité totale vendue est de {data['total_quantity']:,} unités"
+        insight = f"La quantité totale vendue est de {data['total_quantity']:,} unités{scope}"
         
         return {
             'question': question,
@@ -269,18 +385,16 @@ class InsightBotAI:
     
     def _general_analysis(self, question):
         """Analyse générale si la question n'est pas reconnue"""
-        query = """
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(Sales) as total_sales,
-                SUM(Profit) as total_profit,
-                AVG(Profit_Margin_Percent) as avg_margin,
-                SUM(Is_Returned) as total_returns
-            FROM merged
-        """
-        data = self.db.execute_query(query).iloc[0]
+        slots, where, params, scope = self._filters(question)
+        data = self.db.get_kpis(
+            ['total_orders', 'total_sales', 'total_profit', 'avg_margin', 'total_returns'],
+            where=self.slot_extractor.where(slots, prefix="")[0] or None,
+            params=params
+        )
+        if not data['total_orders']:
+            return self._no_data(question, scope)
         
-        insight = f"Analyse globale: {data['total_orders']:,} commandes, ${data['total_sales']:,.0f} de CA, ${data['total_profit']:,.0f} de profit, {data['avg_margin']:.1f}% de marge moyenne"
+        insight = f"Analyse globale{scope}: {data['total_orders']:,} commandes, ${data['total_sales']:,.0f} de CA, ${data['total_profit']:,.0f} de profit, {data['avg_margin']:.1f}% de marge moyenne"
         
         return {
             'question': question,
@@ -313,9 +427,8 @@ def main():
         "Quel est le taux de retour?"
     ]
     
-    for question in test_questions:
-        print(f"\n🤖 Question: {question}")
-        result = bot.process_question(question)
+    for result in bot.process_questions(test_questions):
+        print(f"\n🤖 Question: {result['question']}")
         print(f"💡 Insight: {result['insight']}")
         print(f"📊 Données: {result['data'].head(3) if hasattr(result['data'], 'head') else result['data']}")
 
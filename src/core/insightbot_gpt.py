@@ -1,33 +1,92 @@
-import openai
 import os
-from dotenv import load_dotenv
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from core.database_manager import DatabaseManager
 import re
 import json
-
-# Charger les variables d'environnement
-load_dotenv()
+import time
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from core.database_manager import DatabaseManager
+from core.llm_client import create_llm_client, load_environment
+from core.sql_guard import SQLGuard, SQLGuardError
+from core.chart_spec import ChartSpec
+from core.entity_index import EntityIndex
+from core.answer_snapshot import AnswerSnapshot
 
 class InsightBotGPT:
-    def __init__(self):
-        self.db = DatabaseManager()
-        self.db.connect()
-        
-        # Configuration OpenAI
-        self.api_key = os.getenv('OPENAI_API_KEY')
-        if self.api_key:
-            openai.api_key = self.api_key
+    def __init__(self, db=None, llm=None, snapshot=True):
+        # Variables du fichier .env (clé, URL, réglages INSIGHTBOT_*)
+        load_environment()
+        
+        # Base et client LLM peuvent être partagés entre instances (voir app/resources.py);
+        # la connexion DuckDB n'est ouverte qu'à la première requête
+        self.db = db if db is not None else DatabaseManager()
+        
+        # Configuration du client LLM (clé, URL, débit, reprises, cassette: voir .env)
+        self.llm = llm if llm is not None else create_llm_client()
+        if self.llm.enabled:
             self.gpt_enabled = True
             print("✅ GPT intégré à InsightBot")
         else:
             self.gpt_enabled = False
             print("⚠️  GPT non configuré - Mode basique")
+        
+        # Réponses précalculées des questions suggérées (voir core/answer_snapshot.py), relues à la première question
+        self.use_snapshot = snapshot
+        
+        # Valeurs de la base citées dans les questions (produits, clients, lieux): exactes imposées comme filtres
+        self.entity_index = EntityIndex.from_env(self.db)
+        
+        # Schéma de la base, relu seulement quand les données changent
+        self._schema_cache = None
+        
+        # Garde-fou appliqué au SQL généré avant exécution (sqlglot importé à la première vérification)
+        self.sql_guard = SQLGuard(
+            self.db,
+            max_rows=int(os.getenv('INSIGHTBOT_SQL_MAX_ROWS', '5000')),
+            max_estimated_rows=int(os.getenv('INSIGHTBOT_SQL_MAX_COST', '10000000'))
+        )
+        
+        # Traitement par lots (process_questions): requêtes DuckDB parallèles et questions par appel LLM
+        self.batch_workers = int(os.getenv('INSIGHTBOT_BATCH_WORKERS', '4'))
+        self.llm_batch_size = int(os.getenv('INSIGHTBOT_LLM_BATCH_SIZE', '10'))
+    
+    # Composants construits au premier usage: créer le bot ne charge ni pandas, ni numpy, ni sqlglot
+    @cached_property
+    def snapshot(self):
+        return AnswerSnapshot.load(self.db) if self.use_snapshot else None
+    
+    @cached_property
+    def chart_reducer(self):
+        """Réduction des longues séries avant Plotly (LTTB, agrégation SQL, WebGL)"""
+        from core.chart_reducer import ChartReducer
+        return ChartReducer.from_env(self.db)
+    
+    @cached_property
+    def lineage_cache(self):
+        """Résultats récents avec leur lignée: filtres et ré-agrégations calculés en mémoire"""
+        from core.result_lineage import LineageCache
+        return LineageCache.from_env(self.db)
+    
+    @cached_property
+    def slot_extractor(self):
+        """Filtres d'une question (années, mois, top N, valeurs citées), comparés avant de réutiliser une réponse"""
+        from core.question_slots import SlotExtractor
+        return SlotExtractor(self.db, self.entity_index)
+    
+    @cached_property
+    def semantic_cache(self):
+        """Cache sémantique des questions déjà traitées"""
+        from core.semantic_cache import SemanticCache
+        return SemanticCache(
+            threshold=float(os.getenv('INSIGHTBOT_CACHE_THRESHOLD', '0.85')),
+            enabled=os.getenv('INSIGHTBOT_SEMANTIC_CACHE', '1') != '0'
+        )
     
     def get_schema_info(self):
-        """Récupère les informations du schéma de la base"""
+        """Récupère les informations du schéma de la base (mises en cache par version des données)"""
+        version = self.db.get_data_version()
+        if self._schema_cache is not None and self._schema_cache[0] == version:
+            return self._schema_cache[1]
+        
         tables_info = {}
         
         # Informations sur les tables et colonnes
@@ -36,14 +95,81 @@ class InsightBotGPT:
             columns = self.db.get_table_info(table)
             tables_info[table] = [f"{col[0]} ({col[1]})" for col in columns]
         
+        self._schema_cache = (version, tables_info)
         return tables_info
     
-    def generate_sql_with_gpt(self, question):
+    def discovery_context(self):
+        """Contexte commun à plusieurs questions traitées ensemble: schéma et indicateurs globaux, lus une fois"""
+        kpis = self.db.get_kpis(['total_orders', 'total_sales', 'total_profit', 'overall_margin', 'return_rate'])
+        return {'schema': self.get_schema_info(), 'kpis': kpis.to_dict()}
+    
+    def resolve_entities(self, question):
+        """Valeurs de la base citées dans la question: ({colonne: [valeurs exactes]}, {colonne: [valeurs approchées]}).
+        
+        Les passages déjà reconnus comme région, marché, catégorie ou segment
+        (« au nord ») ne sont pas relus comme des valeurs d'autres colonnes.
+        """
+        matches = self.entity_index.resolve(question, reserved=[text for text, _ in self.slot_extractor.phrases(question)])
+        return self.entity_index.filters(matches, exact=True), self.entity_index.filters(matches, exact=False)
+    
+    def _entity_prompt(self, entities, fuzzy=None):
+        """Lignes du prompt: valeurs exactes à filtrer dans WHERE, valeurs approchées seulement suggérées"""
+        prompt = ""
+        if entities:
+            lines = "\n        ".join(
+                f'"{column}" IN ({", ".join(repr(value) for value in values)})' for column, values in entities.items()
+            )
+            prompt += f"""
+        VALEURS CITÉES (valeurs exactes de la base, à filtrer telles quelles dans WHERE):
+        {lines}
+        """
+        if fuzzy:
+            lines = "\n        ".join(
+                f'"{column}": {", ".join(repr(value) for value in values)}' for column, values in fuzzy.items()
+            )
+            prompt += f"""
+        VALEURS PROCHES (correspondances approchées: à utiliser seulement si la question désigne bien cette valeur):
+        {lines}
+        """
+        return prompt
+    
+    def apply_entity_filters(self, sql_query, entities):
+        """Ajoute les valeurs citées (correspondances exactes seulement) comme filtres quand le SQL (sur merged seul)
+        ne filtre pas déjà ces colonnes"""
+        if not entities:
+            return sql_query
+        from sqlglot import exp
+        
+        try:
+            statement = self.sql_guard.parse(sql_query)
+        except SQLGuardError:
+            return sql_query
+        
+        source = statement.args.get('from') if isinstance(statement, exp.Select) else None
+        if source is None or statement.args.get('joins') or not isinstance(source.this, exp.Table) or source.this.name != 'merged':
+            return sql_query
+        
+        where = statement.args.get('where')
+        filtered = {column.name.lower() for column in where.find_all(exp.Column)} if where else set()
+        added = []
+        for column, values in entities.items():
+            if column.lower() in filtered:
+                continue
+            statement = statement.where(exp.column(column, quoted=True).isin(*[exp.Literal.string(v) for v in values]))
+            added.append(column)
+        
+        if not added:
+            return sql_query
+        print(f"🎯 Filtres ajoutés: {', '.join(added)}")
+        return statement.sql(dialect='duckdb')
+    
+    def generate_sql_with_gpt(self, question, context=None):
         """Utilise GPT pour générer du SQL à partir d'une question naturelle"""
+        entities, fuzzy = self.resolve_entities(question)
         if not self.gpt_enabled:
-            return self._fallback_sql_generation(question)
+            return self.apply_entity_filters(self._fallback_sql_generation(question), entities)
         
-        schema_info = self.get_schema_info()
+        schema_info = context['schema'] if context else self.get_schema_info()
         
         prompt = f"""
         Tu es un expert SQL. Convertis cette question en SQL pour DuckDB.
@@ -55,7 +181,7 @@ class InsightBotGPT:
         Tables disponibles: merged, orders, returns, peoples
         
         QUESTION: "{question}"
-        
+        {self._entity_prompt(entities, fuzzy)}
         RÈGLES:
         - Utilise la table 'merged' comme principale
         - Les noms de colonnes avec espaces doivent être entre guillemets
@@ -68,27 +194,24 @@ class InsightBotGPT:
         """
         
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
+            sql_query = self.llm.chat(
                 messages=[
                     {"role": "system", "content": "Tu es un expert SQL qui convertit des questions en requêtes précises."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
                 max_tokens=500
-            )
-            
-            sql_query = response.choices[0].message.content.strip()
+            ).strip()
             
             # Nettoyer la réponse
             sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
             
             print(f"🤖 GPT a généré: {sql_query}")
-            return sql_query
+            return self.apply_entity_filters(sql_query, entities)
             
         except Exception as e:
             print(f"❌ Erreur GPT: {e}")
-            return self._fallback_sql_generation(question)
+            return self.apply_entity_filters(self._fallback_sql_generation(question), entities)
     
     def _fallback_sql_generation(self, question):
         """Génération de SQL basique si GPT n'est pas disponible"""
@@ -113,21 +236,25 @@ class InsightBotGPT:
         # Requête par défaut
         return "SELECT COUNT(*) as total_orders, SUM(Sales) as total_sales, SUM(Profit) as total_profit FROM merged"
     
-    def generate_insight_with_gpt(self, question, data, sql_query):
-        """Utilise GPT pour générer des insights à partir des données"""
-        if not self.gpt_enabled:
-            return self._fallback_insight_generation(data, sql_query)
+    def _insight_messages(self, question, data, sql_query, context=None):
+        """Construit les messages du prompt d'insight"""
+        from core.result_summarizer import summarize_result, format_profile
         
-        # Préparer un échantillon des données pour GPT
-        data_sample = data.head(10).to_string() if hasattr(data, 'head') else str(data)
+        # Profil statistique de toutes les lignes (taille du prompt bornée)
+        data_profile = format_profile(summarize_result(data))
+        
+        # Indicateurs globaux partagés (mode découverte) pour situer le résultat
+        if context:
+            kpis = ", ".join(f"{name}={value:,.2f}" for name, value in context['kpis'].items())
+            data_profile += f"\n        INDICATEURS GLOBAUX: {kpis}"
         
         prompt = f"""
         Tu es un analyste business expert. Analyse ces données et génère un insight concis et actionnable.
         
         QUESTION: "{question}"
         REQUÊTE SQL: {sql_query}
-        DONNÉES (échantillon):
-        {data_sample}
+        PROFIL DES DONNÉES (calculé sur toutes les lignes):
+        {data_profile}
         
         Formule un insight business en 1-2 phrases qui:
         1. Souligne le point le plus important
@@ -137,24 +264,58 @@ class InsightBotGPT:
         Réponds en français, sois concis et professionnel.
         """
         
+        return [
+            {"role": "system", "content": "Tu es un analyste business qui génère des insights actionnables à partir de données."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def generate_insight_with_gpt(self, question, data, sql_query, context=None):
+        """Utilise GPT pour générer des insights à partir des données"""
+        if not self.gpt_enabled:
+            return self._fallback_insight_generation(data, sql_query)
+        
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Tu es un analyste business qui génère des insights actionnables à partir de données."},
-                    {"role": "user", "content": prompt}
-                ],
+            insight = self.llm.chat(
+                messages=self._insight_messages(question, data, sql_query, context),
                 temperature=0.7,
                 max_tokens=150
-            )
-            
-            insight = response.choices[0].message.content.strip()
+            ).strip()
             return insight
             
         except Exception as e:
             print(f"❌ Erreur GPT insight: {e}")
             return self._fallback_insight_generation(data, sql_query)
     
+    def generate_insight_stream(self, question, data, sql_query, result=None):
+        """Comme generate_insight_with_gpt, mais produit l'insight morceau par morceau.
+        
+        Avec result, la réponse n'est ajoutée au cache sémantique qu'une fois le
+        flux terminé sans erreur: un insight interrompu n'est jamais réutilisé.
+        """
+        if not self.gpt_enabled:
+            chunks = [self._fallback_insight_generation(data, sql_query)]
+            yield chunks[0]
+        else:
+            chunks = []
+            try:
+                for chunk in self.llm.chat_stream(
+                    messages=self._insight_messages(question, data, sql_query),
+                    temperature=0.7,
+                    max_tokens=150
+                ):
+                    chunks.append(chunk)
+                    yield chunk
+                    
+            except Exception as e:
+                print(f"❌ Erreur GPT insight (flux): {e}")
+                # Repli seulement si rien n'a encore été affiché
+                if not chunks:
+                    yield self._fallback_insight_generation(data, sql_query)
+                return
+        
+        if result is not None:
+            self.remember_answer({**result, 'insight': "".join(chunks).strip()})
+    
     def _fallback_insight_generation(self, data, sql_query):
         """Génération d'insight basique"""
         if hasattr(data, 'shape') and data.shape[0] > 0:
@@ -187,14 +348,11 @@ class InsightBotGPT:
         """
         
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
+            chart_type = self.llm.chat(
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,
                 max_tokens=10
-            )
-            
-            chart_type = response.choices[0].message.content.strip().lower()
+            ).strip().lower()
             return chart_type if chart_type in ['bar', 'line', 'pie', 'scatter', 'histogram'] else 'bar'
             
         except Exception as e:
@@ -214,38 +372,96 @@ class InsightBotGPT:
         else:
             return 'bar'
     
-    def create_chart(self, data, chart_type, title):
-        """Crée un graphique basé sur le type suggéré"""
-        if chart_type == 'none' or data.empty:
+    def create_chart(self, data, chart_type, title, sql_query=None, truncated=False):
+        """Décrit le graphique suggéré (ChartSpec); la figure n'est construite qu'à l'affichage.
+        
+        sql_query est la requête sans le LIMIT du garde-fou et truncated indique
+        que data a été coupé par ce LIMIT: une courbe est alors agrégée par DuckDB
+        sur le résultat complet (voir ChartReducer.line_data).
+        """
+        if chart_type == 'none' or data.empty or len(data) < 2 or len(data.columns) < 2:
             return None
         
-        try:
-            if chart_type == 'bar' and len(data) > 1:
-                if 'total_sales' in data.columns:
-                    return px.bar(data, x=data.columns[1], y=data.columns[0], title=title)
-                else:
-                    return px.bar(data, x=data.iloc[:, 0], y=data.iloc[:, 1], title=title)
-            
-            elif chart_type == 'line' and len(data) > 1:
-                return px.line(data, x=data.columns[0], y=data.columns[1], title=title)
-            
-            elif chart_type == 'pie' and len(data) > 1:
-                return px.pie(data, names=data.columns[0], values=data.columns[1], title=title)
-            
-        except Exception as e:
-            print(f"❌ Erreur création graphique: {e}")
+        x, y = data.columns[0], data.columns[1]
+        if chart_type == 'bar':
+            if 'total_sales' in data.columns:
+                x, y = y, x
+            return ChartSpec('bar', data, x=x, y=y, title=title)
+        
+        elif chart_type in ('line', 'scatter'):
+            # Séries longues réduites au rendu (voir ChartReducer)
+            return ChartSpec(chart_type, data, x=x, y=y, title=title, sql_query=sql_query,
+                             reducer=self.chart_reducer, truncated=truncated)
+        
+        elif chart_type == 'pie':
+            return ChartSpec('pie', data, x=x, y=y, title=title)
         
         return None
     
-    def process_question(self, question):
-        """Traite une question avec l'IA avancée"""
+    def _emit(self, on_event, stage, **details):
+        """Signale la fin d'une étape du pipeline à l'appelant (progression réelle)"""
+        if on_event is not None:
+            on_event({'stage': stage, **details})
+    
+    def prepare_answer(self, question, on_event=None, context=None):
+        """Étapes précédant l'insight: SQL, exécution et graphique.
+        
+        'insight' vaut None quand il reste à générer (generate_insight_with_gpt
+        puis remember_answer, ou generate_insight_stream(..., result=result)). on_event reçoit un
+        dict {'stage': ..., ...} à la fin de chaque étape. context (voir
+        discovery_context) évite de relire schéma et indicateurs à chaque question.
+        """
         print(f"🤖 Traitement de: {question}")
         
-        # 1. Générer la requête SQL avec GPT
-        sql_query = self.generate_sql_with_gpt(question)
+        # 0. Réutiliser la réponse d'une question similaire déjà traitée
+        cached = self._cache_lookup(question, self.db.get_data_version())
+        if cached is not None:
+            similarity, entry = cached
+            print(f"⚡ Cache sémantique ({similarity:.2f}): {entry['question']}")
+            self._emit(on_event, 'cache_hit', similarity=similarity, cached_from=entry['question'])
+            return {**entry['result'], 'question': question, 'cached_from': entry['question']}
         
-        # 2. Exécuter la requête
-        data = self.db.execute_query(sql_query)
+        # 1. Générer la requête SQL avec GPT
+        start = time.perf_counter()
+        sql_query = self.generate_sql_with_gpt(question, context)
+        
+        # Requête complète, sans le LIMIT du garde-fou: c'est elle qu'exporte « Exporter »
+        export_sql = sql_query
+        
+        # 2. Réponse calculée en mémoire depuis un résultat récent plus détaillé (ni garde-fou ni DuckDB)
+        derived = self.lineage_cache.derive(sql_query)
+        guard_limit = None
+        if derived is not None:
+            data, derived_from = derived
+            self._emit(on_event, 'sql_generated', sql_query=sql_query, seconds=time.perf_counter() - start)
+            self._emit(on_event, 'query_executed', rows=len(data), seconds=0.0, derived_from=derived_from)
+        else:
+            derived_from = None
+            
+            # Sinon, vérifier la requête (lecture seule, coût estimé, LIMIT)
+            try:
+                sql_query, guard_limit = self.sql_guard.bound(sql_query)
+            except SQLGuardError as e:
+                print(f"🛡️ Requête refusée: {e}")
+                self._emit(on_event, 'sql_rejected', sql_query=sql_query, reason=str(e))
+                return {
+                    'question': question,
+                    'data': None,
+                    'insight': f"🛡️ Requête refusée par le garde-fou SQL: {e}",
+                    'chart': None,
+                    'sql_query': sql_query,
+                    'chart_type': 'none'
+                }
+            self._emit(on_event, 'sql_generated', sql_query=sql_query, seconds=time.perf_counter() - start)
+            
+            # 3. Exécuter la requête (résultat conservé avec sa lignée)
+            start = time.perf_counter()
+            data = self.lineage_cache.execute(sql_query)
+            self._emit(
+                on_event, 'query_executed',
+                rows=0 if data is None else len(data),
+                seconds=time.perf_counter() - start
+            )
         
         if data is None or data.empty:
             return {
@@ -257,23 +473,288 @@ class InsightBotGPT:
                 'chart_type': 'none'
             }
         
-        # 3. Générer l'insight avec GPT
-        insight = self.generate_insight_with_gpt(question, data, sql_query)
-        
         # 4. Suggérer le type de graphique
+        start = time.perf_counter()
         chart_type = self.suggest_chart_type(question, data)
         
-        # 5. Créer le graphique
-        chart = self.create_chart(data, chart_type, f"Résultat: {question}")
+        # 5. Créer le graphique (sur la requête complète si le LIMIT du garde-fou a coupé le résultat)
+        truncated = guard_limit is not None and len(data) >= guard_limit
+        chart = self.create_chart(data, chart_type, f"Résultat: {question}", export_sql, truncated)
+        self._emit(on_event, 'chart_built', chart_type=chart_type, seconds=time.perf_counter() - start)
         
-        return {
+        result = {
             'question': question,
             'data': data,
-            'insight': insight,
+            'insight': None,
             'chart': chart,
             'sql_query': sql_query,
+            'export_sql': export_sql,
             'chart_type': chart_type
         }
+        if derived_from is not None:
+            result['derived_from'] = derived_from
+        return result
+    
+    def _cache_lookup(self, question, version):
+        """Entrée du snapshot ou du cache sémantique (écartée si elle porte sur d'autres filtres: « à Paris » / « à Lyon », « 2014 » / « 2015 »)"""
+        if self.snapshot is not None and self.snapshot.version == version:
+            answer = self.snapshot.get('gpt', AnswerSnapshot.question_key(question))
+            if answer is not None:
+                return 1.0, {'question': answer['question'], 'result': answer}
+        
+        cached = self.semantic_cache.lookup(question, version)
+        if cached is not None and self.slot_key(question) != self.slot_key(cached[1]['question']):
+            return None
+        return cached
+    
+    def slot_key(self, question):
+        """Forme comparable des filtres d'une question"""
+        return self.slot_extractor.key(self.slot_extractor.extract(question))
+    
+    def remember_answer(self, result):
+        """Ajoute une réponse complète au cache sémantique"""
+        self.semantic_cache.add(result['question'], self.db.get_data_version(), result)
+    
+    def process_question(self, question, on_event=None, context=None):
+        """Traite une question avec l'IA avancée"""
+        result = self.prepare_answer(question, on_event, context)
+        
+        # 6. Générer l'insight avec GPT
+        if result['insight'] is None:
+            start = time.perf_counter()
+            result['insight'] = self.generate_insight_with_gpt(question, result['data'], result['sql_query'], context)
+            self._emit(on_event, 'insight_ready', seconds=time.perf_counter() - start)
+            self.remember_answer(result)
+        
+        return result
+    
+    def _chat_json_list(self, system, prompt, n, max_tokens):
+        """Appel LLM dont la réponse attendue est un tableau JSON de n éléments (None sinon)"""
+        try:
+            content = self.llm.chat(
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                max_tokens=max_tokens
+            )
+            items = json.loads(content.replace('```json', '').replace('```', '').strip())
+            if isinstance(items, list) and len(items) == n:
+                return items
+            print(f"⚠️  Réponse groupée inattendue: {n} éléments attendus")
+        except Exception as e:
+            print(f"❌ Erreur GPT (lot): {e}")
+        return None
+    
+    def _chunks(self, items):
+        size = max(1, self.llm_batch_size)
+        return [items[i:i + size] for i in range(0, len(items), size)]
+    
+    def _sql_chunk(self, questions):
+        """SQL d'un paquet de questions en un seul appel (repli question par question)"""
+        schema_info = self.get_schema_info()
+        numbered = []
+        for i, question in enumerate(questions):
+            entities, fuzzy = self.resolve_entities(question)
+            values = "; ".join(f'"{column}" IN ({", ".join(repr(v) for v in vs)})' for column, vs in entities.items())
+            close = "; ".join(f'"{column}": {", ".join(repr(v) for v in vs)}' for column, vs in fuzzy.items())
+            numbered.append(
+                f"{i + 1}. {question}" + (f" [valeurs exactes: {values}]" if values else "")
+                + (f" [valeurs proches, à vérifier: {close}]" if close else "")
+            )
+        numbered = "\n        ".join(numbered)
+        
+        prompt = f"""
+        Tu es un expert SQL. Convertis chacune de ces questions en SQL pour DuckDB.
+        
+        SCHEMA DE LA BASE:
+        Table 'merged' (principale) - {len(schema_info['merged'])} colonnes:
+        {', '.join(schema_info['merged'][:15])}...
+        
+        Tables disponibles: merged, orders, returns, peoples
+        
+        QUESTIONS:
+        {numbered}
+        
+        RÈGLES:
+        - Utilise la table 'merged' comme principale
+        - Les noms de colonnes avec espaces doivent être entre guillemets
+        - Sois précis dans les aggregations (SUM, COUNT, AVG)
+        - Ordonne les résultats quand c'est pertinent
+        - Limite à 10-20 résultats si nécessaire
+        
+        Réponds UNIQUEMENT par un TABLEAU JSON de {len(questions)} chaînes: une requête SQL par question, dans l'ordre.
+        """
+        
+        items = self._chat_json_list(
+            "Tu es un expert SQL qui convertit des questions en requêtes précises.",
+            prompt, len(questions), 300 * len(questions)
+        )
+        if items is None:
+            return [self.generate_sql_with_gpt(question) for question in questions]
+        return [str(sql).replace('```sql', '').replace('```', '').strip() for sql in items]
+    
+    def generate_sql_batch(self, questions, executor=None):
+        """SQL de plusieurs questions: un appel LLM par paquet de llm_batch_size questions"""
+        if not self.gpt_enabled:
+            return [self.generate_sql_with_gpt(question) for question in questions]
+        
+        chunks = self._chunks(list(questions))
+        results = executor.map(self._sql_chunk, chunks) if executor else map(self._sql_chunk, chunks)
+        sql_queries = [sql for chunk in results for sql in chunk]
+        return [self.apply_entity_filters(sql, self.resolve_entities(question)[0]) for question, sql in zip(questions, sql_queries)]
+    
+    def _insight_chunk(self, items):
+        """Insights et types de graphique d'un paquet de résultats en un seul appel"""
+        from core.result_summarizer import summarize_result, format_profile
+        
+        blocks = "\n\n        ".join(
+            f"[{i + 1}] QUESTION: \"{question}\"\n        REQUÊTE SQL: {sql_query}\n"
+            f"        PROFIL DES DONNÉES:\n        {format_profile(summarize_result(data))}"
+            for i, (question, data, sql_query) in enumerate(items)
+        )
+        
+        prompt = f"""
+        Tu es un analyste business expert. Pour chaque résultat ci-dessous, formule un insight
+        business en 1-2 phrases (point le plus important, contexte, action si pertinent) et
+        choisis une visualisation parmi: bar, line, pie, scatter, histogram, none.
+        
+        {blocks}
+        
+        Réponds en français, sois concis et professionnel.
+        Réponds UNIQUEMENT par un TABLEAU JSON de {len(items)} objets {{"insight": "...", "chart": "..."}}, dans l'ordre.
+        """
+        
+        answers = self._chat_json_list(
+            "Tu es un analyste business qui génère des insights actionnables à partir de données.",
+            prompt, len(items), 200 * len(items)
+        )
+        if answers is None:
+            return [
+                (self.generate_insight_with_gpt(question, data, sql_query), self.suggest_chart_type(question, data))
+                for question, data, sql_query in items
+            ]
+        
+        results = []
+        for (question, data, sql_query), answer in zip(items, answers):
+            answer = answer if isinstance(answer, dict) else {}
+            insight = str(answer.get('insight') or "").strip() or self._fallback_insight_generation(data, sql_query)
+            chart_type = str(answer.get('chart') or "").strip().lower()
+            results.append((insight, chart_type if chart_type in ['bar', 'line', 'pie', 'scatter', 'histogram'] else 'bar'))
+        return results
+    
+    def generate_insights_batch(self, items, executor=None):
+        """(insight, type de graphique) pour chaque (question, données, SQL), par paquets"""
+        if not self.gpt_enabled:
+            return [
+                (self._fallback_insight_generation(data, sql_query), self._fallback_chart_suggestion(question, data))
+                for question, data, sql_query in items
+            ]
+        
+        chunks = self._chunks(list(items))
+        results = executor.map(self._insight_chunk, chunks) if executor else map(self._insight_chunk, chunks)
+        return [answer for chunk in results for answer in chunk]
+    
+    def process_questions(self, questions, max_workers=None):
+        """Traite un lot de questions (rapports planifiés), résultats dans l'ordre des questions.
+        
+        Les appels LLM sont groupés par paquets, les questions qui aboutissent
+        au même SQL ne l'exécutent qu'une fois et les requêtes distinctes
+        s'exécutent en parallèle. Les doublons partagent données, graphique et
+        insight et portent 'duplicate_of'.
+        """
+        start = time.perf_counter()
+        version = self.db.get_data_version()
+        results = [None] * len(questions)
+        
+        # 0. Réponses déjà en cache sémantique
+        pending = []
+        for i, question in enumerate(questions):
+            cached = self._cache_lookup(question, version)
+            if cached is not None:
+                results[i] = {**cached[1]['result'], 'question': question, 'cached_from': cached[1]['question']}
+            else:
+                pending.append(i)
+        
+        with ThreadPoolExecutor(max_workers=max_workers or self.batch_workers, thread_name_prefix='insightbot-batch') as executor:
+            # 1. SQL par paquets, regroupé par requête normalisée puis vérifié une fois par groupe
+            sql_queries = self.generate_sql_batch([questions[i] for i in pending], executor)
+            groups = {}
+            for i, sql_query in zip(pending, sql_queries):
+                try:
+                    key = self.sql_guard.parse(sql_query).sql(dialect='duckdb')
+                except SQLGuardError:
+                    key = sql_query
+                groups.setdefault(key, [sql_query, []])[1].append(i)
+            
+            # Requête complète et LIMIT du garde-fou de chaque groupe (graphiques des résultats tronqués)
+            bounds = {}
+            for key, group in list(groups.items()):
+                try:
+                    safe_sql, limit = self.sql_guard.bound(group[0])
+                except SQLGuardError as e:
+                    print(f"🛡️ Requête refusée: {e}")
+                    for i in groups.pop(key)[1]:
+                        results[i] = {
+                            'question': questions[i],
+                            'data': None,
+                            'insight': f"🛡️ Requête refusée par le garde-fou SQL: {e}",
+                            'chart': None,
+                            'sql_query': group[0],
+                            'chart_type': 'none'
+                        }
+                    continue
+                bounds[key] = (group[0], limit)
+                group[0] = safe_sql
+            
+            duplicates = sum(len(indices) - 1 for _, indices in groups.values())
+            print(f"📦 Lot: {len(questions)} questions, {len(groups)} requêtes distinctes ({duplicates} doublons)")
+            
+            # 2. Requêtes distinctes en parallèle (un curseur DuckDB par thread)
+            sql_list = [sql_query for sql_query, _ in groups.values()]
+            frames = dict(zip(groups, executor.map(self.lineage_cache.execute, sql_list)))
+            
+            answered = []
+            for key, (sql_query, indices) in groups.items():
+                data = frames[key]
+                if data is None or data.empty:
+                    for i in indices:
+                        results[i] = {
+                            'question': questions[i],
+                            'data': None,
+                            'insight': "❌ Aucune donnée trouvée pour cette question.",
+                            'chart': None,
+                            'sql_query': sql_query,
+                            'chart_type': 'none'
+                        }
+                else:
+                    answered.append((sql_query, data, indices, bounds[key]))
+            
+            # 3. Insights par paquets, une fois par requête distincte
+            insights = self.generate_insights_batch(
+                [(questions[indices[0]], data, sql_query) for sql_query, data, indices, _ in answered], executor
+            )
+        
+        for (sql_query, data, indices, (full_sql, limit)), (insight, chart_type) in zip(answered, insights):
+            first = questions[indices[0]]
+            truncated = limit is not None and len(data) >= limit
+            chart = self.create_chart(data, chart_type, f"Résultat: {first}", full_sql, truncated)
+            for i in indices:
+                results[i] = {
+                    'question': questions[i],
+                    'data': data,
+                    'insight': insight,
+                    'chart': chart,
+                    'sql_query': sql_query,
+                    'chart_type': chart_type
+                }
+                if i != indices[0]:
+                    results[i]['duplicate_of'] = first
+            self.remember_answer(results[indices[0]])
+        
+        print(f"✅ Lot traité en {time.perf_counter() - start:.1f}s")
+        return results
     
     def get_suggested_questions(self):
         """Retourne des questions suggérées avancées"""
@@ -299,9 +780,8 @@ def main():
         "Quels sont les clients les plus fidèles?"
     ]
     
-    for question in test_questions:
-        print(f"\n🎯 Question: {question}")
-        result = bot.process_question(question)
+    for result in bot.process_questions(test_questions):
+        print(f"\n🎯 Question: {result['question']}")
         print(f"💡 Insight: {result['insight']}")
         print(f"📊 SQL: {result['sql_query']}")
         print(f"📈 Chart type: {result['chart_type']}")
@@ -0,0 +1,91 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Mots sans valeur pour le routage
+STOPWORDS = {
+    'le', 'la', 'les', 'l', 'un', 'une', 'des', 'du', 'de', 'd', 'au', 'aux', 'et', 'ou', 'en', 'par',
+    'pour', 'sur', 'dans', 'avec', 'est', 'sont', 'quel', 'quelle', 'quels', 'quelles', 'qui', 'que',
+    'qu', 'quoi', 'comment', 'ce', 'ces', 'cette', 'se', 'il', 'elle', 'ils', 'elles', 'a', 'on', 'nous'
+}
+
+# Formes fléchies ou proches ramenées à un lemme commun (après pliage des accents et du pluriel)
+LEMMAS = {
+    'vendu': 'vente', 'vendue': 'vente', 'vendre': 'vente', 'vend': 'vente', 'vendon': 'vente',
+    'evoluent': 'evolution', 'evolue': 'evolution', 'evoluer': 'evolution', 'tendance': 'evolution',
+    'regional': 'region', 'regionaux': 'region',
+    'moyen': 'moyenne',
+    'retourne': 'retour', 'retournee': 'retour',
+    'rentabilite': 'profit', 'benefice': 'profit'
+}
+
+def fold(text):
+    """Minuscules sans accents"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+@lru_cache(maxsize=4096)
+def lemmatize(token):
+    """Lemme approximatif: lemme connu, sinon pluriel retiré"""
+    if token in LEMMAS:
+        return LEMMAS[token]
+    if len(token) > 3 and token[-1] in 'sx' and not token.endswith('ss'):
+        token = token[:-1]
+    return LEMMAS.get(token, token)
+
+def normalize(text):
+    """Termes d'une question: minuscules, accents pliés, mots vides retirés, lemmes"""
+    return [lemmatize(token) for token in re.findall(r"[a-z0-9]+", fold(text)) if token not in STOPWORDS]
+
+class IntentRouter:
+    """Routeur compilé: index inversé terme -> clauses d'intentions, parcouru une seule fois par question.
+    
+    Une intention est déclarée par une ou plusieurs clauses de mots-clés
+    ("vente région"); une clause est satisfaite quand tous ses termes sont
+    présents, quel que soit leur ordre. Le coût d'un routage dépend du nombre
+    de termes de la question, pas du nombre d'intentions.
+    """
+    
+    def __init__(self):
+        self.intents = {}
+        # (intention, termes, ordre de déclaration)
+        self._clauses = []
+        self._index = {}
+    
+    def add(self, name, target, *clauses):
+        """Déclare une intention; target est renvoyé par match() (handler, requête...)"""
+        self.intents[name] = target
+        for clause in clauses:
+            terms = frozenset(normalize(clause))
+            if not terms:
+                raise ValueError(f"Clause vide pour l'intention {name}: {clause!r}")
+            clause_id = len(self._clauses)
+            self._clauses.append((name, terms, clause_id))
+            for term in terms:
+                self._index.setdefault(term, []).append(clause_id)
+        return self
+    
+    def route(self, question, limit=5):
+        """Intentions classées [(nom, score)]; score = part des termes de la meilleure clause présents (1.0 = tous)"""
+        hits = {}
+        for term in set(normalize(question)):
+            for clause_id in self._index.get(term, ()):
+                hits[clause_id] = hits.get(clause_id, 0) + 1
+        
+        best = {}
+        for clause_id, count in hits.items():
+            name, terms, order = self._clauses[clause_id]
+            # À score égal: clause la plus spécifique, puis ordre de déclaration
+            key = (count / len(terms), len(terms), -order)
+            if name not in best or key > best[name]:
+                best[name] = key
+        
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        return [(name, key[0]) for name, key in ranked[:limit]]
+    
+    def match(self, question, min_score=1.0):
+        """Cible de la meilleure intention si son score atteint min_score, sinon None"""
+        ranked = self.route(question, limit=1)
+        if ranked and ranked[0][1] >= min_score:
+            return self.intents[ranked[0][0]]
+        return None
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from core.llm_client import LLMClientError
+
+class CassetteLLMClient:
+    """Enregistre (record) ou rejoue (replay) les échanges avec le modèle dans une cassette JSON"""
+    
+    def __init__(self, path, mode='replay', client=None, latency=0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Mode de cassette inconnu: {mode}")
+        if mode == 'record' and client is None:
+            raise ValueError("Le mode record nécessite un client LLM réel")
+        
+        self.path = Path(path)
+        self.mode = mode
+        # En replay, le client réel n'est jamais appelé (il fournit le modèle et l'état)
+        self.client = client
+        # Latence simulée en replay: nombre de secondes ou 'recorded' (latence mesurée à l'enregistrement)
+        self.latency = latency
+        self.model = client.model if client is not None else "cassette"
+        self.stats = {'hits': 0, 'misses': 0, 'recorded': 0}
+        self._lock = threading.Lock()
+        
+        self.interactions = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self.interactions = json.load(f)
+        elif mode == 'replay':
+            print(f"⚠️  Cassette introuvable: {self.path}")
+    
+    @property
+    def enabled(self):
+        # En replay, aucune clé API n'est nécessaire
+        return self.mode == 'replay' or self.client.enabled
+    
+    @staticmethod
+    def interaction_key(messages, temperature, max_tokens, model):
+        """Empreinte stable d'un appel (mêmes messages et paramètres => même réponse)"""
+        payload = json.dumps(
+            {'model': model, 'messages': messages, 'temperature': temperature, 'max_tokens': max_tokens},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _replay(self, key):
+        """Interaction enregistrée et latence à simuler"""
+        interaction = self.interactions.get(key)
+        if interaction is None:
+            self.stats['misses'] += 1
+            raise LLMClientError("Appel absent de la cassette")
+        self.stats['hits'] += 1
+        delay = interaction.get('elapsed', 0) if self.latency == 'recorded' else float(self.latency)
+        return interaction['response'], delay
+    
+    def _record(self, key, messages, temperature, max_tokens, model, response, elapsed):
+        with self._lock:
+            self.interactions[key] = {
+                'messages': messages,
+                'temperature': temperature,
+                'max_tokens': max_tokens,
+                'model': model,
+                'response': response,
+                'elapsed': round(elapsed, 4)
+            }
+            self.stats['recorded'] += 1
+            self.save()
+    
+    def chat(self, messages, temperature=0.7, max_tokens=None, model=None):
+        """Même interface que LLMClient.chat"""
+        model = model or self.model
+        key = self.interaction_key(messages, temperature, max_tokens, model)
+        
+        if self.mode == 'replay':
+            response, delay = self._replay(key)
+            if delay:
+                time.sleep(delay)
+            return response
+        
+        start = time.perf_counter()
+        response = self.client.chat(messages, temperature=temperature, max_tokens=max_tokens, model=model)
+        self._record(key, messages, temperature, max_tokens, model, response, time.perf_counter() - start)
+        return response
+    
+    def chat_stream(self, messages, temperature=0.7, max_tokens=None, model=None):
+        """Même interface que LLMClient.chat_stream (partage les enregistrements de chat)"""
+        model = model or self.model
+        key = self.interaction_key(messages, temperature, max_tokens, model)
+        
+        if self.mode == 'replay':
+            response, delay = self._replay(key)
+            # La latence est répartie entre les mots rejoués
+            words = re.findall(r'\S+\s*', response) or [response]
+            for word in words:
+                if delay:
+                    time.sleep(delay / len(words))
+                yield word
+            return
+        
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self.client.chat_stream(messages, temperature=temperature, max_tokens=max_tokens, model=model):
+            chunks.append(chunk)
+            yield chunk
+        self._record(key, messages, temperature, max_tokens, model, ''.join(chunks), time.perf_counter() - start)
+    
+    def save(self):
+        """Écrit la cassette de façon atomique"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.interactions, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def status(self):
+        if self.client is not None:
+            status = self.client.status()
+        else:
+            status = {'circuit': 'closed', 'requests': 0, 'retries': 0, 'failures': 0, 'rate_limited': 0}
+        return {**status, 'cassette': self.mode, **self.stats}
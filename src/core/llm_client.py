@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import random
+import threading
+from functools import lru_cache
+
+# Codes HTTP pour lesquels une nouvelle tentative a du sens
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+def is_outage(status_code):
+    """Le code HTTP trahit une panne de l'API (5xx, délai dépassé), pas une requête refusée (4xx)"""
+    return status_code >= 500 or status_code == 408
+
+class LLMClientError(Exception):
+    """Échec d'un appel au modèle de langage"""
+
+class CircuitOpenError(LLMClientError):
+    """Appel refusé: le disjoncteur est ouvert après trop d'échecs"""
+
+class TokenBucket:
+    """Limiteur de débit côté client (seau à jetons)"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """Disjoncteur: coupe les appels après une série de pannes, puis laisse passer un seul appel d'essai après un délai"""
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        # Appel d'essai en cours (half-open): les autres appels restent refusés jusqu'à son issue
+        self.probing = False
+        self._lock = threading.Lock()
+    
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+    
+    @property
+    def state(self):
+        """closed, open ou half-open"""
+        with self._lock:
+            return self._state()
+    
+    def allow(self):
+        """Indique si un appel peut être tenté (en half-open, un seul appel d'essai à la fois)"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'open' or self.probing:
+                return False
+            self.probing = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.failure_threshold:
+                # (Ré)ouverture: un appel d'essai sera permis après reset_timeout
+                self.opened_at = time.monotonic()
+    
+    def release(self):
+        """Fin d'un appel sans verdict sur l'API (requête refusée, flux abandonné): un autre essai est permis"""
+        with self._lock:
+            self.probing = False
+
+class LLMClient:
+    """Client HTTP pour l'API Chat Completions (connexions réutilisées, débit limité, reprises)"""
+    
+    def __init__(self, api_key=None, base_url="https://api.openai.com/v1", model="gpt-3.5-turbo",
+                 timeout=30, max_retries=3, backoff=0.5, max_backoff=8,
+                 rate_per_second=3, burst=5, pool_size=10,
+                 failure_threshold=5, reset_timeout=30):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        
+        self.rate_limiter = TokenBucket(rate_per_second, burst)
+        self.circuit = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'rate_limited': 0}
+        
+        # Session keep-alive partagée, créée au premier appel (requests n'est pas importé au démarrage)
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+    
+    @property
+    def session(self):
+        """Session HTTP: les connexions TCP/TLS sont réutilisées d'un appel à l'autre"""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                if self.api_key:
+                    session.headers['Authorization'] = f"Bearer {self.api_key}"
+                session.headers['Content-Type'] = 'application/json'
+                self._session = session
+            return self._session
+    
+    @classmethod
+    def from_env(cls):
+        """Construit le client à partir des variables d'environnement du déploiement"""
+        return cls(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            base_url=os.getenv('OPENAI_BASE_URL', "https://api.openai.com/v1"),
+            model=os.getenv('INSIGHTBOT_LLM_MODEL', "gpt-3.5-turbo"),
+            timeout=float(os.getenv('INSIGHTBOT_LLM_TIMEOUT', '30')),
+            max_retries=int(os.getenv('INSIGHTBOT_LLM_MAX_RETRIES', '3')),
+            rate_per_second=float(os.getenv('INSIGHTBOT_LLM_RATE', '3')),
+            burst=int(os.getenv('INSIGHTBOT_LLM_BURST', '5')),
+            pool_size=int(os.getenv('INSIGHTBOT_LLM_POOL_SIZE', '10')),
+            failure_threshold=int(os.getenv('INSIGHTBOT_LLM_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('INSIGHTBOT_LLM_BREAKER_RESET', '30'))
+        )
+    
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+    
+    def _sleep_before_retry(self, attempt, response=None):
+        """Attente exponentielle avec gigue complète (ou Retry-After si fourni)"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                time.sleep(min(float(retry_after), self.max_backoff))
+                return
+            except ValueError:
+                pass
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+    
+    def _build_payload(self, messages, temperature, max_tokens, model, stream=False):
+        payload = {
+            'model': model or self.model,
+            'messages': messages,
+            'temperature': temperature
+        }
+        if max_tokens is not None:
+            payload['max_tokens'] = max_tokens
+        if stream:
+            payload['stream'] = True
+        return payload
+    
+    def _post(self, payload, stream=False):
+        """POST /chat/completions avec limitation de débit, reprises et disjoncteur"""
+        import requests
+        
+        if not self.enabled:
+            raise LLMClientError("Clé API absente")
+        if not self.circuit.allow():
+            raise CircuitOpenError("API LLM indisponible (disjoncteur ouvert)")
+        
+        # Seules les pannes (5xx, délai, réseau) comptent pour le disjoncteur, pas les requêtes refusées (4xx)
+        last_error, outage = None, False
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self.stats['retries'] += 1
+            
+            self.rate_limiter.acquire()
+            self.stats['requests'] += 1
+            response = None
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    timeout=self.timeout,
+                    stream=stream
+                )
+                if response.status_code == 200:
+                    return response
+                
+                if response.status_code == 429:
+                    self.stats['rate_limited'] += 1
+                last_error = LLMClientError(f"HTTP {response.status_code}: {response.text[:200]}")
+                outage = is_outage(response.status_code)
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+            
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = LLMClientError(f"Erreur réseau: {e}")
+                outage = True
+            
+            if attempt < self.max_retries:
+                self._sleep_before_retry(attempt, response)
+        
+        self._record_failure(outage)
+        raise last_error
+    
+    def _record_failure(self, outage=True):
+        self.stats['failures'] += 1
+        if outage:
+            self.circuit.record_failure()
+        else:
+            self.circuit.release()
+    
+    def chat(self, messages, temperature=0.7, max_tokens=None, model=None):
+        """Envoie une conversation au modèle et retourne le texte de la réponse"""
+        response = self._post(self._build_payload(messages, temperature, max_tokens, model))
+        self.circuit.record_success()
+        return response.json()['choices'][0]['message']['content']
+    
+    def chat_stream(self, messages, temperature=0.7, max_tokens=None, model=None):
+        """Comme chat, mais produit le texte au fil de l'eau (Server-Sent Events)"""
+        import requests
+        
+        response = self._post(self._build_payload(messages, temperature, max_tokens, model, stream=True), stream=True)
+        response.encoding = 'utf-8'
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+            self.circuit.record_success()
+        except requests.RequestException as e:
+            self._record_failure()
+            raise LLMClientError(f"Flux interrompu: {e}")
+        except (ValueError, KeyError) as e:
+            # Réponse mal formée: l'API a répondu, ce n'est pas une panne
+            self._record_failure(outage=False)
+            raise LLMClientError(f"Flux interrompu: {e}")
+        finally:
+            # Flux abandonné par l'appelant: l'essai éventuel prend fin sans verdict
+            self.circuit.release()
+            response.close()
+    
+    def status(self):
+        """État du client pour l'affichage (disjoncteur et compteurs)"""
+        return {'circuit': self.circuit.state, **self.stats}
+    
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+@lru_cache(maxsize=None)
+def load_environment():
+    """Charge le fichier .env une fois par processus (appelé à la création des clients, pas à l'import)"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def create_llm_client():
+    """Client LLM du déploiement, enveloppé dans une cassette si INSIGHTBOT_LLM_CASSETTE est défini"""
+    load_environment()
+    client = LLMClient.from_env()
+    
+    cassette_path = os.getenv('INSIGHTBOT_LLM_CASSETTE')
+    if not cassette_path:
+        return client
+    
+    from core.llm_cassette import CassetteLLMClient
+    
+    mode = os.getenv('INSIGHTBOT_LLM_MODE', 'replay')
+    latency = os.getenv('INSIGHTBOT_LLM_REPLAY_LATENCY', '0')
+    if latency != 'recorded':
+        latency = float(latency)
+    print(f"📼 Cassette LLM ({mode}): {cassette_path}")
+    return CassetteLLMClient(
+        cassette_path,
+        mode=mode,
+        client=client,
+        latency=latency
+    )
@@ -0,0 +1,130 @@
+import argparse
+import json
+import re
+import random
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Réponses types renvoyées selon la tâche demandée dans le prompt
+STUB_SQL = "SELECT Region, SUM(Sales) as total_sales FROM merged GROUP BY Region ORDER BY total_sales DESC LIMIT 10"
+STUB_INSIGHT = "La région en tête concentre l'essentiel des ventes: prioriser ses stocks et dupliquer ses pratiques."
+STUB_CHART = "bar"
+
+def stub_answer(messages):
+    """Choisit une réponse plausible selon le contenu des messages"""
+    text = " ".join(message.get('content', '') for message in messages)
+    # Prompts groupés (process_questions): un élément par question
+    batch = re.search(r'TABLEAU JSON de (\d+)', text)
+    if batch:
+        n = int(batch.group(1))
+        if 'expert SQL' in text:
+            return json.dumps([STUB_SQL] * n)
+        return json.dumps([{'insight': STUB_INSIGHT, 'chart': STUB_CHART}] * n, ensure_ascii=False)
+    if 'expert SQL' in text:
+        return STUB_SQL
+    if 'UN SEUL MOT' in text:
+        return STUB_CHART
+    return STUB_INSIGHT
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Imite POST /v1/chat/completions de l'API OpenAI"""
+    
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        
+        with server.lock:
+            server.request_count += 1
+        
+        if server.latency:
+            time.sleep(server.latency)
+        
+        # Erreurs simulées pour tester reprises et disjoncteur
+        if random.random() < server.error_rate:
+            self._send(429, {'error': {'message': 'Rate limit reached (stub)'}}, {'Retry-After': '0.1'})
+            return
+        
+        content = stub_answer(payload.get('messages', []))
+        if payload.get('stream'):
+            self._send_stream(content, payload.get('model', 'stub'))
+            return
+        self._send(200, {
+            'id': f"stub-{server.request_count}",
+            'object': 'chat.completion',
+            'model': payload.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        })
+    
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_stream(self, content, model):
+        """Réponse en Server-Sent Events, un mot par événement"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for word in re.findall(r'\S+\s*', content):
+            chunk = {
+                'object': 'chat.completion.chunk',
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            if self.server.token_latency:
+                time.sleep(self.server.token_latency)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, token_latency=0.0):
+    """Démarre le serveur factice dans un thread et le retourne (base_url dans server.base_url)"""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.latency = latency
+    server.error_rate = error_rate
+    server.token_latency = token_latency
+    server.request_count = 0
+    server.lock = threading.Lock()
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+    
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur factice compatible Chat Completions")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Latence simulée (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proportion de réponses 429")
+    parser.add_argument('--token-latency', type=float, default=0.0, help="Délai entre deux mots en streaming (s)")
+    args = parser.parse_args()
+    
+    server = start_stub_server(args.host, args.port, args.latency, args.error_rate, args.token_latency)
+    print(f"🧪 Serveur LLM factice: {server.base_url}")
+    print(f"   OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=stub")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
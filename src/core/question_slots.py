@@ -0,0 +1,225 @@
+import re
+import threading
+import unicodedata
+from core.intent_router import fold
+
+MONTHS = {
+    'janvier': 1, 'fevrier': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6,
+    'juillet': 7, 'aout': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11, 'decembre': 12
+}
+
+# Slots catégoriels: slot -> (colonne de merged, mot qui l'annonce dans une question)
+SLOT_COLUMNS = {
+    'market': ('Market', 'marche'),
+    'region': ('Region', 'region'),
+    'category': ('Category', 'categorie'),
+    'segment': ('Segment', 'segment')
+}
+
+# Équivalents français des valeurs de la base (retenus seulement si la valeur existe)
+VALUE_ALIASES = {
+    'market': {'europe': 'EU', 'afrique': 'Africa', 'amerique latine': 'LATAM', 'asie pacifique': 'APAC', 'etats unis': 'US'},
+    'region': {
+        'centre': 'Central', 'nord': 'North', 'sud': 'South', 'ouest': 'West', 'oceanie': 'Oceania',
+        'caraibes': 'Caribbean', 'asie du sud est': 'Southeast Asia', 'asie centrale': 'Central Asia'
+    },
+    'category': {
+        'technologie': 'Technology', 'high tech': 'Technology', 'mobilier': 'Furniture', 'meubles': 'Furniture',
+        'fournitures de bureau': 'Office Supplies', 'fournitures': 'Office Supplies'
+    },
+    'segment': {'grand public': 'Consumer', 'particuliers': 'Consumer', 'entreprises': 'Corporate', 'bureau a domicile': 'Home Office'}
+}
+
+YEAR_PATTERN = re.compile(r'\b((?:19|20)\d{2})\b')
+TOP_PATTERN = re.compile(r'\btop\s*(\d{1,3})\b|\b(\d{1,3})\s+(?:premiers?|premieres?|meilleurs?|meilleures?|plus)\b')
+QUARTER_PATTERN = re.compile(r'\bt([1-4])\b|\b([1-4])(?:er|e|eme)\s+trimestre\b')
+MONTH_NAMES = '|'.join(MONTHS)
+# « de 2013 à 2015 », « entre janvier et mars »
+YEAR_RANGE_PATTERN = re.compile(r'\b(?:entre|de|du|depuis)\s+(?:19|20)\d{2}\s+(?:et|a|au|jusqu\s*a)\s+(?:19|20)\d{2}\b')
+MONTH_RANGE_PATTERN = re.compile(rf'\b(?:entre|de|d|du|depuis)\s+(?:{MONTH_NAMES})\s+(?:et|a|au|jusqu\s*a)\s+(?:{MONTH_NAMES})\b')
+
+def _strip_accents(text):
+    """Accents retirés, casse conservée (les codes comme EU restent distinguables de « eu »)"""
+    text = unicodedata.normalize('NFKD', text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def _as_range(values, is_range):
+    """Liste triée des valeurs demandées; une plage « de X à Y » est complétée"""
+    values = sorted(set(values))
+    if is_range and len(values) == 2:
+        return list(range(values[0], values[1] + 1))
+    return values
+
+class SlotExtractor:
+    """Extrait les filtres d'une question (année, mois, marché, région, catégorie, segment, top N)
+    et les traduit en clause WHERE à paramètres liés."""
+    
+    def __init__(self, db, entity_index=None):
+        self.db = db
+        # Produits, clients, lieux... reconnus par l'index des valeurs (voir EntityIndex)
+        self.entity_index = entity_index
+        # (version des données, motif compilé, phrase -> [(slot, valeur)])
+        self._vocabulary = None
+        self._lock = threading.Lock()
+    
+    def _load_vocabulary(self):
+        """Valeurs distinctes des colonnes catégorielles, relues seulement quand les données changent"""
+        version = self.db.get_data_version()
+        with self._lock:
+            if self._vocabulary is not None and self._vocabulary[0] == version:
+                return self._vocabulary
+            
+            phrases = {}
+            codes = set()
+            for slot, (column, _) in SLOT_COLUMNS.items():
+                values = self.db.execute_query(f'SELECT DISTINCT "{column}" AS value FROM merged WHERE "{column}" IS NOT NULL')
+                values = [] if values is None else [str(value) for value in values['value']]
+                for value in values:
+                    # Codes courts en majuscules (EU, US, APAC): reconnus tels quels seulement
+                    if value.isupper() and len(value) <= 5:
+                        codes.add(value)
+                        phrases.setdefault(value, []).append((slot, value))
+                    else:
+                        phrases.setdefault(fold(value), []).append((slot, value))
+                for alias, value in VALUE_ALIASES.get(slot, {}).items():
+                    if value in values:
+                        phrases.setdefault(alias, []).append((slot, value))
+            
+            # Phrases les plus longues d'abord: « North Asia » avant « North »
+            alternatives = [
+                f"(?-i:{re.escape(phrase)})" if phrase in codes else re.escape(phrase).replace(' ', r'\s+')
+                for phrase in sorted(phrases, key=len, reverse=True)
+            ]
+            pattern = re.compile(r'\b(?:' + '|'.join(alternatives) + r')\b', re.IGNORECASE) if alternatives else None
+            self._vocabulary = (version, pattern, phrases)
+            return self._vocabulary
+    
+    def extract(self, question):
+        """Slots trouvés dans la question: {'years': [...], 'months': [...], 'market': [...], ..., 'top': N}"""
+        folded = fold(question)
+        slots = {}
+        
+        years = [int(year) for year in YEAR_PATTERN.findall(folded)]
+        if years:
+            slots['years'] = _as_range(years, bool(YEAR_RANGE_PATTERN.search(folded)))
+        
+        is_range = bool(MONTH_RANGE_PATTERN.search(folded))
+        months = [number for name, number in MONTHS.items() if re.search(rf'\b{name}\b', folded)]
+        for quarter in QUARTER_PATTERN.findall(folded):
+            first = 3 * int(quarter[0] or quarter[1]) - 2
+            months.extend([first, first + 2])
+            is_range = True
+        if months:
+            slots['months'] = _as_range(months, is_range)
+        
+        top = TOP_PATTERN.search(folded)
+        if top:
+            slots['top'] = int(top.group(1) or top.group(2))
+        
+        _, _, vocabulary = self._load_vocabulary()
+        matched = self.phrases(question)
+        for text, position in matched:
+            candidates = vocabulary.get(text) or vocabulary.get(re.sub(r'\s+', ' ', fold(text))) or []
+            slot, value = self._choose_slot(candidates, folded, position)
+            if slot is not None and value not in slots.get(slot, []):
+                slots.setdefault(slot, []).append(value)
+        
+        if self.entity_index is not None:
+            # Seules les valeurs exactes filtrent; les passages reconnus ci-dessus ne sont pas relus
+            slot_columns = {column for column, _ in SLOT_COLUMNS.values()}
+            matches = self.entity_index.resolve(question, reserved=[text for text, _ in matched])
+            entities = self.entity_index.filters(matches, exact=True)
+            entities = {column: values for column, values in entities.items() if column not in slot_columns}
+            if entities:
+                slots['entities'] = entities
+        
+        return slots
+    
+    def phrases(self, question):
+        """Passages de la question reconnus comme valeurs de slots (alias compris): [(texte, position)]"""
+        _, pattern, _ = self._load_vocabulary()
+        if pattern is None:
+            return []
+        return [(match.group(0), match.start()) for match in pattern.finditer(_strip_accents(question))]
+    
+    @staticmethod
+    def _choose_slot(candidates, folded, position):
+        """Valeur présente dans plusieurs colonnes (Africa: marché et région): le mot qui la précède tranche"""
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else (None, None)
+        before = folded[:position].split()[-1:]
+        for slot, value in candidates:
+            if before and before[0].startswith(SLOT_COLUMNS[slot][1]):
+                return slot, value
+        return candidates[0]
+    
+    @staticmethod
+    def key(slots):
+        """Forme hachable des slots (regroupement des questions identiques)"""
+        def freeze(value):
+            if isinstance(value, dict):
+                return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+            return tuple(value) if isinstance(value, list) else value
+        return tuple(sorted((name, freeze(value)) for name, value in slots.items()))
+    
+    @staticmethod
+    def where(slots, prefix="WHERE"):
+        """(clause SQL, paramètres) filtrant merged selon les slots; les valeurs restent des paramètres $nom"""
+        conditions = []
+        params = {}
+        
+        for slot, column in [('years', 'Order_Year'), ('months', 'Order_Month')]:
+            values = slots.get(slot)
+            if not values:
+                continue
+            if values == list(range(values[0], values[-1] + 1)):
+                # Plage continue: BETWEEN permet à DuckDB d'écarter des blocs entiers (zone maps)
+                conditions.append(f"{column} BETWEEN ${slot}_from AND ${slot}_to")
+                params[f"{slot}_from"], params[f"{slot}_to"] = values[0], values[-1]
+            else:
+                names = [f"{slot}_{i}" for i in range(len(values))]
+                conditions.append(f"{column} IN ({', '.join('$' + name for name in names)})")
+                params.update(zip(names, values))
+        
+        for slot, (column, _) in SLOT_COLUMNS.items():
+            values = slots.get(slot)
+            if not values:
+                continue
+            names = [f"{slot}_{i}" for i in range(len(values))]
+            conditions.append(f'"{column}" IN ({", ".join("$" + name for name in names)})')
+            params.update(zip(names, values))
+        
+        for j, (column, values) in enumerate(slots.get('entities', {}).items()):
+            names = [f"entity_{j}_{i}" for i in range(len(values))]
+            conditions.append(f'"{column}" IN ({", ".join("$" + name for name in names)})')
+            params.update(zip(names, values))
+        
+        clause = " AND ".join(conditions)
+        if clause and prefix:
+            clause = f"{prefix} {clause}"
+        return clause, params
+    
+    @staticmethod
+    def describe(slots):
+        """Résumé lisible des filtres, ex: « 2015, marché EU », « 2012-2014 », « 2012, 2015 »"""
+        def span(values, label):
+            # Une plage seulement pour des valeurs consécutives
+            if len(values) > 1 and values == list(range(values[0], values[-1] + 1)):
+                return f"{label(values[0])}-{label(values[-1])}"
+            return ", ".join(label(value) for value in values)
+        
+        parts = []
+        years = slots.get('years')
+        if years:
+            parts.append(span(years, str))
+        months = slots.get('months')
+        if months:
+            names = {number: name for name, number in MONTHS.items()}
+            parts.append(span(months, names.get))
+        labels = {'market': "marché", 'region': "région", 'category': "catégorie", 'segment': "segment"}
+        for slot, label in labels.items():
+            if slots.get(slot):
+                parts.append(f"{label} {', '.join(slots[slot])}")
+        for values in slots.get('entities', {}).values():
+            parts.append(", ".join(values))
+        return ", ".join(parts)
@@ -0,0 +1,415 @@
+import os
+import operator
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import pandas as pd
+import sqlglot
+from sqlglot import exp
+
+# Ré-agrégation d'une mesure déjà agrégée: SUM de SUM, SUM de COUNT, MIN de MIN, MAX de MAX
+ROLLUPS = {exp.Sum: 'sum', exp.Count: 'sum', exp.Min: 'min', exp.Max: 'max'}
+
+ARITHMETIC = {exp.Add: operator.add, exp.Sub: operator.sub, exp.Mul: operator.mul, exp.Div: operator.truediv}
+
+COMPARISONS = {
+    exp.EQ: operator.eq, exp.NEQ: operator.ne, exp.GT: operator.gt,
+    exp.GTE: operator.ge, exp.LT: operator.lt, exp.LTE: operator.le
+}
+
+# Comparaison retournée quand la valeur est à gauche: 2014 < Order_Year -> Order_Year > 2014
+FLIPPED = {exp.EQ: exp.EQ, exp.NEQ: exp.NEQ, exp.GT: exp.LT, exp.GTE: exp.LTE, exp.LT: exp.GT, exp.LTE: exp.GTE}
+
+def canonical(node):
+    """Forme comparable d'une expression: identifiants en minuscules et entre guillemets, sans préfixe de table"""
+    node = node.copy()
+    for column in list(node.find_all(exp.Column)):
+        column.set('table', None)
+    for identifier in list(node.find_all(exp.Identifier)):
+        identifier.set('this', identifier.this.lower())
+        identifier.set('quoted', True)
+    return node.sql(dialect='duckdb')
+
+def _conjuncts(node):
+    """Conditions d'un WHERE reliées par AND"""
+    node = node.unnest()
+    if isinstance(node, exp.And):
+        return _conjuncts(node.left) + _conjuncts(node.right)
+    return [node]
+
+def _literal(node):
+    """Valeur Python d'un littéral (chaîne, nombre, booléen), sinon None"""
+    if isinstance(node, exp.Neg):
+        value = _literal(node.this)
+        return -value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if isinstance(node, exp.Boolean):
+        return node.this
+    if not isinstance(node, exp.Literal):
+        return None
+    if node.is_string:
+        return node.this
+    try:
+        return int(node.this)
+    except ValueError:
+        return float(node.this)
+
+def _comparable(series, value):
+    """La comparaison pandas donnera le même résultat que DuckDB (pas de conversion implicite)"""
+    if value is None or pd.api.types.is_datetime64_any_dtype(series):
+        return False
+    if isinstance(value, str):
+        return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+    return pd.api.types.is_numeric_dtype(series)
+
+class ResultLineage:
+    """Lignée d'un résultat agrégé: table source, filtres, clés de regroupement et mesures.
+    
+    Seules les requêtes simples sont décrites (un SELECT sur une table, sans
+    jointure, sous-requête, HAVING, DISTINCT ni fenêtre); parse() retourne
+    None pour les autres.
+    """
+    
+    def __init__(self, sql, table, outputs, keys, measures, predicates, order, limit):
+        self.sql = sql
+        self.table = table
+        # [(nom de colonne du résultat, expression)]
+        self.outputs = outputs
+        # forme canonique -> colonne du résultat
+        self.keys = keys
+        self.measures = measures
+        # forme canonique -> condition du WHERE
+        self.predicates = predicates
+        # [(colonne du résultat, décroissant)], None si l'ordre porte sur une expression absente du résultat
+        self.order = order
+        self.limit = limit
+    
+    @classmethod
+    def parse(cls, sql, params=None):
+        """Lignée de la requête (analyse mise en cache: une question répétée n'est pas re-parsée), ou None"""
+        return cls._parse(sql, tuple(sorted((params or {}).items())))
+    
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _parse(cls, sql, params):
+        params = dict(params)
+        try:
+            statement = sqlglot.parse_one(sql, read='duckdb')
+        except sqlglot.errors.ParseError:
+            return None
+        if not isinstance(statement, exp.Select):
+            return None
+        if any(statement.args.get(arg) for arg in ('with', 'joins', 'having', 'distinct', 'offset', 'qualify')):
+            return None
+        source = statement.args.get('from')
+        if source is None or not isinstance(source.this, exp.Table) or statement.find(exp.Window):
+            return None
+        if any(select is not statement for select in statement.find_all(exp.Select)):
+            return None
+        
+        # Paramètres $nom remplacés par leur valeur: la lignée décrit la requête réellement exécutée
+        for placeholder in list(statement.find_all(exp.Placeholder)):
+            if placeholder.name not in params:
+                return None
+            placeholder.replace(exp.convert(params[placeholder.name]))
+        
+        outputs = [(select.alias_or_name, select.unalias()) for select in statement.selects]
+        names = [name for name, _ in outputs]
+        if any(isinstance(expression, exp.Star) for _, expression in outputs) or len(set(names)) != len(names):
+            return None
+        
+        # GROUP BY 1 ou GROUP BY alias désignent une colonne du SELECT
+        aliases = {name.lower(): expression for name, expression in outputs}
+        group = statement.args.get('group')
+        key_expressions = []
+        for item in group.expressions if group else []:
+            if isinstance(item, exp.Literal) and item.is_int and 0 < int(item.this) <= len(outputs):
+                item = outputs[int(item.this) - 1][1]
+            elif isinstance(item, exp.Column) and not item.table and item.name.lower() in aliases:
+                item = aliases[item.name.lower()]
+            key_expressions.append(canonical(item))
+        
+        if not key_expressions and not any(expression.find(exp.AggFunc) for _, expression in outputs):
+            return None
+        
+        keys, measures = {}, {}
+        for name, expression in outputs:
+            form = canonical(expression)
+            if form in key_expressions:
+                keys.setdefault(form, name)
+            elif expression.find(exp.AggFunc):
+                measures.setdefault(form, name)
+            else:
+                return None
+        # Une clé de regroupement absente du SELECT rend le résultat inutilisable comme sur-ensemble
+        if set(key_expressions) - set(keys):
+            return None
+        
+        where = statement.args.get('where')
+        predicates = {canonical(p): p for p in _conjuncts(where.this)} if where else {}
+        
+        order = []
+        positions = {name.lower(): name for name in names}
+        forms = {canonical(expression): name for name, expression in outputs}
+        for ordered in (statement.args.get('order') or exp.Order()).expressions:
+            target = ordered.this
+            if isinstance(target, exp.Literal) and target.is_int and 0 < int(target.this) <= len(outputs):
+                name = names[int(target.this) - 1]
+            elif isinstance(target, exp.Column) and not target.table and target.name.lower() in positions:
+                name = positions[target.name.lower()]
+            else:
+                name = forms.get(canonical(target))
+            if name is None:
+                order = None
+                break
+            order.append((name, bool(ordered.args.get('desc'))))
+        
+        limit = statement.args.get('limit')
+        if limit is not None:
+            limit = _literal(limit.expression)
+            if not isinstance(limit, int):
+                return None
+        
+        return cls(sql, canonical(source.this), outputs, keys, measures, predicates, order, limit)
+    
+    def is_complete(self, rows):
+        """Toutes les lignes du regroupement sont présentes (pas de LIMIT atteint)"""
+        return self.limit is None or rows < self.limit
+    
+    def derive(self, source, data):
+        """Calcule ce résultat en mémoire depuis celui de source (sur-ensemble), ou None si impossible"""
+        if self.table != source.table or not source.is_complete(len(data)) or self.order is None:
+            return None
+        if not set(source.predicates) <= set(self.predicates) or not set(self.keys) <= set(source.keys):
+            return None
+        
+        # 1. Filtres supplémentaires, appliqués sur les clés du sur-ensemble
+        frame = data
+        for form, predicate in self.predicates.items():
+            if form in source.predicates:
+                continue
+            mask = self._mask(predicate, frame, source.keys)
+            if mask is None:
+                return None
+            frame = frame[mask]
+        
+        # 2. Mêmes clés: sélection des colonnes; clés moins fines: ré-agrégation des mesures
+        if set(self.keys) == set(source.keys):
+            columns = {**source.keys, **source.measures}
+            
+            def leaf(node):
+                form = canonical(node)
+                return frame[columns[form]] if form in columns else None
+            index = frame.index
+        else:
+            leaf, index = self._rollup(source, frame)
+            if leaf is None:
+                return None
+        
+        result = {}
+        for name, expression in self.outputs:
+            value = self._evaluate(expression, leaf)
+            if value is None:
+                return None
+            result[name] = value if isinstance(value, pd.Series) else pd.Series(value, index=index)
+        # Index de regroupement abandonné: ses niveaux portent le nom des clés, qui sont aussi des colonnes
+        result = pd.DataFrame(result, index=index).reset_index(drop=True)
+        
+        # 3. Tri et LIMIT de la nouvelle requête
+        if self.order:
+            result = result.sort_values(
+                [name for name, _ in self.order],
+                ascending=[not desc for _, desc in self.order],
+                kind='stable',
+                na_position='last'
+            )
+        if self.limit is not None:
+            result = result.head(self.limit)
+        return result.reset_index(drop=True)
+    
+    def _rollup(self, source, frame):
+        """(résolution des feuilles, index) pour un regroupement plus large que celui de source"""
+        by = [source.keys[form] for form in self.keys]
+        grouped = frame.groupby(by, sort=False, dropna=False) if by else None
+        index = grouped.size().index if by else pd.RangeIndex(1)
+        
+        def aggregate(column, how, min_count=1):
+            if grouped is None:
+                values = frame[column]
+                value = values.sum(min_count=min_count) if how == 'sum' else getattr(values, how)()
+                return pd.Series([value], index=index)
+            if how == 'sum':
+                return grouped[column].sum(min_count=min_count)
+            return getattr(grouped[column], how)()
+        
+        def leaf(node):
+            form = canonical(node)
+            if form in self.keys:
+                level = list(self.keys).index(form)
+                return pd.Series(index.get_level_values(level) if len(by) > 1 else index, index=index)
+            if not isinstance(node, exp.AggFunc) or node.find(exp.Distinct) or isinstance(node.this, exp.Distinct):
+                return None
+            if type(node) in ROLLUPS and form in source.measures:
+                # COUNT d'un ensemble vide vaut 0, les autres agrégats NULL
+                return aggregate(source.measures[form], ROLLUPS[type(node)], 0 if isinstance(node, exp.Count) else 1)
+            if isinstance(node, exp.Avg):
+                total = canonical(exp.Sum(this=node.this.copy()))
+                count = canonical(exp.Count(this=node.this.copy()))
+                if total in source.measures and count in source.measures:
+                    return aggregate(source.measures[total], 'sum') / aggregate(source.measures[count], 'sum')
+            return None
+        
+        return leaf, index
+    
+    @classmethod
+    def _evaluate(cls, node, leaf):
+        """Valeur d'une expression de sortie: feuilles résolues par leaf, puis arithmétique simple"""
+        value = leaf(node)
+        if value is not None:
+            return value
+        if isinstance(node, exp.Paren):
+            return cls._evaluate(node.this, leaf)
+        if isinstance(node, exp.Literal) and not node.is_string:
+            return _literal(node)
+        if isinstance(node, exp.Neg):
+            value = cls._evaluate(node.this, leaf)
+            return None if value is None else -value
+        if isinstance(node, exp.Round):
+            value = cls._evaluate(node.this, leaf)
+            decimals = _literal(node.args['decimals']) if node.args.get('decimals') else 0
+            return None if value is None or not isinstance(decimals, int) else value.round(decimals)
+        if type(node) in ARITHMETIC:
+            left, right = cls._evaluate(node.left, leaf), cls._evaluate(node.right, leaf)
+            if left is None or right is None:
+                return None
+            return ARITHMETIC[type(node)](left, right)
+        return None
+    
+    @staticmethod
+    def _mask(predicate, frame, keys):
+        """Masque pandas d'une condition simple sur une clé du résultat (=, <>, <, IN, BETWEEN, IS NULL), sinon None"""
+        def column(node):
+            form = canonical(node)
+            return frame[keys[form]] if isinstance(node, exp.Column) and form in keys else None
+        
+        if type(predicate) in COMPARISONS:
+            op, left, right = type(predicate), predicate.left, predicate.right
+            if column(left) is None:
+                op, left, right = FLIPPED[op], right, left
+            series, value = column(left), _literal(right)
+            if series is None or not _comparable(series, value):
+                return None
+            # En SQL une clé NULL ne satisfait aucune comparaison, pas même <> (pandas: NaN != x est vrai)
+            return COMPARISONS[op](series, value) & series.notna()
+        
+        if isinstance(predicate, exp.In) and not predicate.args.get('query'):
+            series, values = column(predicate.this), [_literal(v) for v in predicate.expressions]
+            if series is None or not values or not all(_comparable(series, value) for value in values):
+                return None
+            return series.isin(values) & series.notna()
+        
+        if isinstance(predicate, exp.Between):
+            series = column(predicate.this)
+            low, high = _literal(predicate.args['low']), _literal(predicate.args['high'])
+            if series is None or not _comparable(series, low) or not _comparable(series, high):
+                return None
+            return series.between(low, high)
+        
+        negated = isinstance(predicate, exp.Not)
+        node = predicate.this if negated else predicate
+        if isinstance(node, exp.Is) and isinstance(node.expression, exp.Null):
+            series = column(node.this)
+            if series is None:
+                return None
+            return series.notna() if negated else series.isna()
+        
+        return None
+
+class LineageCache:
+    """Résultats agrégés récents avec leur lignée (SQL source, clés de regroupement, mesures).
+    
+    Une nouvelle requête qui filtre ou ré-agrège un résultat récent plus
+    détaillé (un total depuis les ventes par région, une région précise
+    depuis toutes les régions) est calculée en mémoire sans interroger
+    DuckDB. Les résultats sont liés à la version des données.
+    """
+    
+    def __init__(self, db, max_results=16, max_rows=100_000):
+        self.db = db
+        self.max_results = max_results
+        # Au-delà, un résultat n'est pas conservé (mémoire)
+        self.max_rows = max_rows
+        self.version = None
+        # SQL canonique -> (lignée, données), du plus ancien au plus récent
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def from_env(cls, db):
+        return cls(
+            db,
+            max_results=int(os.getenv('INSIGHTBOT_LINEAGE_MAX_RESULTS', '16')),
+            max_rows=int(os.getenv('INSIGHTBOT_LINEAGE_MAX_ROWS', '100000'))
+        )
+    
+    def derive(self, query, params=None):
+        """(données, SQL du résultat source) si la requête se calcule depuis un résultat récent, sinon None"""
+        if self.max_results <= 0:
+            return None
+        lineage = ResultLineage.parse(query, params)
+        if lineage is None:
+            return None
+        
+        version = self.db.get_data_version()
+        with self._lock:
+            if version != self.version:
+                self._results.clear()
+                self.version = version
+            candidates = list(reversed(self._results.items()))
+        
+        for key, (source, data) in candidates:
+            try:
+                derived = lineage.derive(source, data)
+            except Exception as e:
+                print(f"⚠️  Dérivation abandonnée: {e}")
+                derived = None
+            if derived is not None:
+                with self._lock:
+                    if key in self._results:
+                        self._results.move_to_end(key)
+                    self.hits += 1
+                print(f"♻️ Résultat dérivé en mémoire ({len(data):,} → {len(derived):,} lignes), sans requête DuckDB")
+                return derived, source.sql
+        return None
+    
+    def remember(self, query, params, data):
+        """Conserve un résultat exécuté (s'il est agrégé et de taille raisonnable)"""
+        if self.max_results <= 0 or data is None or len(data) > self.max_rows:
+            return
+        lineage = ResultLineage.parse(query, params)
+        if lineage is None:
+            return
+        
+        version = self.db.get_data_version()
+        key = (query, tuple(sorted((params or {}).items())))
+        with self._lock:
+            if version != self.version:
+                self._results.clear()
+                self.version = version
+            self._results[key] = (lineage, data)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+    
+    def execute(self, query, params=None):
+        """Résultat de la requête: dérivé d'un résultat récent si possible, sinon exécuté par DuckDB puis conservé"""
+        derived = self.derive(query, params)
+        if derived is not None:
+            return derived[0]
+        
+        with self._lock:
+            self.misses += 1
+        data = self.db.execute_query(query, params)
+        self.remember(query, params, data)
+        return data
@@ -0,0 +1,256 @@
+import os
+import gzip
+import time
+import uuid
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import pandas as pd
+
+class ResultStore:
+    """Résultats d'historique (données + JSON du graphique) sous budget mémoire par session et global.
+    
+    Les résultats les moins récemment consultés sont déversés sur disque (Parquet
+    compressé + JSON gzip); au-delà du budget disque ils sont supprimés et les
+    données seront régénérées depuis leur requête SQL. Un résultat sans requête
+    (réponses d'InsightBotAI) n'est jamais supprimé: il reste sur disque, ou en
+    mémoire si le déversement échoue. La mémoire d'une session inactive depuis
+    session_ttl secondes est libérée de la même façon (rien n'est perdu); seul
+    release() oublie les résultats d'une session.
+    """
+    
+    def __init__(self, db=None, session_budget=64 * 2 ** 20, global_budget=512 * 2 ** 20,
+                 disk_budget=2 * 2 ** 30, spill_dir=None, spill=True, session_ttl=2 * 3600):
+        self.db = db
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.disk_budget = disk_budget
+        self.spill = spill
+        self.spill_dir = Path(spill_dir or Path(tempfile.gettempdir()) / "insightbot_results")
+        self.session_ttl = session_ttl
+        
+        # result_id -> enregistrement, du moins récent au plus récent (LRU)
+        self._records = OrderedDict()
+        self._session_bytes = {}
+        # session -> dernier accès (time.time()), pour libérer les sessions abandonnées
+        self._session_seen = {}
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self.stats = {'spilled': 0, 'dropped': 0, 'reloaded': 0, 'regenerated': 0, 'expired': 0}
+        self._lock = threading.RLock()
+    
+    @classmethod
+    def from_env(cls, db=None):
+        """Construit le store à partir des variables d'environnement (budgets en Mo)"""
+        return cls(
+            db=db,
+            session_budget=float(os.getenv('INSIGHTBOT_SESSION_MEMORY_MB', '64')) * 2 ** 20,
+            global_budget=float(os.getenv('INSIGHTBOT_GLOBAL_MEMORY_MB', '512')) * 2 ** 20,
+            disk_budget=float(os.getenv('INSIGHTBOT_SPILL_DISK_MB', '2048')) * 2 ** 20,
+            spill_dir=os.getenv('INSIGHTBOT_SPILL_DIR') or None,
+            spill=os.getenv('INSIGHTBOT_SPILL', '1') != '0',
+            session_ttl=float(os.getenv('INSIGHTBOT_SESSION_TTL_MIN', '120')) * 60
+        )
+    
+    @staticmethod
+    def _size(data, chart_json):
+        """Empreinte mémoire approximative d'un résultat"""
+        size = len(chart_json) if chart_json else 0
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            usage = data.memory_usage(deep=True)
+            size += int(usage.sum()) if isinstance(data, pd.DataFrame) else int(usage)
+        return size
+    
+    def _account(self, record, sign):
+        self._memory_bytes += sign * record['bytes']
+        session = record['session']
+        self._session_bytes[session] = self._session_bytes.get(session, 0) + sign * record['bytes']
+    
+    def put(self, session_id, data, chart_json=None, sql_query=None):
+        """Enregistre un résultat et retourne son identifiant"""
+        record = {
+            'session': session_id,
+            'sql': sql_query,
+            'data': data,
+            'chart_json': chart_json,
+            'bytes': self._size(data, chart_json),
+            'state': 'memory',
+            'path': None,
+            'disk_bytes': 0
+        }
+        result_id = uuid.uuid4().hex
+        
+        with self._lock:
+            self._touch(session_id)
+            self._records[result_id] = record
+            self._account(record, +1)
+            self._enforce_budgets(session_id)
+        return result_id
+    
+    def get(self, result_id):
+        """Données et JSON du graphique d'un résultat (rechargés depuis le disque ou régénérés si besoin)"""
+        with self._lock:
+            record = self._records.get(result_id)
+            if record is None:
+                return {'data': None, 'chart_json': None, 'state': 'missing'}
+            
+            self._records.move_to_end(result_id)
+            self._touch(record['session'])
+            state = record['state']
+            if state == 'spilled':
+                self._reload(record)
+                self.stats['reloaded'] += 1
+                self._restore(result_id, record)
+            if state != 'dropped':
+                return {'data': record['data'], 'chart_json': record['chart_json'], 'state': state}
+            sql = record['sql']
+        
+        # Requête relancée hors du verrou: les autres sessions n'attendent pas DuckDB
+        data = self.db.execute_query(sql) if self.db is not None else None
+        with self._lock:
+            # Entre-temps, le résultat a pu être régénéré par un autre appel ou oublié (release)
+            if record['state'] == 'dropped' and self._records.get(result_id) is record:
+                record['data'] = data
+                record['bytes'] = self._size(data, None)
+                self.stats['regenerated'] += 1
+                self._restore(result_id, record)
+            return {'data': data, 'chart_json': record['chart_json'], 'state': state}
+    
+    def _restore(self, result_id, record):
+        """Résultat de nouveau en mémoire, compté dans les budgets"""
+        record['state'] = 'memory'
+        self._account(record, +1)
+        self._enforce_budgets(record['session'], keep=result_id)
+    
+    def _touch(self, session_id):
+        """Note l'accès à une session et libère la mémoire de celles restées inactives au-delà du TTL"""
+        now = time.time()
+        self._session_seen[session_id] = now
+        if self.session_ttl is None:
+            return
+        for session, seen in list(self._session_seen.items()):
+            if now - seen > self.session_ttl:
+                self._expire(session)
+    
+    def _expire(self, session_id):
+        """Session inactive: ses résultats quittent la mémoire comme sous budget (déversés, sinon régénérables), sans suppression"""
+        for result_id, record in list(self._records.items()):
+            if record['session'] == session_id and record['state'] == 'memory':
+                self._evict(result_id, record)
+        if not self._session_bytes.get(session_id):
+            self._session_bytes.pop(session_id, None)
+        # Suivie de nouveau à son prochain accès
+        self._session_seen.pop(session_id, None)
+        self.stats['expired'] += 1
+    
+    def _reload(self, record):
+        """Relit un résultat déversé sur disque"""
+        path = record['path']
+        record['data'] = pd.read_parquet(path / "data.parquet") if (path / "data.parquet").exists() else None
+        if (path / "chart.json.gz").exists():
+            with gzip.open(path / "chart.json.gz", 'rt', encoding='utf-8') as f:
+                record['chart_json'] = f.read()
+    
+    def _spill(self, result_id, record):
+        """Écrit un résultat sur disque (les fichiers déjà écrits sont réutilisés)"""
+        if record['path'] is None:
+            path = self.spill_dir / result_id
+            path.mkdir(parents=True, exist_ok=True)
+            record['path'] = path
+            if isinstance(record['data'], pd.DataFrame):
+                record['data'].to_parquet(path / "data.parquet", compression='zstd', index=False)
+            if record['chart_json']:
+                with gzip.open(path / "chart.json.gz", 'wt', encoding='utf-8') as f:
+                    f.write(record['chart_json'])
+            record['disk_bytes'] = sum(f.stat().st_size for f in path.iterdir())
+            self._disk_bytes += record['disk_bytes']
+        record['state'] = 'spilled'
+        self.stats['spilled'] += 1
+    
+    def _delete_files(self, record):
+        if record['path'] is not None:
+            for f in record['path'].iterdir():
+                f.unlink()
+            record['path'].rmdir()
+            self._disk_bytes -= record['disk_bytes']
+            record['path'] = None
+            record['disk_bytes'] = 0
+    
+    def _evict(self, result_id, record):
+        """Libère la mémoire d'un résultat: déversement sur disque, sinon abandon"""
+        # Seuls les DataFrame sont volumineux; scalaires et séries d'indicateurs restent en mémoire
+        if not isinstance(record['data'], pd.DataFrame):
+            return False
+        
+        self._account(record, -1)
+        spilled = False
+        if self.spill:
+            try:
+                self._spill(result_id, record)
+                spilled = True
+            except Exception as e:
+                print(f"⚠️  Déversement impossible, résultat abandonné: {e}")
+                self._delete_files(record)
+        if not spilled:
+            if not record['sql']:
+                # Sans requête, le résultat ne pourrait pas être régénéré: il reste en mémoire
+                self._account(record, +1)
+                return False
+            record['state'] = 'dropped'
+            self.stats['dropped'] += 1
+        
+        record['data'] = None
+        record['chart_json'] = None
+        return True
+    
+    def _enforce_budgets(self, session_id, keep=None):
+        """Évince les résultats les moins récents jusqu'à respecter les budgets"""
+        for result_id, record in list(self._records.items()):
+            over_session = self._session_bytes.get(session_id, 0) > self.session_budget
+            if not over_session and self._memory_bytes <= self.global_budget:
+                break
+            if result_id == keep or record['state'] != 'memory':
+                continue
+            if over_session and record['session'] != session_id and self._memory_bytes <= self.global_budget:
+                continue
+            self._evict(result_id, record)
+        
+        # Budget disque: les plus anciens fichiers sont supprimés (régénération SQL à la demande)
+        for result_id, record in list(self._records.items()):
+            if self._disk_bytes <= self.disk_budget:
+                break
+            if record['path'] is None or not record['sql']:
+                continue
+            self._delete_files(record)
+            if record['state'] == 'spilled':
+                record['state'] = 'dropped'
+                self.stats['dropped'] += 1
+    
+    def release(self, session_id):
+        """Oublie tous les résultats d'une session (historique effacé)"""
+        with self._lock:
+            for result_id, record in list(self._records.items()):
+                if record['session'] == session_id:
+                    if record['state'] == 'memory':
+                        self._account(record, -1)
+                    self._delete_files(record)
+                    del self._records[result_id]
+            self._session_bytes.pop(session_id, None)
+            self._session_seen.pop(session_id, None)
+    
+    def usage(self, session_id=None):
+        """Occupation mémoire et disque (octets) et compteurs de déversement"""
+        with self._lock:
+            states = [record['state'] for record in self._records.values()]
+            return {
+                'session_bytes': self._session_bytes.get(session_id, 0),
+                'global_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes,
+                'session_budget': self.session_budget,
+                'global_budget': self.global_budget,
+                'results': len(states),
+                'in_memory': states.count('memory'),
+                'on_disk': states.count('spilled'),
+                **self.stats
+            }
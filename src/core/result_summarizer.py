@@ -0,0 +1,147 @@
+import re
+import warnings
+import numpy as np
+import pandas as pd
+
+# Colonnes interprétées comme axe temporel (même si elles sont numériques, ex: Order_Year).
+# Le nom entier doit correspondre: avg_processing_days ou monthly_sales restent des mesures.
+TIME_COLUMN_PATTERN = re.compile(
+    r'^(?:(?:order|ship|commande)[ _])?'
+    r'(?:date|year|month|yearmonth|year_month|mois|annee|année|annee_mois|period|periode|période|'
+    r'quarter|trimestre|week|semaine|day|jour)$',
+    re.IGNORECASE
+)
+
+def _as_frame(data):
+    """Ramène un résultat (DataFrame, Series d'une ligne, scalaire) à un DataFrame"""
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, pd.Series):
+        return data.to_frame().T
+    return pd.DataFrame({'value': [data]})
+
+def _split_columns(frame, max_measures):
+    """Sépare colonnes temporelles (ex: année puis mois), dimensions et mesures"""
+    time_columns, dimensions, measures = [], [], []
+    
+    for column in frame.columns:
+        series = frame[column]
+        is_time = (
+            pd.api.types.is_datetime64_any_dtype(series)
+            or isinstance(series.dtype, pd.PeriodDtype)
+            or TIME_COLUMN_PATTERN.match(str(column)) is not None
+        )
+        if is_time:
+            time_columns.append(column)
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            measures.append(column)
+        else:
+            dimensions.append(column)
+    
+    return time_columns, dimensions, measures[:max_measures]
+
+def _time_order(frame):
+    """Positions des lignes dans l'ordre chronologique (année puis mois...): valeurs natives, texte seulement pour les objets"""
+    frame = frame.reset_index(drop=True)
+    frame = frame.apply(lambda series: series.astype(str) if series.dtype == object else series)
+    return frame.sort_values(list(frame.columns), kind='stable', na_position='last').index.to_numpy()
+
+def summarize_result(data, top_k=3, max_measures=4, outlier_z=3.0):
+    """Profil statistique compact d'un résultat, calculé en une passe vectorisée sur toutes les lignes"""
+    frame = _as_frame(data)
+    time_columns, dimensions, measures = _split_columns(frame, max_measures)
+    time_column = time_columns[0] if time_columns else None
+    
+    # Période lisible: année et mois réunis, ex: "2014/3"
+    if time_columns:
+        time_labels = frame[time_columns].astype(str).agg('/'.join, axis=1).to_numpy()
+    
+    label_column = dimensions[0] if dimensions else time_column
+    if dimensions:
+        labels = frame[label_column].astype(str).str.slice(0, 40).to_numpy()
+    elif time_columns:
+        labels = time_labels
+    else:
+        labels = frame.index.astype(str).to_numpy()
+    
+    profile = {
+        'rows': len(frame),
+        'columns': [str(c) for c in frame.columns],
+        'label_column': label_column,
+        'time_column': time_column,
+        'time_columns': [str(c) for c in time_columns],
+        'measures': {}
+    }
+    if not measures or len(frame) == 0:
+        return profile
+    
+    values = frame[measures].to_numpy(dtype=float)
+    k = min(top_k, len(frame))
+    
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        
+        # Statistiques de toutes les mesures en une seule fois (axe 0 = lignes)
+        totals = np.nansum(values, axis=0)
+        means = np.nanmean(values, axis=0)
+        stds = np.nanstd(values, axis=0)
+        mins = np.nanmin(values, axis=0)
+        maxs = np.nanmax(values, axis=0)
+        
+        # Parts calculées seulement pour des mesures positives (sinon elles n'ont pas de sens)
+        shares = np.where(((mins >= 0) & (totals > 0))[None, :], values / totals, np.nan)
+        
+        # Top / bas k (les NaN sont rejetés en fin de tri)
+        top_index = np.argsort(np.where(np.isnan(values), np.inf, -values), axis=0, kind='stable')[:k]
+        bottom_index = np.argsort(np.where(np.isnan(values), np.inf, values), axis=0, kind='stable')[:k]
+        
+        # Valeurs atypiques par z-score
+        z_scores = np.nan_to_num(np.abs((values - means) / np.where(stds == 0, np.inf, stds)))
+        outlier_index = np.argsort(-z_scores, axis=0, kind='stable')[:k]
+        
+        # Évolution entre la première et la dernière période
+        growth = None
+        if time_columns and len(frame) > 1:
+            time_order = _time_order(frame[time_columns])
+            first, last = values[time_order[0]], values[time_order[-1]]
+            growth = np.where(first != 0, (last - first) / np.abs(first) * 100, np.nan)
+            profile['period'] = (time_labels[time_order[0]], time_labels[time_order[-1]])
+    
+    for j, measure in enumerate(measures):
+        profile['measures'][str(measure)] = {
+            'total': totals[j],
+            'mean': means[j],
+            'min': mins[j],
+            'max': maxs[j],
+            'top': [(labels[i], values[i, j], shares[i, j]) for i in top_index[:, j]],
+            'bottom': [(labels[i], values[i, j], shares[i, j]) for i in bottom_index[:, j]],
+            'outliers': [(labels[i], values[i, j]) for i in outlier_index[:, j] if z_scores[i, j] > outlier_z],
+            'growth': None if growth is None else growth[j]
+        }
+    
+    return profile
+
+def _format_entry(label, value, share=np.nan):
+    if np.isnan(share):
+        return f"{label} ({value:,.2f})"
+    return f"{label} ({value:,.2f}, {share * 100:.1f}%)"
+
+def format_profile(profile):
+    """Texte compact (taille bornée) du profil, destiné au prompt"""
+    lines = [f"Lignes: {profile['rows']} | Colonnes: {', '.join(profile['columns'][:10])}"]
+    
+    for measure, stats in profile['measures'].items():
+        lines.append(
+            f"{measure}: total {stats['total']:,.2f} | moyenne {stats['mean']:,.2f} | "
+            f"min {stats['min']:,.2f} | max {stats['max']:,.2f}"
+        )
+        if profile['rows'] > 1:
+            lines.append("  top: " + ", ".join(_format_entry(*entry) for entry in stats['top']))
+            lines.append("  bas: " + ", ".join(_format_entry(*entry) for entry in stats['bottom']))
+        if stats['growth'] is not None and not np.isnan(stats['growth']):
+            start, end = profile['period']
+            lines.append(f"  évolution {start} → {end}: {stats['growth']:+.1f}%")
+        if stats['outliers']:
+            lines.append("  atypiques: " + ", ".join(_format_entry(*entry) for entry in stats['outliers']))
+    
+    return "\n".join(lines)
@@ -0,0 +1,170 @@
+import numpy as np
+import unicodedata
+import threading
+import zlib
+import re
+
+# Formulations équivalentes ramenées à un même terme avant vectorisation
+SYNONYMES = {
+    r"\bchiffres? d ?affaires?\b": "ventes",
+    r"\bca\b": "ventes",
+    r"\bventes?\b": "ventes",
+    r"\bbenefices?\b": "profit",
+    r"\bprofits?\b": "profit",
+    r"\bcategories?\b": "categorie",
+    r"\bregions?\b": "region",
+    r"\bmarches?\b": "marche",
+    r"\bclients?\b": "client",
+    r"\bproduits?\b": "produit",
+}
+
+# Mesures demandées: deux questions sur des mesures différentes ne partagent jamais une réponse
+MESURES = {
+    "ventes": r"\b(?:ventes|sales)\b",
+    "profit": r"\b(?:profit|rentabilites?)\b",
+    "quantite": r"\b(?:quantites?|quantity|quantities)\b",
+    "marge": r"\b(?:marges?|margin)\b",
+    "remise": r"\b(?:remises?|reductions?|discounts?)\b",
+    "retour": r"\b(?:retours?|retourne(?:e|s|es)?|returns?|returned)\b",
+}
+
+# Mots outils sans valeur pour la similarité
+MOTS_VIDES = {
+    "quel", "quels", "quelle", "quelles", "est", "sont", "le", "la", "les",
+    "l", "de", "des", "du", "d", "un", "une", "moi", "montre", "donne",
+    "affiche", "quoi", "what", "is", "the", "et", "a"
+}
+
+def normalize_question(question):
+    """Normalise une question: minuscules, sans accents, sans ponctuation, synonymes"""
+    text = unicodedata.normalize('NFKD', question.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    for pattern, replacement in SYNONYMES.items():
+        text = re.sub(pattern, replacement, text)
+    words = [w for w in text.split() if w not in MOTS_VIDES]
+    return ' '.join(words)
+
+def question_numbers(question):
+    """Nombres cités dans une question (année, top N, trimestre), dans l'ordre"""
+    return re.findall(r"\d+", normalize_question(question))
+
+def question_measures(question):
+    """Mesures citées dans une question (ventes, profit, quantité, marge, remise, retour)"""
+    text = normalize_question(question)
+    return {measure for measure, pattern in MESURES.items() if re.search(pattern, text)}
+
+class SemanticCache:
+    """Cache des questions déjà traitées, retrouvées par similarité (TF-IDF de n-grammes de caractères)"""
+    
+    def __init__(self, threshold=0.85, ngram_range=(2, 4), dim=2 ** 12, max_entries=500, enabled=True):
+        # Désactivé: aucune réponse n'est conservée ni réutilisée (mesures, débogage)
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ngram_range = ngram_range
+        self.dim = dim
+        self.max_entries = max_entries
+        
+        # Matrice des fréquences brutes (une ligne par question) et fréquences documentaires
+        self.tf = np.zeros((0, dim), dtype=np.float32)
+        self.df = np.zeros(dim, dtype=np.float32)
+        self.entries = []
+        self.versions = np.array([], dtype=object)
+        
+        # Matrice TF-IDF normalisée, recalculée seulement après un ajout
+        self._weighted = None
+        self._lock = threading.Lock()
+    
+    def _vectorize(self, question):
+        """Compte les n-grammes de caractères (hachés) d'une question normalisée"""
+        text = f" {normalize_question(question)} "
+        vector = np.zeros(self.dim, dtype=np.float32)
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(text) - n + 1):
+                vector[zlib.crc32(text[i:i + n].encode()) % self.dim] += 1
+        return vector
+    
+    def _idf(self):
+        """Poids IDF lissés"""
+        n_docs = len(self.entries)
+        return np.log((1 + n_docs) / (1 + self.df)) + 1
+    
+    def _weighted_matrix(self, idf):
+        """Matrice TF-IDF normalisée de toutes les questions en cache"""
+        if self._weighted is None:
+            weighted = self.tf * idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            self._weighted = weighted / norms
+        return self._weighted
+    
+    def search(self, question, data_version, k=3):
+        """Retourne les k questions les plus proches: liste de (similarité, entrée)"""
+        with self._lock:
+            if not self.entries:
+                return []
+            
+            idf = self._idf()
+            query = self._vectorize(question) * idf
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+            
+            # Similarité cosinus vectorisée contre tout le cache
+            scores = self._weighted_matrix(idf) @ (query / norm)
+            
+            # Seules les réponses calculées sur la version courante des données sont valides
+            scores = np.where(self.versions == data_version, scores, -1.0)
+            
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            
+            return [(float(scores[i]), self.entries[i]) for i in top if scores[i] >= 0]
+    
+    def lookup(self, question, data_version, k=3):
+        """Retourne l'entrée la plus proche qui dépasse le seuil de similarité et cite les mêmes nombres et mesures.
+        
+        « en 2014 » et « en 2015 », « top 5 » et « top 50 », « ventes » et
+        « quantités » ne diffèrent que de quelques n-grammes: la similarité
+        seule ne les distingue pas.
+        """
+        if not self.enabled:
+            return None
+        numbers, measures = question_numbers(question), question_measures(question)
+        for similarity, entry in self.search(question, data_version, k=k):
+            if similarity < self.threshold:
+                break
+            if question_numbers(entry['question']) == numbers and question_measures(entry['question']) == measures:
+                return similarity, entry
+        return None
+    
+    def add(self, question, data_version, result):
+        """Ajoute une réponse au cache"""
+        if not self.enabled:
+            return
+        vector = self._vectorize(question)
+        
+        with self._lock:
+            # Éviction de la plus ancienne entrée si le cache est plein
+            if len(self.entries) >= self.max_entries:
+                self.df -= (self.tf[0] > 0)
+                self.tf = self.tf[1:]
+                self.entries.pop(0)
+                self.versions = self.versions[1:]
+            
+            self.tf = np.vstack([self.tf, vector])
+            self.df += (vector > 0)
+            self.entries.append({'question': question, 'result': result})
+            self.versions = np.append(self.versions, data_version)
+            self._weighted = None
+    
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self.tf = np.zeros((0, self.dim), dtype=np.float32)
+            self.df = np.zeros(self.dim, dtype=np.float32)
+            self.entries = []
+            self.versions = np.array([], dtype=object)
+            self._weighted = None
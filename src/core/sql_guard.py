@@ -0,0 +1,149 @@
+import re
+from functools import lru_cache
+
+# Nœuds SQL qui modifient la base ou son environnement (classes de sqlglot.exp)
+WRITE_NODE_NAMES = (
+    'Insert', 'Update', 'Delete', 'Merge', 'Drop', 'Create', 'Alter',
+    'AlterTable', 'TruncateTable', 'Copy', 'Command', 'Set', 'Pragma',
+    'Use', 'Attach', 'Detach', 'Transaction', 'Commit', 'Rollback'
+)
+
+# Tables que les requêtes générées peuvent lire (les fonctions comme read_csv_auto ou glob liraient des fichiers du serveur)
+READABLE_TABLES = ('merged', 'orders', 'returns', 'peoples')
+
+# Opérateurs DuckDB qui trahissent un produit cartésien
+CARTESIAN_OPERATORS = ('CROSS_PRODUCT',)
+
+# Estimations de cardinalité dans le plan EXPLAIN (DuckDB >= 1.1 puis anciens formats)
+CARDINALITY_PATTERNS = (
+    re.compile(r'~\s*([\d,]+)\s*rows?', re.IGNORECASE),
+    re.compile(r'EC:\s*([\d,]+)'),
+)
+
+@lru_cache(maxsize=None)
+def write_nodes():
+    """Classes sqlglot des nœuds d'écriture présentes dans la version installée (sqlglot importé au premier appel)"""
+    from sqlglot import exp
+    return tuple(getattr(exp, name) for name in WRITE_NODE_NAMES if hasattr(exp, name))
+
+class SQLGuardError(Exception):
+    """Requête refusée par le garde-fou SQL"""
+
+class SQLGuard:
+    """Vérifie et borne les requêtes générées avant leur exécution"""
+    
+    def __init__(self, db, max_rows=5000, max_estimated_rows=10_000_000, default_limit=1000, tables=READABLE_TABLES):
+        self.db = db
+        self.tables = {table.lower() for table in tables}
+        self.max_rows = max_rows
+        self.max_estimated_rows = max_estimated_rows
+        self.default_limit = default_limit
+    
+    def parse(self, sql):
+        """Parse la requête et vérifie qu'il s'agit d'une seule lecture, limitée aux tables autorisées"""
+        import sqlglot
+        from sqlglot import exp
+        
+        try:
+            statements = [s for s in sqlglot.parse(sql, read='duckdb') if s is not None]
+        except sqlglot.errors.ParseError as e:
+            raise SQLGuardError(f"SQL invalide: {e}")
+        
+        if len(statements) != 1:
+            raise SQLGuardError(f"Une seule requête attendue ({len(statements)} trouvées)")
+        
+        statement = statements[0]
+        if not isinstance(statement, exp.Query):
+            raise SQLGuardError(f"Seules les requêtes SELECT sont autorisées ({statement.key})")
+        
+        write_node = statement.find(*write_nodes())
+        if write_node is not None:
+            raise SQLGuardError(f"Opération d'écriture interdite ({write_node.key})")
+        
+        self.check_tables(statement)
+        return statement
+    
+    def check_tables(self, statement):
+        """Refuse les fonctions table (read_csv_auto, read_parquet, glob...) et les tables hors de la liste autorisée"""
+        from sqlglot import exp
+        
+        # Les noms des CTE (WITH t AS ...) sont lus comme des tables
+        names = self.tables | {cte.alias_or_name.lower() for cte in statement.find_all(exp.CTE)}
+        for table in statement.find_all(exp.Table):
+            if not isinstance(table.this, exp.Identifier):
+                raise SQLGuardError(f"Fonction table interdite ({table.this.sql(dialect='duckdb')})")
+            if table.name.lower() not in names or table.args.get('catalog') or table.db.lower() not in ('', 'main'):
+                raise SQLGuardError(f"Table non autorisée ({table.sql(dialect='duckdb')})")
+    
+    def has_cartesian_join(self, statement):
+        """Détecte les jointures sans condition dans l'arbre SQL"""
+        from sqlglot import exp
+        
+        for select in statement.find_all(exp.Select):
+            for join in select.args.get('joins') or []:
+                kind = (join.args.get('kind') or '').upper()
+                if (join.args.get('method') or '').upper() == 'NATURAL':
+                    continue
+                if kind == 'CROSS' or not (join.args.get('on') or join.args.get('using')):
+                    # "FROM a, b WHERE a.x = b.x" est une jointure implicite acceptable
+                    where = select.args.get('where')
+                    if kind != 'CROSS' and where is not None and where.find(exp.EQ):
+                        continue
+                    return True
+        return False
+    
+    def inspect_plan(self, sql):
+        """Analyse le plan EXPLAIN: cardinalité estimée maximale et produit cartésien"""
+        plan = self.db.explain(sql)
+        if plan is None:
+            return None, False
+        
+        estimates = [
+            int(match.replace(',', ''))
+            for pattern in CARDINALITY_PATTERNS
+            for match in pattern.findall(plan)
+        ]
+        max_estimate = max(estimates) if estimates else None
+        cartesian = any(operator in plan for operator in CARTESIAN_OPERATORS)
+        return max_estimate, cartesian
+    
+    def apply_limit(self, statement):
+        """Ajoute un LIMIT par défaut ou plafonne celui demandé"""
+        limit = statement.args.get('limit')
+        if limit is None:
+            return statement.limit(self.default_limit), True
+        
+        try:
+            requested = int(limit.expression.name)
+        except (AttributeError, ValueError):
+            requested = None
+        
+        if requested is None or requested > self.max_rows:
+            return statement.limit(self.max_rows), True
+        return statement, False
+    
+    def check(self, sql):
+        """Retourne une version sûre de la requête ou lève SQLGuardError"""
+        return self.bound(sql)[0]
+    
+    def bound(self, sql):
+        """Comme check, mais retourne (requête sûre, LIMIT ajouté ou plafonné par le garde-fou, sinon None)"""
+        statement = self.parse(sql)
+        
+        if self.has_cartesian_join(statement):
+            raise SQLGuardError("Jointure sans condition (produit cartésien)")
+        
+        max_estimate, cartesian = self.inspect_plan(sql)
+        if cartesian:
+            raise SQLGuardError("Le plan d'exécution contient un produit cartésien")
+        if max_estimate is not None and max_estimate > self.max_estimated_rows:
+            raise SQLGuardError(
+                f"Coût estimé trop élevé: ~{max_estimate:,} lignes (budget {self.max_estimated_rows:,})"
+            )
+        
+        statement, rewritten = self.apply_limit(statement)
+        if rewritten:
+            safe_sql = statement.sql(dialect='duckdb')
+            print(f"🛡️ Requête bornée: {safe_sql}")
+            return safe_sql, int(statement.args['limit'].expression.name)
+        return sql, None
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+import pytest
+
+# Les modules s'importent depuis src, comme dans les applications
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.database_manager import DatabaseManager
+
+MERGED_CSV = """Order ID,Region,Category,Returned,Sales,Profit,Order_Year,Order_Month
+O1,Central,Technology,Oui,5.0,1.0,2014,1
+O2,Central,Furniture,,3.0,0.5,2014,2
+O3,North,Technology,,4.0,2.0,2015,3
+O4,North,Furniture,Oui,3.0,-1.0,2015,4
+O5,South,Technology,,2.0,0.2,2015,5
+O6,South,Furniture,,1.0,0.1,2015,6
+"""
+
+def write_merged(base_path, content=MERGED_CSV):
+    processed = base_path / "data" / "processed"
+    processed.mkdir(parents=True, exist_ok=True)
+    (processed / "cleaned_merged.csv").write_text(content, encoding='utf-8')
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Base DuckDB sous tmp_path, chargée par create_tables depuis un petit CSV merged"""
+    # DatabaseManager crée son arborescence relative au répertoire courant
+    monkeypatch.chdir(tmp_path)
+    manager = DatabaseManager()
+    manager.base_path = tmp_path
+    manager.db_path = tmp_path / "insightbot.db"
+    write_merged(tmp_path)
+    manager.connect()
+    manager.create_tables()
+    yield manager
+    manager.close()
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from core.chart_reducer import ChartReducer
+from core.sql_guard import SQLGuard
+
+@pytest.fixture
+def daily(db):
+    """Ventes quotidiennes sur quatre ans (1 461 jours), à la place de merged (seule table lisible par le garde-fou)"""
+    db.cursor().execute("""
+        CREATE OR REPLACE TABLE merged AS
+        SELECT CAST(d AS DATE) AS "Order Date", 1.0 AS Sales
+        FROM range(DATE '2012-01-01', DATE '2016-01-01', INTERVAL 1 DAY) t(d)
+    """)
+    return db
+
+SERIES_SQL = 'SELECT "Order Date", SUM(Sales) AS total_sales FROM merged GROUP BY 1 ORDER BY 1'
+
+def guarded(db, sql):
+    safe_sql, limit = SQLGuard(db).bound(sql)
+    data = db.execute_query(safe_sql)
+    return data, limit is not None and len(data) >= limit
+
+def test_guard_reports_injected_limit(daily):
+    safe_sql, limit = SQLGuard(daily).bound(SERIES_SQL)
+    assert limit == 1000 and safe_sql.endswith("LIMIT 1000")
+    assert SQLGuard(daily).bound(SERIES_SQL + " LIMIT 10") == (SERIES_SQL + " LIMIT 10", None)
+
+def test_truncated_series_is_read_in_full(daily):
+    data, truncated = guarded(daily, SERIES_SQL)
+    assert truncated and len(data) == 1000
+    points, bucket = ChartReducer(daily).line_data(data, 'Order Date', ['total_sales'], SERIES_SQL, truncated)
+    assert bucket is None
+    assert len(points) == 1461
+
+def test_truncated_series_is_bucketed_over_full_range(daily):
+    data, truncated = guarded(daily, SERIES_SQL)
+    points, bucket = ChartReducer(daily, max_points=500).line_data(data, 'Order Date', ['total_sales'], SERIES_SQL, truncated)
+    assert bucket == "semaine"
+    assert points['total_sales'].sum() == 1461
+    assert points['Order Date'].max() >= pd.Timestamp('2015-12-28')
+
+def test_bucket_query_keeps_requested_limit(daily):
+    sql = SERIES_SQL + " LIMIT 700"
+    data = daily.execute_query(sql)
+    points, bucket = ChartReducer(daily, max_points=200).line_data(data, 'Order Date', ['total_sales'], sql)
+    assert bucket == "semaine"
+    assert points['total_sales'].sum() == 700
@@ -0,0 +1,88 @@
+import pytest
+from core.entity_index import EntityIndex
+from core.insightbot_gpt import InsightBotGPT
+from core.question_slots import SlotExtractor
+from conftest import write_merged
+
+ENTITY_CSV = """Order ID,Region,Market,Category,Segment,Sub-Category,Product Name,Customer Name,Country,State,City,Sales,Order_Year,Order_Month
+E1,North,EU,Technology,Consumer,Phones,"Apple Smart Phone, Full Size",Claire Gute,France,Nord,Lille,5.0,2014,1
+E2,Central,EU,Furniture,Corporate,Chairs,Apple Chair,Darrin Van Huff,Germany,Bavaria,Munich,3.0,2014,2
+E3,East,US,Technology,Consumer,Phones,Nokia Smart Phone,Sean Miller,United States,Alabama,Mobile,4.0,2015,3
+E4,East,US,Furniture,Corporate,Tables,Bevis Table,Sean Miller,United States,Washington,Seattle,2.0,2015,4
+E5,East,US,Furniture,Consumer,Tables,Bevis Table,Claire Gute,United States,District of Columbia,Washington,1.0,2015,5
+"""
+
+class DisabledLLM:
+    enabled = False
+
+@pytest.fixture
+def index(db, tmp_path):
+    write_merged(tmp_path, ENTITY_CSV)
+    db.create_tables()
+    return EntityIndex(db)
+
+def test_trie_prefers_longest_exact_value(index):
+    matches = index.resolve("ventes de Apple Smart Phone Full Size à Lille")
+    assert [(m['column'], m['value'], m['score']) for m in matches] == [
+        ('Product Name', "Apple Smart Phone, Full Size", 1.0),
+        ('City', "Lille", 1.0)
+    ]
+
+def test_french_alias_is_exact(index):
+    assert EntityIndex.filters(index.resolve("ventes en Allemagne")) == {'Country': ['Germany']}
+
+def test_trigrams_match_typos_below_exact_score(index):
+    matches = index.resolve("commandes de Claire Gutte")
+    assert [(m['column'], m['value']) for m in matches] == [('Customer Name', "Claire Gute")]
+    assert index.min_similarity <= matches[0]['score'] < 1.0
+
+def test_question_terms_are_not_values(index):
+    assert index.resolve("ventes par catégorie et par client") == []
+
+@pytest.mark.parametrize('question, column', [
+    ("ventes à Washington", 'State'),
+    ("ventes de la ville de Washington", 'City'),
+])
+def test_ambiguous_value_follows_column_hint(index, question, column):
+    assert EntityIndex.filters(index.resolve(question)) == {column: ['Washington']}
+
+def test_reserved_phrases_are_skipped(index):
+    assert EntityIndex.filters(index.resolve("ventes au nord")) == {'State': ['Nord']}
+    assert index.resolve("ventes au nord", reserved=["nord"]) == []
+
+def test_slot_aliases_win_over_exact_values(index, db):
+    extractor = SlotExtractor(db, index)
+    assert extractor.extract("ventes au nord") == {'region': ['North']}
+    assert extractor.extract("ventes à Lille") == {'entities': {'City': ['Lille']}}
+
+def test_fuzzy_matches_are_not_slots(index, db):
+    assert SlotExtractor(db, index).extract("ventes mobiles") == {}
+
+@pytest.fixture
+def bot(index, db):
+    bot = InsightBotGPT(db=db, llm=DisabledLLM(), snapshot=False)
+    bot.entity_index = index
+    return bot
+
+def test_resolve_entities_splits_exact_and_fuzzy(bot):
+    assert bot.resolve_entities("ventes mobiles") == ({}, {'City': ['Mobile']})
+    assert bot.resolve_entities("ventes au nord") == ({}, {})
+    assert bot.resolve_entities("ventes à Mobile") == ({'City': ['Mobile']}, {})
+
+def test_apply_entity_filters_adds_missing_filters(bot):
+    sql = bot.apply_entity_filters("SELECT SUM(Sales) AS s FROM merged WHERE Order_Year = 2015", {'City': ['Lille']})
+    assert sql == "SELECT SUM(Sales) AS s FROM merged WHERE Order_Year = 2015 AND \"City\" IN ('Lille')"
+
+@pytest.mark.parametrize('sql', [
+    # Colonne déjà filtrée par le modèle, jointure, autre table
+    "SELECT SUM(Sales) AS s FROM merged WHERE City = 'Munich'",
+    "SELECT SUM(m.Sales) AS s FROM merged AS m JOIN returns AS r ON m.\"Order ID\" = r.\"Order ID\"",
+    "SELECT COUNT(*) AS n FROM orders",
+])
+def test_apply_entity_filters_leaves_sql_alone(bot, sql):
+    assert bot.apply_entity_filters(sql, {'City': ['Lille']}) == sql
+
+def test_fuzzy_values_only_reach_the_prompt(bot):
+    prompt = bot._entity_prompt({}, {'City': ['Mobile']})
+    assert "VALEURS PROCHES" in prompt and "'Mobile'" in prompt
+    assert "VALEURS CITÉES" not in prompt
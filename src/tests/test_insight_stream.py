@@ -0,0 +1,52 @@
+import pytest
+from core.insightbot_gpt import InsightBotGPT
+
+class StreamingLLM:
+    """Client LLM de test: produit les morceaux puis, éventuellement, une erreur"""
+    enabled = True
+    
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+    
+    def chat_stream(self, **kwargs):
+        yield from self.chunks
+        if self.error is not None:
+            raise self.error
+
+@pytest.fixture
+def answer(db):
+    data = db.execute_query("SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region ORDER BY 2 DESC")
+    return {'question': "Ventes par région", 'data': data, 'insight': None, 'chart': None,
+            'sql_query': "SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region", 'chart_type': 'bar'}
+
+def make_bot(db, llm):
+    bot = InsightBotGPT(db=db, llm=llm, snapshot=False)
+    bot.remembered = []
+    bot.remember_answer = bot.remembered.append
+    return bot
+
+def test_completed_stream_is_remembered(db, answer):
+    bot = make_bot(db, StreamingLLM(["Central ", "domine."]))
+    text = "".join(bot.generate_insight_stream(answer['question'], answer['data'], answer['sql_query'], result=answer))
+    assert text == "Central domine."
+    assert [result['insight'] for result in bot.remembered] == ["Central domine."]
+
+def test_interrupted_stream_is_not_remembered(db, answer):
+    bot = make_bot(db, StreamingLLM(["Central "], error=ConnectionError("coupure")))
+    text = "".join(bot.generate_insight_stream(answer['question'], answer['data'], answer['sql_query'], result=answer))
+    assert text == "Central "
+    assert bot.remembered == []
+
+def test_failed_stream_falls_back_without_remembering(db, answer):
+    bot = make_bot(db, StreamingLLM([], error=ConnectionError("coupure")))
+    text = "".join(bot.generate_insight_stream(answer['question'], answer['data'], answer['sql_query'], result=answer))
+    assert text.startswith("La région")
+    assert bot.remembered == []
+
+def test_abandoned_stream_is_not_remembered(db, answer):
+    bot = make_bot(db, StreamingLLM(["Central ", "domine."]))
+    stream = bot.generate_insight_stream(answer['question'], answer['data'], answer['sql_query'], result=answer)
+    next(stream)
+    stream.close()
+    assert bot.remembered == []
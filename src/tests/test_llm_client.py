@@ -0,0 +1,95 @@
+import threading
+import pytest
+import requests
+from core.llm_client import CircuitBreaker, CircuitOpenError, LLMClient, LLMClientError
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.text = "erreur"
+        self.headers = {}
+        self.body = body
+    
+    def json(self):
+        return self.body
+
+class FakeSession:
+    """Session HTTP de test: renvoie les réponses (ou lève les erreurs) dans l'ordre"""
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+    
+    def post(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def make_client(*outcomes, threshold=2):
+    client = LLMClient(api_key="test", max_retries=0, failure_threshold=threshold, reset_timeout=0)
+    client._session = FakeSession(*outcomes)
+    return client
+
+def answer(text):
+    return FakeResponse(200, {'choices': [{'message': {'content': text}}]})
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == 'half-open'
+    
+    allowed = []
+    threads = [threading.Thread(target=lambda: allowed.append(breaker.allow())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 1
+    
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_reopens_and_released_probe_allows_another():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.allow()
+    breaker.reset_timeout = 0
+    assert breaker.allow() and not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_failure()
+    breaker.reset_timeout = 60
+    assert breaker.state == 'open'
+
+def test_bad_requests_do_not_open_the_breaker():
+    client = make_client(*[FakeResponse(400)] * 5, answer("ok"))
+    for _ in range(5):
+        with pytest.raises(LLMClientError):
+            client.chat([{'role': 'user', 'content': "?"}])
+    assert client.circuit.state == 'closed'
+    assert client.stats['failures'] == 5
+    assert client.chat([{'role': 'user', 'content': "?"}]) == "ok"
+
+@pytest.mark.parametrize('outcome', [FakeResponse(503), requests.Timeout("délai"), requests.ConnectionError("coupure")])
+def test_outages_open_the_breaker(outcome):
+    client = make_client(outcome, outcome, threshold=2)
+    client.circuit.reset_timeout = 60
+    for _ in range(2):
+        with pytest.raises(LLMClientError):
+            client.chat([{'role': 'user', 'content': "?"}])
+    assert client.circuit.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.chat([{'role': 'user', 'content': "?"}])
+    assert client._session.calls == 2
+
+def test_probe_rejected_with_4xx_frees_the_next_probe():
+    client = make_client(FakeResponse(503), FakeResponse(400), answer("ok"), threshold=1)
+    with pytest.raises(LLMClientError):
+        client.chat([{'role': 'user', 'content': "?"}])
+    with pytest.raises(LLMClientError):
+        client.chat([{'role': 'user', 'content': "?"}])
+    assert client.circuit.state == 'half-open'
+    assert client.chat([{'role': 'user', 'content': "?"}]) == "ok"
+    assert client.circuit.state == 'closed'
@@ -0,0 +1,29 @@
+import pytest
+from core.question_slots import SlotExtractor
+
+@pytest.fixture
+def extractor(db):
+    return SlotExtractor(db)
+
+def test_extracts_years_months_top_and_values(extractor):
+    slots = extractor.extract("Top 5 des ventes de la catégorie Technology en mars 2015")
+    assert slots == {'years': [2015], 'months': [3], 'top': 5, 'category': ['Technology']}
+
+def test_year_range_is_completed(extractor):
+    assert extractor.extract("ventes de 2012 à 2014")['years'] == [2012, 2013, 2014]
+
+def test_where_binds_values_as_parameters():
+    clause, params = SlotExtractor.where({'years': [2012, 2015], 'region': ['North']})
+    assert clause == 'WHERE Order_Year IN ($years_0, $years_1) AND "Region" IN ($region_0)'
+    assert params == {'years_0': 2012, 'years_1': 2015, 'region_0': 'North'}
+
+@pytest.mark.parametrize('slots, label', [
+    ({'years': [2015]}, "2015"),
+    ({'years': [2012, 2013, 2014]}, "2012-2014"),
+    ({'years': [2012, 2015]}, "2012, 2015"),
+    ({'months': [1, 2, 3]}, "janvier-mars"),
+    ({'months': [1, 6]}, "janvier, juin"),
+    ({'years': [2014], 'market': ['EU']}, "2014, marché EU"),
+])
+def test_describe(slots, label):
+    assert SlotExtractor.describe(slots) == label
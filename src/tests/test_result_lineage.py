@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from core.result_lineage import LineageCache
+
+SOURCE = 'SELECT Returned, Region, COUNT(*) AS orders, SUM(Sales) AS total_sales FROM merged GROUP BY Returned, Region'
+
+def assert_same(derived, expected, sort_by=None):
+    if sort_by:
+        derived = derived.sort_values(sort_by).reset_index(drop=True)
+        expected = expected.sort_values(sort_by).reset_index(drop=True)
+    pd.testing.assert_frame_equal(derived.reset_index(drop=True), expected, check_dtype=False)
+
+@pytest.fixture
+def cache(db):
+    cache = LineageCache(db)
+    cache.execute(SOURCE)
+    return cache
+
+@pytest.mark.parametrize('query, sort_by', [
+    ("SELECT SUM(Sales) AS total_sales FROM merged", None),
+    ("SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region", ['Region']),
+    ("SELECT SUM(Sales) AS total_sales FROM merged WHERE Region = 'North'", None),
+    ("SELECT SUM(Sales) AS total_sales FROM merged WHERE Region IN ('North', 'South')", None),
+    # Returned est NULL pour les commandes non retournées: DuckDB les écarte de <> et de IN
+    ("SELECT SUM(Sales) AS total_sales FROM merged WHERE Returned <> 'Oui'", None),
+    ("SELECT SUM(Sales) AS total_sales FROM merged WHERE Returned = 'Oui'", None),
+    ("SELECT COUNT(*) AS orders FROM merged WHERE Returned IS NULL", None),
+    ("SELECT Returned, SUM(Sales) AS total_sales FROM merged WHERE Returned <> 'Non' GROUP BY Returned", ['Returned']),
+    ("SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region ORDER BY total_sales DESC LIMIT 2", None),
+    # Ré-agrégation triée par la clé (par nom ou par position)
+    ("SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region ORDER BY Region LIMIT 10", None),
+    ("SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region ORDER BY 1 DESC", None),
+])
+def test_derived_result_matches_duckdb(cache, db, query, sort_by):
+    derived = cache.derive(query)
+    assert derived is not None, query
+    data, source_sql = derived
+    assert source_sql == SOURCE
+    assert_same(data, db.execute_query(query), sort_by)
+
+def test_null_keys_excluded_from_not_equal(cache, db):
+    data, _ = cache.derive("SELECT Returned, SUM(Sales) AS total_sales FROM merged WHERE Returned <> 'Non' GROUP BY Returned")
+    assert list(data['Returned']) == ['Oui']
+    # Aucune clé non NULL différente de 'Oui': la somme est NULL, comme dans DuckDB
+    query = "SELECT SUM(Sales) AS total_sales FROM merged WHERE Returned <> 'Oui'"
+    data, _ = cache.derive(query)
+    assert data['total_sales'].isna().all()
+    assert db.execute_query(query)['total_sales'].isna().all()
+
+@pytest.mark.parametrize('query', [
+    # Colonne absente du résultat source, mesure non ré-agrégeable, autre table
+    "SELECT SUM(Sales) AS total_sales FROM merged WHERE Category = 'Furniture'",
+    "SELECT AVG(Sales) AS avg_sales FROM merged",
+    "SELECT SUM(Sales) AS total_sales FROM orders",
+])
+def test_not_derivable(cache, query):
+    assert cache.derive(query) is None
+
+def test_results_forgotten_when_data_changes(cache, db, tmp_path):
+    from conftest import MERGED_CSV, write_merged
+    write_merged(tmp_path, MERGED_CSV.replace("O6,South,Furniture,,1.0", "O6,South,Furniture,,9.0"))
+    db.create_tables()
+    assert cache.derive("SELECT SUM(Sales) AS total_sales FROM merged") is None
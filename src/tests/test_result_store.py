@@ -0,0 +1,82 @@
+import threading
+import pandas as pd
+from core.result_store import ResultStore
+
+def frame(rows=1000):
+    return pd.DataFrame({'Region': ['Central'] * rows, 'Sales': range(rows)})
+
+def test_result_without_sql_survives_disk_budget(tmp_path):
+    store = ResultStore(session_budget=1, global_budget=1, disk_budget=1, spill_dir=tmp_path)
+    ai_id = store.put('s1', frame())
+    store.put('s1', frame(), sql_query="SELECT 1")
+    payload = store.get(ai_id)
+    assert payload['state'] == 'spilled'
+    assert len(payload['data']) == 1000
+
+def test_result_without_sql_stays_in_memory_without_spill(tmp_path):
+    store = ResultStore(session_budget=1, global_budget=1, spill=False)
+    ai_id = store.put('s1', frame())
+    store.put('s1', frame())
+    payload = store.get(ai_id)
+    assert payload['state'] == 'memory'
+    assert payload['data'] is not None
+
+def test_result_with_sql_is_regenerated(db):
+    sql = "SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region"
+    store = ResultStore(db=db, session_budget=1, global_budget=1, spill=False)
+    result_id = store.put('s1', db.execute_query(sql), sql_query=sql)
+    store.put('s1', frame(), sql_query="SELECT 1")
+    payload = store.get(result_id)
+    assert payload['state'] == 'dropped'
+    assert len(payload['data']) == 3
+
+def test_abandoned_session_leaves_memory_but_keeps_results(tmp_path, monkeypatch):
+    store = ResultStore(spill_dir=tmp_path, session_ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr('core.result_store.time.time', lambda: clock[0])
+    ai_id = store.put('abandoned', frame())
+    clock[0] += 61
+    store.put('active', frame())
+    assert store.usage('abandoned')['session_bytes'] == 0
+    assert store.stats['expired'] == 1
+    payload = store.get(ai_id)
+    assert payload['state'] == 'spilled'
+    assert len(payload['data']) == 1000
+
+def test_abandoned_session_without_spill(db, monkeypatch):
+    sql = "SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region"
+    store = ResultStore(db=db, spill=False, session_ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr('core.result_store.time.time', lambda: clock[0])
+    sql_id = store.put('abandoned', db.execute_query(sql), sql_query=sql)
+    ai_id = store.put('abandoned', frame())
+    clock[0] += 61
+    store.put('active', frame())
+    # Le résultat régénérable quitte la mémoire, celui sans requête y reste
+    assert store.usage('abandoned')['session_bytes'] == ResultStore._size(frame(), None)
+    assert store.get(ai_id)['state'] == 'memory'
+    payload = store.get(sql_id)
+    assert payload['state'] == 'dropped'
+    assert len(payload['data']) == 3
+
+def test_regeneration_runs_outside_the_lock():
+    class ProbeDB:
+        """Base de test: vérifie qu'un autre thread peut utiliser le store pendant la requête"""
+        def execute_query(self, sql):
+            acquired = []
+            def probe():
+                acquired.append(store._lock.acquire(timeout=1))
+                if acquired[-1]:
+                    store._lock.release()
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            self.acquired = acquired[0]
+            return frame(3)
+    
+    db = ProbeDB()
+    store = ResultStore(db=db, session_budget=1, global_budget=1, spill=False)
+    result_id = store.put('s1', frame(), sql_query="SELECT 1")
+    store.put('s1', frame(), sql_query="SELECT 2")
+    assert store.get(result_id)['state'] == 'dropped'
+    assert db.acquired
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+from core.result_summarizer import summarize_result, format_profile
+
+def test_growth_follows_numeric_month_order():
+    data = pd.DataFrame({'Order_Month': range(1, 13), 'total_sales': [10.0] + [20.0] * 10 + [50.0]})
+    profile = summarize_result(data)
+    assert profile['time_column'] == 'Order_Month'
+    assert profile['period'] == ('1', '12')
+    assert profile['measures']['total_sales']['growth'] == pytest.approx(400.0)
+    assert "évolution 1 → 12: +400.0%" in format_profile(profile)
+
+def test_growth_follows_dates():
+    data = pd.DataFrame({
+        'Order Date': pd.to_datetime(['2015-03-01', '2014-12-01', '2015-01-15']),
+        'Sales': [30.0, 10.0, 20.0]
+    })
+    profile = summarize_result(data)
+    assert profile['measures']['Sales']['growth'] == pytest.approx(200.0)
+
+def test_text_periods_sort_as_text():
+    data = pd.DataFrame({'Order_YearMonth': ['2015-02', '2014-11', '2015-01'], 'Sales': [4.0, 2.0, 3.0]})
+    profile = summarize_result(data)
+    assert profile['period'] == ('2014-11', '2015-02')
+
+@pytest.mark.parametrize('column', ['avg_processing_days', 'monthly_sales', 'total_year_profit'])
+def test_measures_named_after_time_units_stay_measures(column):
+    data = pd.DataFrame({'Region': ['Central', 'North'], column: [2.5, 3.0]})
+    profile = summarize_result(data)
+    assert profile['time_column'] is None
+    assert column in profile['measures']
+
+def test_top_and_shares():
+    data = pd.DataFrame({'Region': ['Central', 'North', 'South'], 'Sales': [50.0, 30.0, 20.0]})
+    stats = summarize_result(data, top_k=2)['measures']['Sales']
+    assert [label for label, _, _ in stats['top']] == ['Central', 'North']
+    assert stats['top'][0][2] == pytest.approx(0.5)
+    assert stats['total'] == pytest.approx(100.0)
+    assert stats['bottom'][0][0] == 'South'
+
+def test_year_and_month_are_both_periods():
+    data = pd.DataFrame({
+        'Order_Year': [2015, 2014, 2015, 2014],
+        'Order_Month': [1, 12, 2, 11],
+        'total_sales': [30.0, 20.0, 40.0, 10.0]
+    })
+    profile = summarize_result(data)
+    assert profile['time_columns'] == ['Order_Year', 'Order_Month']
+    assert list(profile['measures']) == ['total_sales']
+    assert profile['period'] == ('2014/11', '2015/2')
+    assert profile['measures']['total_sales']['growth'] == pytest.approx(300.0)
+    assert profile['measures']['total_sales']['top'][0][0] == '2015/2'
+
+def test_null_measures_rank_last():
+    data = pd.DataFrame({'Region': ['A', 'B', 'C'], 'Sales': [10.0, float('nan'), 30.0]})
+    stats = summarize_result(data, top_k=3)['measures']['Sales']
+    assert [label for label, _, _ in stats['top']] == ['C', 'A', 'B']
+    assert [label for label, _, _ in stats['bottom']] == ['A', 'C', 'B']
+    assert "top: C (30.00" in format_profile(summarize_result(data, top_k=1))
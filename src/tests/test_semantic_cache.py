@@ -0,0 +1,67 @@
+from core.database_manager import DatabaseManager
+from core.semantic_cache import SemanticCache, normalize_question
+from conftest import MERGED_CSV, write_merged
+
+def make_cache(*questions):
+    cache = SemanticCache()
+    for question in questions:
+        cache.add(question, 'v1', {'question': question})
+    return cache
+
+def test_normalize_question_folds_synonyms_and_stopwords():
+    assert normalize_question("Quel est le chiffre d'affaires par Région ?") == "ventes par region"
+
+def test_lookup_matches_paraphrase():
+    cache = make_cache("Ventes par région")
+    similarity, entry = cache.lookup("Quelles sont les ventes par region?", 'v1')
+    assert entry['question'] == "Ventes par région"
+    assert similarity >= cache.threshold
+
+def test_lookup_rejects_other_year():
+    cache = make_cache("Ventes par région en 2015")
+    assert cache.lookup("Ventes par région en 2014", 'v1') is None
+    assert cache.lookup("Ventes par région en 2015", 'v1') is not None
+
+def test_lookup_rejects_other_top_n():
+    cache = make_cache("Top 5 produits par profit")
+    assert cache.lookup("Top 50 produits par profit", 'v1') is None
+
+def test_lookup_skips_closest_entry_with_other_numbers():
+    cache = make_cache("Ventes par région en 2015", "Ventes par region en 2014")
+    _, entry = cache.lookup("Ventes par région en 2014", 'v1')
+    assert entry['question'] == "Ventes par region en 2014"
+
+def test_lookup_ignores_other_data_version():
+    cache = make_cache("Ventes par région")
+    assert cache.lookup("Ventes par région", 'v2') is None
+
+def test_data_version_changes_with_content(db, tmp_path):
+    version = db.get_data_version()
+    # Même forme (lignes, colonnes), une valeur corrigée
+    write_merged(tmp_path, MERGED_CSV.replace("O6,South,Furniture,,1.0", "O6,South,Furniture,,9.0"))
+    db.create_tables()
+    assert db.get_data_version() != version
+
+def test_data_version_shared_by_processes(db):
+    version = db.get_data_version()
+    db.close()
+    other = DatabaseManager()
+    other.db_path = db.db_path
+    assert other.get_data_version() == version
+    other.close()
+
+def test_disabled_cache_neither_stores_nor_serves():
+    cache = make_cache("Ventes par région")
+    cache.enabled = False
+    cache.add("Profit par catégorie", 'v1', {})
+    assert cache.lookup("Ventes par région", 'v1') is None
+    assert len(cache.entries) == 1
+
+def test_lookup_rejects_other_measure():
+    cache = make_cache("Répartition des ventes par segment client et par catégorie")
+    for other in ("Répartition des quantités par segment client et par catégorie",
+                  "Répartition des profits par segment client et par catégorie"):
+        similarity, _ = cache.search(other, 'v1')[0]
+        assert similarity >= 0.8
+        assert cache.lookup(other, 'v1') is None
+    assert cache.lookup("Répartition du chiffre d'affaires par segment client et par catégorie", 'v1') is not None
@@ -0,0 +1,40 @@
+import pytest
+from core.sql_guard import SQLGuard, SQLGuardError
+
+@pytest.fixture
+def guard(db):
+    return SQLGuard(db)
+
+@pytest.mark.parametrize('sql', [
+    "SELECT * FROM read_csv_auto('/etc/passwd')",
+    "SELECT * FROM read_parquet('/tmp/*.parquet')",
+    "SELECT * FROM glob('/root/*')",
+    "SELECT m.Sales FROM merged AS m JOIN read_csv('/etc/passwd') AS p ON m.Region = p.column0",
+    "SELECT * FROM merged WHERE Region IN (SELECT column0 FROM read_csv_auto('/etc/hosts'))",
+])
+def test_table_functions_are_rejected(guard, sql):
+    with pytest.raises(SQLGuardError, match="Fonction table interdite"):
+        guard.check(sql)
+
+@pytest.mark.parametrize('sql', [
+    "SELECT * FROM '/etc/passwd.csv'",
+    "SELECT * FROM duckdb_settings",
+    "SELECT * FROM information_schema.tables",
+    "SELECT * FROM other.merged",
+    "SELECT * FROM merged AS m JOIN insightbot_version AS v ON TRUE",
+])
+def test_unknown_tables_are_rejected(guard, sql):
+    with pytest.raises(SQLGuardError, match="Table non autorisée"):
+        guard.check(sql)
+
+@pytest.mark.parametrize('sql', [
+    "SELECT Region, SUM(Sales) AS total_sales FROM merged GROUP BY Region",
+    "SELECT Region FROM main.merged LIMIT 5",
+    "WITH totals AS (SELECT Region, SUM(Sales) AS s FROM merged GROUP BY Region) SELECT * FROM totals",
+])
+def test_known_tables_and_ctes_are_read(guard, db, sql):
+    assert db.execute_query(guard.check(sql)) is not None
+
+def test_writes_are_rejected(guard):
+    with pytest.raises(SQLGuardError):
+        guard.check("DROP TABLE merged")